@@ -1,12 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
-from typing import List, Any
+from typing import List, Any, Optional
 from app.api import deps
+from app.core.config import settings
+from app.core.profiling import request_profiler
 from app.db import models
 from app.schemas import user as user_schemas
+from app.services.archive.archiver import conversation_archiver
+from app.services.llm.semantic_cache import semantic_cache
+from app.services.memory.consolidation import memory_consolidator
+from app.services.safety.audit import audit_log, top_violators, violation_counts
+from app.services.safety.guardian import safety_guardian
 
 router = APIRouter()
 
+class ProfilingConfig(BaseModel):
+    routes: List[str] = [] # path prefixes, e.g. "/chat/completions"; empty means all
+    user_ids: List[int] = [] # empty means every user
+    sample_rate: float = Field(1.0, gt=0, le=1)
+    interval_ms: float = Field(5.0, ge=1, le=1000)
+    max_profiles: Optional[int] = Field(None, ge=1) # switch off after this many captures
+
 @router.get("/users", response_model=List[user_schemas.User])
 def read_users(
     skip: int = 0,
@@ -38,4 +55,218 @@ def delete_user(
         raise HTTPException(status_code=404, detail="User not found")
     db.delete(user)
     db.commit()
+    # Drop the cached session user after commit so a concurrent miss can't re-cache the row
+    deps.invalidate_user(user.email)
     return user
+
+@router.get("/archive/stats")
+def archive_stats(
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Hot vs archived conversation storage. Only for superusers.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=400, detail="Not enough privileges")
+    return conversation_archiver.storage_stats(db)
+
+@router.post("/archive/run")
+def run_archive(
+    older_than_days: Optional[int] = None,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Archive conversations idle for `older_than_days` (default ARCHIVE_AFTER_DAYS) now. Only for superusers.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=400, detail="Not enough privileges")
+    if older_than_days is None:
+        older_than_days = settings.ARCHIVE_AFTER_DAYS
+    if older_than_days < 1:
+        raise HTTPException(status_code=400, detail="older_than_days must be at least 1")
+    return conversation_archiver.archive_cold(db, older_than_days, settings.ARCHIVE_BATCH_SIZE)
+
+@router.get("/memory/consolidation")
+def memory_consolidation_stats(
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Duplicate memories merged at insert and by the last consolidation run. Only for superusers.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=400, detail="Not enough privileges")
+    return memory_consolidator.stats()
+
+@router.post("/memory/consolidate")
+def consolidate_memories(
+    threshold: Optional[float] = Query(None, gt=0, le=1),
+    user_id: Optional[int] = None,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Merge near-duplicate memories of one user (or everyone) now, at `threshold`
+    cosine similarity (default MEMORY_DEDUP_THRESHOLD). Only for superusers.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=400, detail="Not enough privileges")
+    if threshold is None:
+        threshold = settings.MEMORY_DEDUP_THRESHOLD
+    if threshold <= 0:
+        raise HTTPException(status_code=400, detail="threshold must be greater than 0")
+    return memory_consolidator.consolidate(db, threshold, user_id)
+
+@router.get("/semantic-cache")
+def semantic_cache_stats(
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Hit rate, size and generation time saved by the semantic response cache. Only for superusers.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=400, detail="Not enough privileges")
+    return semantic_cache.stats()
+
+@router.delete("/semantic-cache")
+def clear_semantic_cache(
+    user_id: Optional[int] = None,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Drop the cached answers of one user, or everyone's. Only for superusers.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=400, detail="Not enough privileges")
+    semantic_cache.invalidate(user_id)
+    return semantic_cache.stats()
+
+@router.get("/safety/rules")
+def safety_rules(
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Size and load status of the active safety rule set. Only for superusers.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=400, detail="Not enough privileges")
+    return safety_guardian.stats()
+
+@router.post("/safety/reload")
+def reload_safety_rules(
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Recompile the safety rules from SAFETY_RULES_PATH now. Only for superusers.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=400, detail="Not enough privileges")
+    stats = safety_guardian.reload()
+    if stats["load_error"]:
+        raise HTTPException(status_code=400, detail=stats["load_error"])
+    return stats
+
+@router.get("/security/violations")
+def security_violations(
+    since_hours: int = Query(24, ge=1, le=24 * 366),
+    bucket: str = Query("hour", pattern="^(hour|day)$"),
+    user_id: Optional[int] = None,
+    action: Optional[str] = None,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Violation counts per user and time bucket, from the hourly rollups. Only for superusers.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=400, detail="Not enough privileges")
+    since = datetime.utcnow() - timedelta(hours=since_hours)
+    return violation_counts(db, since, bucket, user_id, action)
+
+@router.get("/security/violations/top")
+def top_security_violators(
+    since_hours: int = Query(24, ge=1, le=24 * 366),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Users with the most violations in the window. Only for superusers.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=400, detail="Not enough privileges")
+    since = datetime.utcnow() - timedelta(hours=since_hours)
+    return top_violators(db, since, limit)
+
+@router.get("/security/audit")
+def security_audit_stats(
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    State of the buffered security log writer. Only for superusers.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=400, detail="Not enough privileges")
+    return audit_log.stats()
+
+@router.get("/profiling")
+def profiling_status(
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Profiler settings and the captured profiles, newest first. Only for superusers.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=400, detail="Not enough privileges")
+    return request_profiler.stats()
+
+@router.put("/profiling")
+def configure_profiling(
+    config: ProfilingConfig,
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Start profiling matching requests with a wall-clock sampler. Only for superusers.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=400, detail="Not enough privileges")
+    emails = []
+    if config.user_ids:
+        emails = [email for (email,) in db.query(models.User.email).filter(models.User.id.in_(config.user_ids))]
+        if len(emails) != len(set(config.user_ids)):
+            raise HTTPException(status_code=404, detail="User not found")
+    return request_profiler.configure(
+        config.routes, emails, config.sample_rate, config.interval_ms, config.max_profiles
+    )
+
+@router.delete("/profiling")
+def disable_profiling(
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Stop profiling new requests; captured profiles are kept. Only for superusers.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=400, detail="Not enough privileges")
+    return request_profiler.disable()
+
+@router.get("/profiling/{profile_id}", response_class=PlainTextResponse)
+def download_profile(
+    profile_id: int,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    A captured profile as collapsed stacks, for flamegraph.pl, speedscope or
+    inferno. Only for superusers.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=400, detail="Not enough privileges")
+    session = request_profiler.get(profile_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(
+        session.folded(),
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'},
+    )
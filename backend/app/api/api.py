@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api import auth, chat, memory, tools, admin, conversations, models
+from app.api import auth, chat, memory, tools, admin, conversations, models, search
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
@@ -9,3 +9,4 @@ api_router.include_router(tools.router, prefix="/tools", tags=["tools"])
 api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
 api_router.include_router(models.router, prefix="/models", tags=["models"])
 api_router.include_router(conversations.router, prefix="/conversations", tags=["conversations"])
+api_router.include_router(search.router, prefix="/search", tags=["search"])
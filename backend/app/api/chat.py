@@ -4,25 +4,58 @@ from sqlalchemy.orm import Session
 from app.api import deps
 from app.schemas import chat as chat_schemas
 from app.services.llm.providers import LLMProvider, LLMFactory
+from app.services.llm.semantic_cache import semantic_cache
 from app.db import models
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Callable, Optional
+import logging
 import re
-import uuid
+import time
+from app.core.config import settings
+from app.core.tracing import span
 from app.services.memory.vector_store import vector_store
+from app.services.archive.archiver import conversation_archiver
+from app.services.safety.audit import audit_log
+from app.services.safety.guardian import safety_guardian
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+OUTPUT_CUTOFF_NOTICE = "\n\n[Response stopped: it violated safety guidelines.]"
+
 async def stream_and_save(
     generator: AsyncGenerator[str, None], 
     db: Session, 
     conversation_id: int,
-    user_id: int
+    user_id: int,
+    on_complete: Optional[Callable[[str], None]] = None
 ):
     full_response = ""
+    scanner = safety_guardian.stream_scanner() if settings.SAFETY_SCAN_OUTPUT else None
+    scanned_chunks, scan_seconds, violation = 0, 0.0, None
     try:
-        async for chunk in generator:
-            full_response += chunk
-            yield chunk
+        with span("chat.stream", conversation_id=conversation_id) as fields:
+            async for chunk in generator:
+                if scanner is not None:
+                    started = time.perf_counter()
+                    violation = scanner.feed(chunk)
+                    scan_seconds += time.perf_counter() - started
+                    scanned_chunks += 1
+                    if violation is not None:
+                        # Stop generating; the chunk completing the match is never sent
+                        await generator.aclose()
+                        yield OUTPUT_CUTOFF_NOTICE
+                        break
+                full_response += chunk
+                yield chunk
+            fields.update(chars=len(full_response), cut_off=violation is not None)
+
+        if scanner is not None:
+            safety_guardian.record_stream(scanned_chunks, scan_seconds, violation is not None)
+
+        if violation is not None:
+            audit_log.record(user_id, "response", (full_response + chunk)[-500:], f"rule:{violation.rule.id}")
+            full_response += OUTPUT_CUTOFF_NOTICE
         
         # Save assistant message after stream completes
         db_message = models.Message(
@@ -33,16 +66,20 @@ async def stream_and_save(
         db.add(db_message)
         db.commit()
 
+        if violation is not None:
+            return
+        if on_complete is not None:
+            on_complete(full_response)
+
         # Extract and Save Memories
         memory_matches = re.findall(r"\[MEMORY: (.*?)\]", full_response)
         for fact in memory_matches:
-            print(f"Saving memory: {fact}")
-            await vector_store.add_memory(str(uuid.uuid4()), fact, user_id)
+            logger.debug("Saving memory: %s", fact)
+            with span("chat.remember"):
+                await vector_store.remember(db, user_id, fact)
 
-    except Exception as e:
-        print(f"Error saving stream: {e}")
-        # Optionally log error
-        pass
+    except Exception:
+        logger.exception("Error saving stream")
 
 @router.post("/completions", response_model=chat_schemas.ChatResponse)
 async def chat_completion(
@@ -68,13 +105,24 @@ async def chat_completion(
         ).first()
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
+        conversation_archiver.restore(db, conversation)
 
     # 2. Save User Message
+    query_vector, memory_version, cached_answer = None, None, None
+    # Only a first-turn question has an answer that doesn't depend on earlier turns
+    use_cache = (
+        settings.SEMANTIC_CACHE_ENABLED and bool(request.messages)
+        and request.messages[-1].role == "user"
+        and all(m.role == "system" for m in request.messages[:-1])
+    )
     if request.messages:
         last_message = request.messages[-1]
         
-        # Retrieval: Search memory for context
-        memories = await vector_store.search_memory(last_message.content, current_user.id)
+        # Retrieval: Search memory for context; the query embedding is shared with the response cache
+        with span("chat.memory_search") as fields:
+            query_vector = await vector_store.embed(last_message.content)
+            memories = await vector_store.search_memory(last_message.content, current_user.id, query_vector=query_vector)
+            fields["hits"] = len(memories)
         memory_context = "\n".join([f"- {m['text']}" for m in memories])
 
         if last_message.role == "user":
@@ -84,22 +132,14 @@ async def chat_completion(
                 content=last_message.content
             )
             db.add(user_msg)
-            db.commit()
 
             # Safety Check
-            from app.services.safety.guardian import safety_guardian
-            if not safety_guardian.check_input(last_message.content):
-                # Log violation
-                log = models.SecurityLog(
-                    user_id=current_user.id,
-                    action="message",
-                    content=last_message.content[:500], # Truncate if too long
-                    reason="forbidden_keyword"
-                )
-                db.add(log)
-                db.commit()
+            violation = safety_guardian.find_violation(last_message.content)
+            if violation is not None:
+                # Log violation with the rule that matched; the sink writes it in a batch
+                audit_log.record(current_user.id, "message", last_message.content, f"rule:{violation.rule.id}")
                 
-                # Create assistant response denying request
+                # Create assistant response denying request, committed with the user message
                 db_message = models.Message(
                     conversation_id=conversation_id,
                     role="assistant",
@@ -118,6 +158,33 @@ async def chat_completion(
                 else:
                     return {"content": "I cannot fulfill this request as it violates safety guidelines.", "conversation_id": conversation_id}
 
+            db.commit()
+
+            if use_cache:
+                with span("chat.semantic_cache") as fields:
+                    memory_version = vector_store.memory_version(current_user.id)
+                    cached_answer = semantic_cache.lookup(current_user.id, request.model, query_vector, memory_version)
+                    fields["hit"] = cached_answer is not None
+
+    if cached_answer is not None:
+        if request.stream:
+            return StreamingResponse(
+                stream_and_save(semantic_cache.replay(cached_answer), db, conversation_id, current_user.id),
+                media_type="text/event-stream"
+            )
+        db.add(models.Message(conversation_id=conversation_id, role="assistant", content=cached_answer))
+        db.commit()
+        return {"content": cached_answer, "conversation_id": conversation_id}
+
+    generation_started = time.perf_counter()
+
+    def cache_answer(answer: str):
+        if use_cache:
+            semantic_cache.store(
+                current_user.id, request.model, request.messages[-1].content, query_vector,
+                memory_version, answer, time.perf_counter() - generation_started,
+            )
+
     # 3. Generate Response
     provider = LLMFactory.get_provider()
     
@@ -148,12 +215,14 @@ async def chat_completion(
                 provider.generate_stream(messages, request.model, tools=tools),
                 db,
                 conversation_id,
-                current_user.id
+                current_user.id,
+                on_complete=cache_answer
             ),
             media_type="text/event-stream"
         )
     else:
         content = await provider.generate(messages, request.model, tools=tools)
+        cache_answer(content)
         
         # Save complete response
         db_message = models.Message(
@@ -167,7 +236,8 @@ async def chat_completion(
         # Extract and Save Memories (Non-stream)
         memory_matches = re.findall(r"\[MEMORY: (.*?)\]", content)
         for fact in memory_matches:
-            print(f"Saving memory: {fact}")
-            await vector_store.add_memory(str(uuid.uuid4()), fact, current_user.id)
+            logger.debug("Saving memory: %s", fact)
+            with span("chat.remember"):
+                await vector_store.remember(db, current_user.id, fact)
 
         return {"content": content, "conversation_id": conversation_id}
@@ -1,12 +1,47 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List, Any
+from typing import Any, Dict, List
 from app.api import deps
+from app.core.responses import FastJSONResponse
 from app.db import models
 from app.schemas import conversation as conversation_schemas
+from app.services.archive.archiver import conversation_archiver
 
 router = APIRouter()
 
+def _messages_by_conversation(db: Session, conversation_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Messages of the given conversations as plain dicts, read column by column
+    instead of loading ORM objects one relationship at a time.
+    """
+    messages: Dict[int, List[Dict[str, Any]]] = {conversation_id: [] for conversation_id in conversation_ids}
+    for start in range(0, len(conversation_ids), 500):
+        rows = db.query(
+            models.Message.id, models.Message.conversation_id, models.Message.role,
+            models.Message.content, models.Message.created_at,
+        ).filter(
+            models.Message.conversation_id.in_(conversation_ids[start:start + 500])
+        ).order_by(models.Message.id)
+        for message_id, conversation_id, role, content, created_at in rows:
+            messages[conversation_id].append({
+                "role": role,
+                "content": content,
+                "id": message_id,
+                "conversation_id": conversation_id,
+                "created_at": created_at,
+            })
+    return messages
+
+def _conversation_dict(row, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "title": row.title,
+        "id": row.id,
+        "user_id": row.user_id,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at,
+        "messages": messages,
+    }
+
 @router.post("/", response_model=conversation_schemas.Conversation)
 def create_conversation(
     conversation_in: conversation_schemas.ConversationCreate,
@@ -29,10 +64,14 @@ def read_conversations(
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
-    conversations = db.query(models.Conversation).filter(
+    conversations = db.query(
+        models.Conversation.id, models.Conversation.title, models.Conversation.user_id,
+        models.Conversation.created_at, models.Conversation.updated_at,
+    ).filter(
         models.Conversation.user_id == current_user.id
     ).offset(skip).limit(limit).all()
-    return conversations
+    messages = _messages_by_conversation(db, [row.id for row in conversations])
+    return FastJSONResponse([_conversation_dict(row, messages[row.id]) for row in conversations])
 
 @router.get("/{conversation_id}", response_model=conversation_schemas.Conversation)
 def read_conversation(
@@ -46,7 +85,9 @@ def read_conversation(
     ).first()
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    return conversation
+    conversation_archiver.restore(db, conversation)
+    messages = _messages_by_conversation(db, [conversation.id])
+    return FastJSONResponse(_conversation_dict(conversation, messages[conversation.id]))
 
 @router.delete("/{conversation_id}", response_model=conversation_schemas.Conversation)
 def delete_conversation(
@@ -60,6 +101,7 @@ def delete_conversation(
     ).first()
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
+    conversation_archiver.discard(db, conversation)
     db.delete(conversation)
     db.commit()
     return conversation
@@ -1,7 +1,10 @@
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+from app.core.cache import TTLCache
 from app.core.config import settings
 from app.core import security
 from app.db import base, models
@@ -9,6 +12,13 @@ from app.schemas import user as user_schemas
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/token")
 
+# token string -> subject email, expiring no later than the token itself
+token_cache = TTLCache(maxsize=settings.AUTH_CACHE_MAX_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+# email -> column snapshot of the user row
+user_cache = TTLCache(maxsize=settings.AUTH_CACHE_MAX_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+# Bumped by every invalidation, so a load that overlapped one doesn't cache what it read
+_user_invalidations = 0
+
 def get_db():
     try:
         db = base.SessionLocal()
@@ -16,22 +26,84 @@ def get_db():
     finally:
         db.close()
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> models.User:
+def decode_token_subject(token: str) -> str:
+    """
+    Return the token subject, raising JWTError if the token is invalid or expired.
+    """
+    email = token_cache.get(token)
+    if email is not None:
+        return email
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    email = payload.get("sub")
+    if email is None:
+        raise JWTError("Token has no subject")
+    token_cache.set(token, email, expires_at=payload.get("exp"))
+    return email
+
+def load_user(email: str) -> Optional[models.User]:
+    """
+    Return a detached User for the email, hitting the database only on a cache miss.
+    """
+    snapshot = user_cache.get(email)
+    if snapshot is None:
+        invalidations = _user_invalidations
+        db = base.SessionLocal()
+        try:
+            user = db.query(models.User).filter(models.User.email == email).first()
+            if user is None:
+                return None
+            snapshot = {column.key: getattr(user, column.key) for column in models.User.__table__.columns}
+        finally:
+            db.close()
+        if invalidations == _user_invalidations:
+            user_cache.set(email, snapshot)
+
+    # A fresh instance per request so callers never share mutable ORM state
+    user = models.User(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+def invalidate_user(email: Optional[str]):
+    global _user_invalidations
+    if email:
+        _user_invalidations += 1
+        user_cache.pop(email)
+
+# Flush events fire before commit, when other sessions still read the old row;
+# the emails are collected then and evicted once the change is committed
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _collect_changed_user(mapper, connection, target):
+    session = object_session(target)
+    if session is None:
+        invalidate_user(target.email)
+        return
+    emails = session.info.setdefault("changed_user_emails", set())
+    emails.add(target.email)
+    # Also drop the previous email if it was changed
+    emails.update(inspect(target).attrs.email.history.deleted)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for email in session.info.pop("changed_user_emails", ()):
+        invalidate_user(email)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_users(session):
+    session.info.pop("changed_user_emails", None)
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> models.User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = user_schemas.TokenData(email=email)
+        token_data = user_schemas.TokenData(email=decode_token_subject(token))
     except JWTError:
         raise credentials_exception
     
-    user = db.query(models.User).filter(models.User.email == token_data.email).first()
+    user = load_user(token_data.email)
     if user is None:
         raise credentials_exception
     return user
@@ -3,7 +3,9 @@ from sqlalchemy.orm import Session
 from typing import List, Dict, Any
 from pydantic import BaseModel
 from app.api import deps
+from app.core.responses import FastJSONResponse
 from app.services.memory.vector_store import vector_store
+from app.services.memory.ingest import ingestion_manager
 from app.db import models
 
 router = APIRouter()
@@ -20,28 +22,17 @@ class MemorySearchRequest(BaseModel):
     query: str
     limit: int = 5
 
+class IngestRequest(BaseModel):
+    source: str # file path in INGEST_DIR (txt, pdf, docx) or public http(s) URL
+
 @router.post("/", response_model=MemoryResponse)
-def add_memory(
+async def add_memory(
     item: MemoryCreate,
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_active_user)
 ):
-    # 1. Save to SQL
-    db_memory = models.Memory(
-        content=item.text,
-        user_id=current_user.id
-    )
-    db.add(db_memory)
-    db.commit()
-    db.refresh(db_memory)
-
-    # 2. Save to Vector Store
-    vector_store.add_memory(
-        memory_id=str(db_memory.id),
-        text=item.text,
-        user_id=current_user.id,
-        metadata={"created_at": str(db_memory.created_at)}
-    )
+    # SQL row and vector are committed together
+    db_memory = await vector_store.remember(db, current_user.id, item.text)
 
     return {
         "id": db_memory.id,
@@ -56,29 +47,29 @@ def get_memories(
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_active_user)
 ):
-    memories = db.query(models.Memory).filter(
+    memories = db.query(models.Memory.id, models.Memory.content, models.Memory.created_at).filter(
         models.Memory.user_id == current_user.id
     ).offset(skip).limit(limit).all()
-    
-    return [
+
+    return FastJSONResponse([
         {
-            "id": m.id,
-            "text": m.content,
-            "created_at": str(m.created_at)
-        } for m in memories
-    ]
+            "id": memory_id,
+            "text": content,
+            "created_at": str(created_at)
+        } for memory_id, content, created_at in memories
+    ])
 
 @router.post("/search", response_model=List[Dict[str, Any]])
-def search_memory(
+async def search_memory(
     request: MemorySearchRequest,
     current_user: models.User = Depends(deps.get_current_active_user)
 ):
-    results = vector_store.search_memory(
+    results = await vector_store.search_memory(
         query=request.query,
         user_id=current_user.id,
         n_results=request.limit
     )
-    return results
+    return FastJSONResponse(results)
 
 @router.delete("/{memory_id}")
 def delete_memory(
@@ -86,7 +77,6 @@ def delete_memory(
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_active_user)
 ):
-    # 1. Delete from SQL
     memory = db.query(models.Memory).filter(
         models.Memory.id == memory_id,
         models.Memory.user_id == current_user.id
@@ -94,11 +84,41 @@ def delete_memory(
     
     if not memory:
         raise HTTPException(status_code=404, detail="Memory not found")
-        
+
+    # Row and vector are deleted in the same transaction
+    vector_store.delete_memory(str(memory_id), current_user.id, db=db)
     db.delete(memory)
     db.commit()
 
-    # 2. Delete from Vector Store
-    vector_store.delete_memory(str(memory_id), current_user.id)
-
     return {"status": "success", "message": "Memory deleted"}
+
+@router.post("/ingest", response_model=Dict[str, Any])
+async def ingest_document(
+    request: IngestRequest,
+    current_user: models.User = Depends(deps.get_current_active_user)
+):
+    """
+    Start a background job that chunks, embeds and indexes a file or URL into memory.
+    Files must be inside INGEST_DIR and URLs must resolve to public addresses.
+    """
+    try:
+        job = await ingestion_manager.submit(current_user.id, request.source)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job.to_dict()
+
+@router.get("/ingest", response_model=List[Dict[str, Any]])
+def list_ingestion_jobs(
+    current_user: models.User = Depends(deps.get_current_active_user)
+):
+    return [job.to_dict() for job in ingestion_manager.list(current_user.id)]
+
+@router.get("/ingest/{job_id}", response_model=Dict[str, Any])
+def get_ingestion_job(
+    job_id: str,
+    current_user: models.User = Depends(deps.get_current_active_user)
+):
+    job = ingestion_manager.get(job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return job.to_dict()
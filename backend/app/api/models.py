@@ -1,24 +1,29 @@
-from fastapi import APIRouter, HTTPException
-import httpx
-from app.core.config import settings
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Any
+from app.api import deps
+from app.db import models
+from app.services.llm.model_manager import model_manager
 
 router = APIRouter()
 
 @router.get("/")
 async def list_models():
     """
-    Proxy to Ollama /api/tags to list available models.
+    Ollama's model list ({"models": [{"name": "llama3:latest", ...}]}), served
+    from a cache that is refreshed in the background.
     """
-    url = f"{settings.OLLAMA_BASE_URL}/api/tags"
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=10.0)
-            if response.status_code != 200:
-                 raise HTTPException(status_code=502, detail="Failed to fetch models from Ollama")
-            
-            data = response.json()
-            # Transform if needed, or return as is.
-            # Ollama returns {"models": [{"name": "llama3:latest", ...}]}
-            return data
+        return await model_manager.list_models()
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error connecting to Ollama: {str(e)}")
+        raise HTTPException(status_code=502, detail=f"Error connecting to Ollama: {str(e)}")
+
+@router.get("/status")
+def model_status(
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Loaded models, hot-model settings and cold/warm start counts. Only for superusers.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=400, detail="Not enough privileges")
+    return model_manager.status()
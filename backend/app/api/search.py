@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional, Any
+from app.api import deps
+from app.db import models
+from app.schemas import search as search_schemas
+from app.services.search.index import search_index
+
+router = APIRouter()
+
+@router.get("/", response_model=search_schemas.SearchResults)
+def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    kinds: Optional[List[str]] = Query(None, description="Restrict to message, note and/or memory"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Full-text search over the current user's messages, notes and memories.
+    """
+    try:
+        return search_index.search(db, current_user.id, q, kinds=kinds, skip=skip, limit=limit)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
@@ -1,8 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+import time
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.orm import Session
 from typing import List, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from app.api import deps
+from app.core.config import settings
+from app.services.tools.base import ToolContext
+from app.services.tools.batch import BatchToolCall, check_dependencies, run_batch
 from app.services.tools.registry import tool_registry
+from app.services.tools.sandbox import tool_sandbox
+from app.services.tools.search_cache import search_cache
 
 router = APIRouter()
 
@@ -10,23 +19,75 @@ class ToolExecutionRequest(BaseModel):
     name: str
     arguments: Dict[str, Any]
 
+class BatchExecutionRequest(BaseModel):
+    calls: List[BatchToolCall] = Field(..., min_length=1, max_length=settings.TOOL_BATCH_MAX_CALLS)
+
 @router.get("/", response_model=List[Dict[str, Any]])
-def list_tools(current_user = Depends(deps.get_current_active_user)):
-    return tool_registry.list_tools()
+def list_tools(request: Request, current_user = Depends(deps.get_current_active_user)):
+    """
+    The tool catalogue, tagged with its version hash so clients can revalidate
+    with If-None-Match instead of downloading the schemas again.
+    """
+    etag = f'"{tool_registry.catalogue_version}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(tool_registry.list_tools(), headers=headers)
+
+@router.get("/stats", response_model=Dict[str, Any])
+def tool_stats(current_user = Depends(deps.get_current_active_user)):
+    """
+    Per-tool call metrics and cache statistics.
+    """
+    stats = tool_registry.stats()
+    stats["web_search"] = search_cache.stats()
+    stats["sandbox"] = tool_sandbox.stats()
+    return stats
 
 @router.post("/execute")
-def execute_tool(
+async def execute_tool(
     request: ToolExecutionRequest,
+    db: Session = Depends(deps.get_db),
     current_user = Depends(deps.get_current_active_user)
 ):
     tool = tool_registry.get_tool(request.name)
     if not tool:
         raise HTTPException(status_code=404, detail=f"Tool '{request.name}' not found")
     
+    context = ToolContext(
+        user=current_user,
+        db=db,
+        deadline=time.monotonic() + settings.TOOL_TIMEOUT_SECONDS
+    )
     try:
-        # Validate arguments using Pydantic model
-        validated_args = tool.args_schema(**request.arguments)
-        result = tool.run(**validated_args.model_dump())
+        result = await tool_registry.aexecute_tool(request.name, request.arguments, context)
         return {"status": "success", "result": result}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/execute_batch")
+async def execute_batch(
+    request: BatchExecutionRequest,
+    current_user = Depends(deps.get_current_active_user)
+):
+    """
+    Run several tool calls in one request. Independent calls run concurrently under
+    the registry's limits; `depends_on` orders calls. Results stream back as
+    newline-delimited JSON, one line per call, in completion order.
+    """
+    try:
+        check_dependencies(request.calls)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # No shared session: concurrent calls each open their own via tool_session
+    context = ToolContext(
+        user=current_user,
+        deadline=time.monotonic() + settings.TOOL_BATCH_TIMEOUT_SECONDS
+    )
+
+    async def results():
+        async for result in run_batch(request.calls, context):
+            yield json.dumps(result, default=str) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
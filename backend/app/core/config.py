@@ -7,6 +7,10 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "dev_secret_key"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+
+    # In-process cache of decoded tokens and authenticated users
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_MAX_SIZE: int = 10000
     
     BACKEND_CORS_ORIGINS: List[str] = ["http://localhost:5173", "http://localhost:3000"]
 
@@ -15,6 +19,109 @@ class Settings(BaseSettings):
     OLLAMA_BASE_URL: str = "http://localhost:11434"
     OLLAMA_MODEL: str = "llama3"
 
+    # Model manager: cached catalogue, and models kept loaded in Ollama
+    MODEL_TAGS_TTL_SECONDS: int = 60
+    MODEL_HOT_MODELS: List[str] = [] # preloaded at startup and kept resident
+    MODEL_KEEP_ALIVE: str = "30m"
+    MODEL_KEEPALIVE_INTERVAL_SECONDS: int = 120
+    MODEL_MEMORY_BUDGET_MB: int = 0 # unload idle models when loaded ones exceed this (0 disables)
+    MODEL_IDLE_SECONDS: int = 600
+    MODEL_COLD_LOAD_SECONDS: float = 1.0 # a reported load_duration above this counts as a cold start
+
+    # Default wall-clock budget for a single tool call
+    TOOL_TIMEOUT_SECONDS: float = 30.0
+    TOOL_HTTP_MAX_CONNECTIONS: int = 50
+    TOOL_PROCESS_WORKERS: int = 2
+    TOOL_BATCH_MAX_CALLS: int = 50
+    TOOL_BATCH_TIMEOUT_SECONDS: float = 120.0
+
+    # Worker processes for isolated tools, with per-call resource limits
+    TOOL_SANDBOX_ENABLED: bool = True
+    TOOL_SANDBOX_WORKERS: int = 2
+    TOOL_SANDBOX_CPU_SECONDS: float = 5.0
+    TOOL_SANDBOX_MEMORY_MB: int = 512
+    TOOL_SANDBOX_MAX_TASKS: int = 500
+
+    # File reader: per-page extraction cache, and the number of uncached PDF pages
+    # above which extraction is spread across the process pool
+    DOCUMENT_CACHE_PAGES: int = 10000
+    DOCUMENT_CACHE_TTL_SECONDS: int = 3600
+    DOCUMENT_PARALLEL_MIN_PAGES: int = 32
+
+    # Extra safety rules (JSON list or one keyword per line), reloaded when the file changes
+    SAFETY_RULES_PATH: Optional[str] = None
+    SAFETY_RULES_RELOAD_SECONDS: float = 5.0
+    # Moderate streamed model output; regex rules see this many earlier characters
+    SAFETY_SCAN_OUTPUT: bool = True
+    SAFETY_STREAM_REGEX_WINDOW: int = 256
+    # Buffered SecurityLog writes
+    AUDIT_LOG_BUFFER_SIZE: int = 10000
+    AUDIT_LOG_BATCH_SIZE: int = 500
+    AUDIT_LOG_FLUSH_INTERVAL_SECONDS: float = 2.0
+
+    # Vector store: shared SQL storage with per-process caches
+    VECTOR_STORE_LEGACY_PATH: str = "simple_vector_store.pkl" # imported once, then renamed
+    VECTOR_CACHE_USERS: int = 256
+    VECTOR_CHANGE_LOOKBACK: int = 1000
+    VECTOR_CHANGELOG_RETAIN: int = 100000
+
+    # Near-duplicate memories: merged at insert and by a periodic consolidation job
+    MEMORY_DEDUP_THRESHOLD: float = 0.95 # cosine similarity; 0 disables
+    MEMORY_CONSOLIDATE_INTERVAL_MINUTES: int = 360 # 0 disables the periodic job
+
+    # Semantic response cache: answers reused for near-identical first-turn questions (opt-in)
+    SEMANTIC_CACHE_ENABLED: bool = False
+    SEMANTIC_CACHE_THRESHOLD: float = 0.97 # cosine similarity of the question embeddings
+    SEMANTIC_CACHE_TTL_SECONDS: int = 3600
+    SEMANTIC_CACHE_SIZE: int = 256 # entries per user
+    SEMANTIC_CACHE_USERS: int = 1024
+
+    # Memoized results of tools with a pure/ttl cache policy
+    TOOL_RESULT_CACHE_SIZE: int = 1024
+    TOOL_RESULT_CACHE_TTL_SECONDS: int = 300
+
+    # Document ingestion into the memory store
+    INGEST_CHUNK_TOKENS: int = 400
+    INGEST_CHUNK_OVERLAP: int = 60
+    INGEST_EMBED_BATCH: int = 32
+    INGEST_MAX_CHARS: int = 2_000_000
+    INGEST_DIR: Optional[str] = None # file sources must resolve inside this directory; unset disables them
+
+    # Website reader: stop downloading after this many bytes or once enough text is extracted
+    WEBSITE_READER_MAX_BYTES: int = 2_000_000
+    WEBSITE_READER_MAX_CHARS: int = 5000
+    HTTP_CACHE_ENABLED: bool = True
+    HTTP_CACHE_DIR: str = ".cache/http"
+
+    # Web search result cache; set WEB_SEARCH_CACHE_PATH to persist it across restarts
+    WEB_SEARCH_CACHE_TTL_SECONDS: int = 3600
+    WEB_SEARCH_CACHE_SIZE: int = 1000
+    WEB_SEARCH_CACHE_PATH: Optional[str] = None
+    WEB_SEARCH_CACHE_SAVE_INTERVAL_SECONDS: int = 30
+
+    # Response compression (brotli when installed, else gzip); streamed responses are sent as-is
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_BYTES: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # Logging: "json" (one object per line, with request ids) or "text"
+    LOG_FORMAT: str = "json"
+    LOG_LEVEL: str = "INFO"
+
+    # On-demand request profiling, switched on by a superuser via /admin/profiling
+    PROFILE_BUFFER_SIZE: int = 50
+    PROFILE_MAX_SECONDS: float = 120.0
+
+    # Run schema creation and store loading in the background after the server starts accepting
+    # connections; /ready reports 503 until it finishes. Set False to block startup instead.
+    BACKGROUND_STARTUP: bool = True
+
+    # Conversations with no messages for this many days are compressed into the archive table (0 disables)
+    ARCHIVE_AFTER_DAYS: int = 30
+    ARCHIVE_INTERVAL_MINUTES: int = 60
+    ARCHIVE_BATCH_SIZE: int = 100
+
     model_config = {
         "env_file": ".env",
         "case_sensitive": True,
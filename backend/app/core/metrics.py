@@ -0,0 +1,233 @@
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; suits everything from a cache lookup to a long generation
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+# (metric name, type, help, [(labels, value)]) produced at scrape time
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self._labels(key))} {_format_value(value)}" for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> (per-bucket counts, sum)
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            total[0] += value
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self._values.items():
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                bucket_labels = {**labels, "le": _format_value(bound)}
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-local metrics in the Prometheus text format. Counters, gauges and
+    histograms are updated where things happen; collectors are called at scrape
+    time for values that are cheaper to read than to track (pool usage, cache
+    sizes). With several workers each process reports its own numbers.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric '{metric.name}' is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[Family]]):
+        self._collectors.append(collector)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, kind, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Shared by the HTTP middleware and the chat pipeline
+http_requests = registry.counter(
+    "http_requests_total", "Requests handled, by router, route, method and status.",
+    ["router", "route", "method", "status"],
+)
+http_request_seconds = registry.histogram(
+    "http_request_duration_seconds", "Time until the last byte of the response was sent.",
+    ["router", "method"],
+)
+http_in_flight = registry.gauge("http_requests_in_flight", "Requests currently being handled.")
+
+llm_requests = registry.counter(
+    "llm_requests_total", "Requests to the model server, by model, mode and outcome.",
+    ["model", "mode", "outcome"],
+)
+llm_ttft_seconds = registry.histogram(
+    "llm_time_to_first_token_seconds", "Time from sending a streamed request to the first content.",
+    ["model"],
+)
+llm_tokens_per_second = registry.histogram(
+    "llm_tokens_per_second", "Generation speed reported by the model server (eval_count / eval_duration).",
+    ["model"], buckets=(1, 2.5, 5, 10, 20, 40, 80, 160, 320),
+)
+llm_prompt_eval_seconds = registry.histogram(
+    "llm_prompt_eval_seconds", "Prompt processing time reported by the model server.", ["model"],
+)
+llm_eval_seconds = registry.histogram(
+    "llm_eval_seconds", "Generation time reported by the model server.", ["model"],
+)
+llm_tokens = registry.counter(
+    "llm_tokens_total", "Tokens processed by the model server, by kind (prompt or completion).",
+    ["model", "kind"],
+)
+llm_model_loads = registry.counter(
+    "llm_model_loads_total", "Responses by whether the model had to be loaded first (cold) or was resident (warm).",
+    ["model", "kind"],
+)
+llm_model_load_seconds = registry.histogram(
+    "llm_model_load_seconds", "Model load time of cold starts, as reported by the model server.", ["model"],
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 40, 80, 160),
+)
+
+embedding_seconds = registry.histogram(
+    "embedding_request_duration_seconds", "Embedding requests to the model server, by mode and outcome.",
+    ["mode", "outcome"],
+)
+memory_duplicates_merged = registry.counter(
+    "memory_duplicates_merged_total", "Near-duplicate memories merged, at insert or by consolidation.", ["stage"],
+)
+semantic_cache_requests = registry.counter(
+    "semantic_cache_requests_total", "Questions looked up in the semantic response cache, by outcome (hit or miss).",
+    ["outcome"],
+)
+semantic_cache_seconds_saved = registry.counter(
+    "semantic_cache_seconds_saved_total", "Generation time of the cached answers that were served instead.",
+)
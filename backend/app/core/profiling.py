@@ -0,0 +1,329 @@
+import asyncio
+import contextvars
+import gc
+import itertools
+import logging
+import random
+import sys
+import threading
+import time
+import types
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_current_session: contextvars.ContextVar[Optional["ProfileSession"]] = contextvars.ContextVar(
+    "profile_session", default=None
+)
+
+# Awaitables that hide the object they wrap; gc.get_referents() reveals it
+_WRAPPERS = ("async_generator_asend", "async_generator_athrow", "FutureIter")
+
+
+def _label(frame) -> str:
+    code = frame.f_code
+    filename = "/".join(code.co_filename.replace("\\", "/").split("/")[-2:])
+    # co_qualname is new in Python 3.11; the image runs 3.10
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({filename}:{frame.f_lineno})"
+
+
+def _await_chain(awaitable: Any, limit: int = 256) -> Tuple[List[Any], Optional[str]]:
+    """
+    Frames of a suspended coroutine and everything it awaits, outermost first,
+    plus the type of the innermost non-coroutine awaitable (usually a Future).
+    """
+    frames = []
+    while awaitable is not None and len(frames) < limit:
+        if isinstance(awaitable, types.CoroutineType):
+            frame, awaitable_next = awaitable.cr_frame, awaitable.cr_await
+        elif isinstance(awaitable, types.AsyncGeneratorType):
+            frame, awaitable_next = awaitable.ag_frame, awaitable.ag_await
+        elif isinstance(awaitable, types.GeneratorType):
+            frame, awaitable_next = awaitable.gi_frame, awaitable.gi_yieldfrom
+        elif type(awaitable).__name__ in _WRAPPERS:
+            inner = [ref for ref in gc.get_referents(awaitable) if hasattr(ref, "__await__") or hasattr(ref, "ag_frame")]
+            if not inner:
+                return frames, type(awaitable).__name__
+            awaitable = inner[0]
+            continue
+        else:
+            return frames, type(awaitable).__name__
+        if frame is None:
+            break
+        frames.append(frame)
+        awaitable = awaitable_next
+    return frames, None
+
+
+class ProfileSession:
+    """
+    Wall-clock samples of one request, kept as collapsed stacks ("a;b;c count").
+    Every task the request spawns is sampled: running tasks from the event loop
+    thread's stack, suspended ones from their await chain, so time spent waiting
+    (on Ollama, a thread pool, a lock) shows up ending in an "[await ...]" frame.
+    """
+
+    def __init__(self, profile_id: int, method: str, path: str, user: Optional[str]):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.user = user
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.loop = asyncio.get_running_loop()
+        self.thread_id = threading.get_ident()
+        self.tasks: List[asyncio.Task] = [asyncio.current_task()]
+        self.stacks: "Counter[str]" = Counter()
+        self.samples = 0
+        self.truncated = False
+        self.status_code: Optional[int] = None
+        self.duration_ms: Optional[float] = None
+
+    def sample(self, thread_frames: Dict[int, Any], max_seconds: float):
+        if time.perf_counter() - self._start > max_seconds:
+            self.truncated = True
+            return
+        running = asyncio.current_task(self.loop)
+        for task in list(self.tasks):
+            if task.done():
+                continue
+            coro = task.get_coro()
+            if task is running:
+                root = getattr(coro, "cr_frame", None)
+                stack = []
+                frame = thread_frames.get(self.thread_id)
+                while frame is not None:
+                    stack.append(frame)
+                    if frame is root:
+                        break
+                    frame = frame.f_back
+                labels = [_label(frame) for frame in reversed(stack)]
+            else:
+                chain, leaf = _await_chain(coro)
+                labels = [_label(frame) for frame in chain]
+                if leaf:
+                    labels.append(f"[await {leaf}]")
+            if labels:
+                self.stacks[";".join(labels)] += 1
+        self.samples += 1
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+        self.tasks = []
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "user": self.user,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "status_code": self.status_code,
+            "samples": self.samples,
+            "truncated": self.truncated,
+        }
+
+
+class RequestProfiler:
+    """
+    On-demand sampling profiler for selected requests. While off, the middleware
+    costs one attribute check per request. While on, matching requests are
+    sampled by a background thread every `interval` seconds and the finished
+    profiles are kept in a ring buffer of `buffer_size`.
+    """
+
+    def __init__(self, buffer_size: int, max_seconds: float):
+        self.enabled = False
+        self.routes: List[str] = []
+        self.users: Set[str] = set()
+        self.sample_rate = 1.0
+        self.interval = 0.005
+        self.remaining: Optional[int] = None
+        self.max_seconds = max_seconds
+        self.profiles: Deque[ProfileSession] = deque(maxlen=buffer_size)
+        self._active: List[ProfileSession] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+        self._previous_factory = None
+
+    def configure(
+        self,
+        routes: List[str],
+        users: List[str],
+        sample_rate: float,
+        interval_ms: float,
+        max_profiles: Optional[int],
+    ) -> Dict[str, Any]:
+        """
+        Profile requests whose path starts with one of `routes` (all when empty),
+        made by one of `users` (emails; anyone when empty), with probability
+        `sample_rate`. Turns itself off after `max_profiles` captures if given.
+        """
+        with self._lock:
+            self.routes = [
+                route if route.startswith(settings.API_V1_STR) else settings.API_V1_STR + "/" + route.lstrip("/")
+                for route in routes
+            ]
+            self.users = set(users)
+            self.sample_rate = sample_rate
+            self.interval = interval_ms / 1000
+            self.remaining = max_profiles
+            self.enabled = True
+        return self.stats()
+
+    def disable(self) -> Dict[str, Any]:
+        self.enabled = False
+        return self.stats()
+
+    def matches(self, path: str) -> bool:
+        return not self.routes or any(path.startswith(route) for route in self.routes)
+
+    def _wanted(self, user: Optional[str]) -> bool:
+        if self.users and user not in self.users:
+            return False
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def start(self, method: str, path: str, user: Optional[str]) -> Optional[ProfileSession]:
+        """
+        Begin profiling the current request if it is picked. Runs on the event loop.
+        """
+        if not self._wanted(user):
+            return None
+        with self._lock:
+            if not self.enabled:
+                return None
+            if self.remaining is not None:
+                self.remaining -= 1
+                if self.remaining <= 0:
+                    self.enabled = False
+            session = ProfileSession(next(self._ids), method, path, user)
+            self._active.append(session)
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._run_sampler, name="request-profiler", daemon=True)
+                self._sampler.start()
+
+        loop = session.loop
+        if loop.get_task_factory() != self._task_factory:
+            self._previous_factory = loop.get_task_factory()
+            loop.set_task_factory(self._task_factory)
+        return session
+
+    def finish(self, session: ProfileSession):
+        with self._lock:
+            session.finish()
+            self._active.remove(session)
+            self.profiles.append(session)
+            idle = not self._active and not self.enabled
+        if idle and session.loop.get_task_factory() == self._task_factory:
+            session.loop.set_task_factory(self._previous_factory)
+
+    def _task_factory(self, loop, coro, context=None):
+        """
+        Installed while profiling so tasks spawned by a profiled request (streaming
+        bodies, task groups, gather) are sampled with it.
+        """
+        kwargs = {} if context is None else {"context": context}
+        if self._previous_factory is not None:
+            task = self._previous_factory(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        session = context.get(_current_session) if context is not None else _current_session.get()
+        if session is not None and session.duration_ms is None:
+            session.tasks.append(task)
+        return task
+
+    def _run_sampler(self):
+        while True:
+            with self._lock:
+                sessions = list(self._active)
+                if not sessions:
+                    self._sampler = None
+                    return
+            thread_frames = sys._current_frames()
+            for session in sessions:
+                try:
+                    session.sample(thread_frames, self.max_seconds)
+                except Exception as e:
+                    # A sample racing with the loop is not worth failing the profile
+                    logger.error("Error sampling profile %s: %s", session.id, e)
+            del thread_frames
+            time.sleep(self.interval)
+
+    def get(self, profile_id: int) -> Optional[ProfileSession]:
+        for session in list(self.profiles):
+            if session.id == profile_id:
+                return session
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "routes": self.routes,
+            "users": sorted(self.users),
+            "sample_rate": self.sample_rate,
+            "interval_ms": self.interval * 1000,
+            "remaining": self.remaining,
+            "active": len(self._active),
+            "profiles": [session.summary() for session in reversed(self.profiles)],
+        }
+
+
+def _request_user(scope) -> Optional[str]:
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return None
+            # Imported here: the API layer depends on core, not the other way round
+            from app.api.deps import decode_token_subject
+            try:
+                return decode_token_subject(token)
+            except Exception:
+                return None
+    return None
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware, so the endpoint runs in the same task as the profile
+    and streamed responses are profiled until their last chunk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not request_profiler.enabled or scope["type"] != "http" or not request_profiler.matches(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        session = request_profiler.start(scope["method"], scope["path"], _request_user(scope))
+        if session is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                session.status_code = message["status"]
+            await send(message)
+
+        token = _current_session.set(session)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current_session.reset(token)
+            request_profiler.finish(session)
+
+
+request_profiler = RequestProfiler(
+    buffer_size=settings.PROFILE_BUFFER_SIZE,
+    max_seconds=settings.PROFILE_MAX_SECONDS,
+)
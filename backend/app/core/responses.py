@@ -0,0 +1,36 @@
+import json
+from datetime import date, datetime
+from typing import Any
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Compact JSON bytes, via orjson when installed. Datetimes are written in ISO
+    format, as FastAPI's encoder does.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    For endpoints that build plain dicts from column queries: returning this
+    skips FastAPI's response_model validation and jsonable_encoder pass, which
+    stay useful for the OpenAPI schema only.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
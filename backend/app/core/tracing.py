@@ -0,0 +1,144 @@
+import contextvars
+import json
+import logging
+import re
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator
+from app.core.config import settings
+from app.core.metrics import http_in_flight, http_request_seconds, http_requests
+
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+logger = logging.getLogger("app.trace")
+
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class _RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, message, request id, and any
+    fields passed as extra={"fields": {...}}.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+def configure_logging():
+    """
+    Send the app's loggers to stderr as JSON (LOG_FORMAT=json) or plain text.
+    """
+    handler = logging.StreamHandler(sys.stderr)
+    handler.addFilter(_RequestIdFilter())
+    if settings.LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(TextFormatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+    app_logger = logging.getLogger("app")
+    app_logger.handlers = [handler]
+    app_logger.setLevel(settings.LOG_LEVEL)
+    app_logger.propagate = False
+
+
+@contextmanager
+def span(name: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Log `name` with its duration and outcome when the block exits. The yielded
+    dict can be filled with more fields along the way.
+    """
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield fields
+    except Exception as e:
+        outcome = "error"
+        fields["error"] = f"{type(e).__name__}: {e}"
+        raise
+    except BaseException:
+        # Cancelled, or a generator closed early
+        outcome = "cancelled"
+        raise
+    finally:
+        duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        logger.info(name, extra={"fields": {"span": name, "duration_ms": duration_ms, "outcome": outcome, **fields}})
+
+
+class RequestTracingMiddleware:
+    """
+    Gives every request an id (the caller's X-Request-ID if valid), returns it in
+    the response headers, makes it available to log records, and records the
+    request in the HTTP metrics once the last byte has been sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        if not request_id or not _REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex[:16]
+        token = request_id_var.set(request_id)
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-request-id", request_id.encode())]}
+            await send(message)
+
+        http_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_flight.dec()
+            # Set by the router once the request matched a route
+            route = scope.get("route")
+            router = route.tags[0] if route is not None and getattr(route, "tags", None) else "root"
+            route_path = getattr(route, "path", "unmatched")
+            http_requests.inc(router=router, route=route_path, method=scope["method"], status=str(status))
+            http_request_seconds.observe(elapsed, router=router, method=scope["method"])
+            logger.info("http.request", extra={"fields": {
+                "method": scope["method"], "path": scope["path"], "route": route_path,
+                "status": status, "duration_ms": round(elapsed * 1000, 2),
+            }})
+            request_id_var.reset(token)
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String, ForeignKey, DateTime, Text
+from sqlalchemy import Boolean, Column, Integer, String, ForeignKey, DateTime, Text, LargeBinary, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.base import Base
@@ -28,6 +28,7 @@ class Conversation(Base):
     
     user = relationship("User", back_populates="conversations")
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
+    archive = relationship("ConversationArchive", uselist=False, cascade="all, delete-orphan")
 
 class Message(Base):
     __tablename__ = "messages"
@@ -40,6 +41,18 @@ class Message(Base):
     
     conversation = relationship("Conversation", back_populates="messages")
 
+class ConversationArchive(Base):
+    __tablename__ = "conversation_archives"
+
+    conversation_id = Column(Integer, ForeignKey("conversations.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    codec = Column(String) # zstd, zlib
+    payload = Column(LargeBinary) # compressed JSON list of messages
+    message_count = Column(Integer)
+    raw_bytes = Column(Integer) # uncompressed payload size
+    last_message_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
 class Memory(Base):
     __tablename__ = "memories"
     
@@ -50,6 +63,37 @@ class Memory(Base):
     
     user = relationship("User", back_populates="memories")
 
+class MemoryVector(Base):
+    """
+    One embedded record of the vector store: a memory row, a memory saved from
+    chat or an ingested document chunk. `key` is the store's record id.
+    """
+    __tablename__ = "memory_vectors"
+    __table_args__ = (UniqueConstraint("user_id", "key", name="uq_memory_vectors_user_key"),)
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    key = Column(String, nullable=False)
+    memory_id = Column(Integer, ForeignKey("memories.id", ondelete="CASCADE"), index=True, nullable=True)
+    source = Column(String, index=True, nullable=True) # ingested document, if any
+    text = Column(Text)
+    metadata_json = Column(Text)
+    dim = Column(Integer)
+    vector = Column(LargeBinary) # float32 little-endian
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class MemoryVectorChange(Base):
+    """
+    Append-only change log of memory_vectors keys; workers replay it to refresh
+    their in-memory caches.
+    """
+    __tablename__ = "memory_vector_changes"
+    __table_args__ = (Index("ix_memory_vector_changes_user_seq", "user_id", "seq"),)
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)
+    key = Column(String, nullable=False)
+
 class Note(Base):
     __tablename__ = "notes"
     
@@ -83,3 +127,16 @@ class SecurityLog(Base):
     content = Column(String)
     reason = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+class SecurityViolationRollup(Base):
+    """
+    Security events counted per user, hour, action and reason, maintained as
+    SecurityLog rows are flushed so admin queries never scan the raw log.
+    """
+    __tablename__ = "security_violation_rollups"
+
+    user_id = Column(Integer, primary_key=True, index=True) # 0 when no user
+    bucket_start = Column(DateTime, primary_key=True, index=True) # truncated to the hour
+    action = Column(String, primary_key=True)
+    reason = Column(String, primary_key=True)
+    count = Column(Integer, default=0)
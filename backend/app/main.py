@@ -1,18 +1,125 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+import asyncio
+import logging
 import uvicorn
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.metrics import registry
+from app.core.profiling import ProfilingMiddleware
+from app.core.tracing import RequestTracingMiddleware, configure_logging
+from app.api import deps
 from app.api.api import api_router
 from app.db.base import Base, engine
+from app.services.search.index import search_index
+from app.services.archive.archiver import conversation_archiver
+from app.services.llm.model_manager import model_manager
+from app.services.llm.semantic_cache import semantic_cache
+from app.services.memory.consolidation import memory_consolidator
+from app.services.memory.ingest import ingestion_manager
+from app.services.memory.vector_store import vector_store
+from app.services.safety.audit import audit_log
+from app.services.safety.guardian import safety_guardian
+from app.services.tools.documents import page_cache
+from app.services.tools.executors import shutdown_executors
+from app.services.tools.registry import tool_registry
+from app.services.tools.sandbox import tool_sandbox
+from app.services.tools.search_cache import search_cache
 
-# Create tables on startup
-Base.metadata.create_all(bind=engine)
+configure_logging()
+logger = logging.getLogger(__name__)
+
+def collect_runtime_metrics():
+    """
+    Values read at scrape time: connection pool usage, cache hit rates, models
+    resident in Ollama and the size of each cached user's vector index.
+    """
+    pool = engine.pool
+    pool_samples = [
+        ({"state": state}, getattr(pool, state)())
+        for state in ("size", "checkedin", "checkedout", "overflow") if hasattr(pool, state)
+    ]
+    yield "db_pool_connections", "gauge", "Database connection pool state.", pool_samples
+
+    caches = {
+        "auth_tokens": deps.token_cache,
+        "auth_users": deps.user_cache,
+        "tool_results": tool_registry._results,
+        "document_pages": page_cache,
+        "web_search": search_cache.cache,
+        "semantic_responses": semantic_cache,
+    }
+    stats = {name: cache.stats() for name, cache in caches.items()}
+    yield "cache_hits_total", "counter", "Cache hits.", [({"cache": name}, s["hits"]) for name, s in stats.items()]
+    yield "cache_misses_total", "counter", "Cache misses.", [({"cache": name}, s["misses"]) for name, s in stats.items()]
+    yield "cache_entries", "gauge", "Entries currently cached.", [({"cache": name}, s["size"]) for name, s in stats.items()]
+
+    yield "llm_models_loaded_bytes", "gauge", "Models resident in Ollama at the last check, by size.", [
+        ({"model": name}, model.get("size") or 0) for name, model in model_manager.loaded.items()
+    ]
+
+    sizes = vector_store.cached_sizes()
+    yield "vector_store_vectors", "gauge", "Vectors per user, for users in this process's cache.", [
+        ({"user_id": str(user_id)}, count) for user_id, count in sizes.items()
+    ]
+
+registry.add_collector(collect_runtime_metrics)
+
+async def warm_up(app: FastAPI):
+    """
+    Create tables and load stores off the event loop, then start background jobs.
+    """
+    try:
+        await asyncio.to_thread(Base.metadata.create_all, bind=engine)
+        await asyncio.to_thread(search_index.install, engine)
+        await asyncio.to_thread(vector_store.load)
+        await asyncio.to_thread(safety_guardian.reload)
+        await asyncio.to_thread(audit_log.backfill)
+        if settings.TOOL_SANDBOX_ENABLED:
+            await asyncio.to_thread(tool_sandbox.start)
+    except Exception as e:
+        logger.error("Error during startup: %s", e)
+        app.state.startup_error = str(e)
+
+    # Flushed even if warm-up failed, since chat keeps recording violations; started
+    # after the backfill so the rollups of older events are built first
+    app.state.background_tasks.append(asyncio.create_task(audit_log.run_periodically()))
+    if app.state.startup_error is not None:
+        return
+    # Preloads the hot models without holding up readiness
+    app.state.background_tasks.append(asyncio.create_task(model_manager.run_periodically()))
+    if settings.ARCHIVE_AFTER_DAYS > 0:
+        app.state.background_tasks.append(asyncio.create_task(conversation_archiver.run_periodically()))
+    if settings.MEMORY_DEDUP_THRESHOLD > 0 and settings.MEMORY_CONSOLIDATE_INTERVAL_MINUTES > 0:
+        app.state.background_tasks.append(asyncio.create_task(memory_consolidator.run_periodically()))
+    app.state.ready = True
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    app.state.startup_error = None
+    app.state.background_tasks = []
+    if settings.BACKGROUND_STARTUP:
+        app.state.background_tasks.append(asyncio.create_task(warm_up(app)))
+    else:
+        await warm_up(app)
+    yield
+    for task in app.state.background_tasks:
+        task.cancel()
+    await asyncio.to_thread(audit_log.flush)
+    await shutdown_executors()
+    await model_manager.close()
+    await ingestion_manager.close()
+    search_cache.save()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     description="Backend API for PocketPaw Clone AI Agent Platform",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # CORS Configuration
@@ -27,6 +134,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(ProfilingMiddleware)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_BYTES)
+# Outermost, so the request id and timings cover every other middleware
+app.add_middleware(RequestTracingMiddleware)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 @app.get("/")
@@ -37,5 +150,24 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Prometheus metrics for this worker process.
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe: 503 until startup work (schema, search index, vector store) has finished.
+    """
+    if not app.state.ready:
+        detail = {"status": "starting"}
+        if app.state.startup_error:
+            detail = {"status": "failed", "error": app.state.startup_error}
+        return JSONResponse(status_code=503, content=detail)
+    return {"status": "ready"}
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class SearchHit(BaseModel):
+    kind: str  # message, note, memory
+    id: int
+    conversation_id: Optional[int] = None
+    title: Optional[str] = None
+    snippet: str
+    score: float
+
+class SearchResults(BaseModel):
+    items: List[SearchHit]
+    skip: int
+    limit: int
+    has_more: bool
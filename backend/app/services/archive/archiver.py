@@ -0,0 +1,219 @@
+import asyncio
+import json
+import logging
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db import models
+from app.db.base import SessionLocal
+from app.services.search.index import search_index
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def compress(raw: bytes) -> Tuple[str, bytes]:
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(raw)
+    return "zlib", zlib.compress(raw, 9)
+
+
+def decompress(codec: str, payload: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is not installed; cannot read zstd archive")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return zlib.decompress(payload)
+
+
+class ConversationArchiver:
+    """
+    Moves the messages of conversations with no recent activity into one
+    compressed row per conversation, and restores them when the conversation
+    is opened again.
+    """
+
+    def find_cold(self, db: Session, older_than_days: int, limit: int) -> List[int]:
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        rows = (
+            db.query(models.Message.conversation_id)
+            .group_by(models.Message.conversation_id)
+            .having(func.max(models.Message.created_at) < cutoff)
+            .limit(limit)
+            .all()
+        )
+        return [row.conversation_id for row in rows]
+
+    def archive_conversation(self, db: Session, conversation_id: int) -> Optional[Dict[str, int]]:
+        """
+        Stage the archive of one conversation. The caller commits.
+        """
+        conversation = db.get(models.Conversation, conversation_id)
+        if conversation is None or db.get(models.ConversationArchive, conversation_id) is not None:
+            return None
+
+        rows = (
+            db.query(models.Message.id, models.Message.role, models.Message.content, models.Message.created_at)
+            .filter(models.Message.conversation_id == conversation_id)
+            .order_by(models.Message.id)
+            .all()
+        )
+        if not rows:
+            return None
+
+        raw = json.dumps(
+            [[row.id, row.role, row.content, row.created_at.isoformat() if row.created_at else None] for row in rows],
+            separators=(",", ":"),
+        ).encode("utf-8")
+        codec, payload = compress(raw)
+
+        # Flushed first: the search index keeps the documents of messages deleted
+        # from an archived conversation
+        db.add(models.ConversationArchive(
+            conversation_id=conversation_id,
+            user_id=conversation.user_id,
+            codec=codec,
+            payload=payload,
+            message_count=len(rows),
+            raw_bytes=len(raw),
+            last_message_at=max((row.created_at for row in rows if row.created_at), default=None),
+        ))
+        db.flush()
+        db.query(models.Message).filter(
+            models.Message.conversation_id == conversation_id
+        ).delete(synchronize_session=False)
+        return {"messages": len(rows), "raw_bytes": len(raw), "stored_bytes": len(payload)}
+
+    def archive_cold(self, db: Session, older_than_days: int, batch_size: int = 100) -> Dict[str, int]:
+        """
+        Archive every cold conversation, committing once per batch.
+        """
+        totals = {"conversations": 0, "messages": 0, "raw_bytes": 0, "stored_bytes": 0}
+        while True:
+            conversation_ids = self.find_cold(db, older_than_days, batch_size)
+            archived = 0
+            for conversation_id in conversation_ids:
+                result = self.archive_conversation(db, conversation_id)
+                if result is None:
+                    continue
+                archived += 1
+                totals["conversations"] += 1
+                for key, value in result.items():
+                    totals[key] += value
+            db.commit()
+            if archived == 0 or len(conversation_ids) < batch_size:
+                return totals
+
+    def restore(self, db: Session, conversation: models.Conversation) -> int:
+        """
+        Rehydrate an archived conversation's messages, keeping their original ids.
+        Returns the number of restored messages (0 if it was not archived, or if
+        a concurrent request restored it first).
+        """
+        archive = db.get(models.ConversationArchive, conversation.id)
+        if archive is None:
+            return 0
+        codec, payload = archive.codec, archive.payload
+
+        # Claim the archive by deleting it; whoever deletes the row restores the messages
+        claimed = db.query(models.ConversationArchive).filter(
+            models.ConversationArchive.conversation_id == conversation.id
+        ).delete(synchronize_session=False)
+        if not claimed:
+            db.rollback()
+            db.refresh(conversation)
+            return 0
+
+        rows = json.loads(decompress(codec, payload))
+        if rows:
+            db.execute(insert(models.Message), [
+                {
+                    "id": message_id,
+                    "conversation_id": conversation.id,
+                    "role": role,
+                    "content": content,
+                    "created_at": datetime.fromisoformat(created_at) if created_at else None,
+                }
+                for message_id, role, content, created_at in rows
+            ])
+        db.commit()
+        db.refresh(conversation)
+        return len(rows)
+
+    def discard(self, db: Session, conversation: models.Conversation) -> int:
+        """
+        Drop the search documents kept for an archived conversation's messages,
+        before the conversation (and its archive) is deleted. The caller commits.
+        """
+        archive = db.get(models.ConversationArchive, conversation.id)
+        if archive is None:
+            return 0
+        message_ids = [row[0] for row in json.loads(decompress(archive.codec, archive.payload))]
+        search_index.delete_documents(db, "message", message_ids)
+        return len(message_ids)
+
+    def archived_messages(self, db: Session) -> Iterator[Tuple[int, int, int, None, str]]:
+        """
+        Every archived message as a search document, (id, user id, conversation
+        id, title, content), for rebuilding the search index.
+        """
+        archives = db.query(
+            models.ConversationArchive.conversation_id, models.ConversationArchive.user_id,
+            models.ConversationArchive.codec, models.ConversationArchive.payload,
+        ).yield_per(100)
+        for conversation_id, user_id, codec, payload in archives:
+            for message_id, _, content, _ in json.loads(decompress(codec, payload)):
+                yield message_id, user_id, conversation_id, None, content
+
+    def storage_stats(self, db: Session) -> Dict[str, Any]:
+        hot_messages, hot_bytes = db.query(
+            func.count(models.Message.id), func.coalesce(func.sum(func.length(models.Message.content)), 0)
+        ).one()
+        cold_conversations, cold_messages, cold_raw, cold_stored = db.query(
+            func.count(models.ConversationArchive.conversation_id),
+            func.coalesce(func.sum(models.ConversationArchive.message_count), 0),
+            func.coalesce(func.sum(models.ConversationArchive.raw_bytes), 0),
+            func.coalesce(func.sum(func.length(models.ConversationArchive.payload)), 0),
+        ).one()
+        total_conversations = db.query(func.count(models.Conversation.id)).scalar()
+        return {
+            "hot": {
+                "conversations": total_conversations - cold_conversations,
+                "messages": hot_messages,
+                "content_bytes": int(hot_bytes),
+            },
+            "cold": {
+                "conversations": cold_conversations,
+                "messages": int(cold_messages),
+                "raw_bytes": int(cold_raw),
+                "stored_bytes": int(cold_stored),
+                "compression_ratio": round(cold_raw / cold_stored, 2) if cold_stored else None,
+            },
+        }
+
+    def run_once(self) -> Dict[str, int]:
+        db = SessionLocal()
+        try:
+            return self.archive_cold(db, settings.ARCHIVE_AFTER_DAYS, settings.ARCHIVE_BATCH_SIZE)
+        finally:
+            db.close()
+
+    async def run_periodically(self):
+        while True:
+            try:
+                totals = await asyncio.to_thread(self.run_once)
+                if totals["conversations"]:
+                    logger.info("Archived %d cold conversations (%d messages)", totals["conversations"], totals["messages"])
+            except Exception as e:
+                logger.error("Error archiving conversations: %s", e)
+            await asyncio.sleep(settings.ARCHIVE_INTERVAL_MINUTES * 60)
+
+
+conversation_archiver = ConversationArchiver()
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+from app.core.config import settings
+from app.core.metrics import llm_model_load_seconds, llm_model_loads
+
+logger = logging.getLogger(__name__)
+
+
+def canonical(model: str) -> str:
+    """
+    Ollama reports "llama3:latest" for a model requested as "llama3".
+    """
+    return model if ":" in model else f"{model}:latest"
+
+
+class ModelManager:
+    """
+    Keeps the Ollama model catalogue cached and the configured hot models
+    loaded. The tag list is served from memory and refreshed in the background
+    once stale; /api/ps is polled to know what is resident. Hot models are
+    preloaded at startup and pinged with keep_alive so Ollama never evicts them,
+    and when the loaded models exceed the memory budget the least recently used
+    idle ones are unloaded. Use is read from /api/ps, not this process: Ollama
+    pushes a model's expires_at back on every request, from any worker.
+    """
+
+    def __init__(self, base_url: str, hot_models: List[str], keep_alive: str):
+        self.base_url = base_url
+        self.hot_models = [canonical(model) for model in hot_models]
+        self.keep_alive = keep_alive
+        self._client: Optional[httpx.AsyncClient] = None
+        self._tags: Optional[Dict[str, Any]] = None
+        self._tags_fetched_at = 0.0
+        self._tags_refresh: Optional[asyncio.Task] = None
+        self.loaded: Dict[str, Dict[str, Any]] = {}
+        self._loaded_at = 0.0
+        # Model -> (expires_at last reported, monotonic time it last moved)
+        self.last_active: Dict[str, Tuple[Any, float]] = {}
+        self.cold_starts: Dict[str, int] = {}
+        self.warm_starts: Dict[str, int] = {}
+        self.preloads = 0
+        self.pings = 0
+        self.unloads = 0
+        self.errors = 0
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=httpx.Timeout(30.0))
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # --- Catalogue ---
+
+    async def refresh_tags(self) -> Dict[str, Any]:
+        response = await self._http().get("/api/tags", timeout=10.0)
+        response.raise_for_status()
+        self._tags = response.json()
+        self._tags_fetched_at = time.monotonic()
+        return self._tags
+
+    async def _refresh_tags_quietly(self):
+        try:
+            await self.refresh_tags()
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Error refreshing Ollama model list: %s", e)
+
+    async def list_models(self) -> Dict[str, Any]:
+        """
+        Ollama's tag list. A stale copy is returned immediately while a refresh
+        runs in the background; only the very first call waits for Ollama.
+        """
+        if self._tags is None:
+            return await self.refresh_tags()
+        stale = time.monotonic() - self._tags_fetched_at > settings.MODEL_TAGS_TTL_SECONDS
+        if stale and (self._tags_refresh is None or self._tags_refresh.done()):
+            self._tags_refresh = asyncio.create_task(self._refresh_tags_quietly())
+        return self._tags
+
+    # --- Residency ---
+
+    async def refresh_loaded(self) -> Dict[str, Dict[str, Any]]:
+        response = await self._http().get("/api/ps", timeout=10.0)
+        response.raise_for_status()
+        self.loaded = {model["name"]: model for model in response.json().get("models", [])}
+        self._loaded_at = now = time.monotonic()
+        # A model first seen now, or whose expiry moved, was used since the last poll
+        last_active = {}
+        for name, model in self.loaded.items():
+            expires_at, since = self.last_active.get(name, (None, None))
+            if since is None or expires_at != model.get("expires_at"):
+                expires_at, since = model.get("expires_at"), now
+            last_active[name] = (expires_at, since)
+        self.last_active = last_active
+        return self.loaded
+
+    async def _load(self, model: str, keep_alive: Any):
+        # An empty prompt only loads (or, with keep_alive 0, unloads) the model
+        response = await self._http().post(
+            "/api/generate", json={"model": model, "keep_alive": keep_alive}, timeout=300.0
+        )
+        response.raise_for_status()
+
+    async def preload(self, model: str):
+        started = time.perf_counter()
+        await self._load(model, self.keep_alive)
+        self.preloads += 1
+        logger.info("Preloaded model %s in %.0f ms", model, (time.perf_counter() - started) * 1000)
+
+    async def unload(self, model: str):
+        await self._load(model, 0)
+        self.loaded.pop(model, None)
+        self.last_active.pop(model, None)
+        self.unloads += 1
+        logger.info("Unloaded idle model %s", model)
+
+    def keep_alive_for(self, model: str) -> Optional[str]:
+        """
+        keep_alive to send with a chat request: hot models stay loaded, others
+        get Ollama's default.
+        """
+        return self.keep_alive if canonical(model) in self.hot_models else None
+
+    def record_load(self, model: str, load_seconds: float):
+        """
+        Called with the load_duration Ollama reports for each response; a long
+        load means the model was not resident when the request arrived.
+        """
+        model = canonical(model)
+        cold = load_seconds >= settings.MODEL_COLD_LOAD_SECONDS
+        counts = self.cold_starts if cold else self.warm_starts
+        counts[model] = counts.get(model, 0) + 1
+        llm_model_loads.inc(model=model, kind="cold" if cold else "warm")
+        if cold:
+            llm_model_load_seconds.observe(load_seconds, model=model)
+            logger.info("Cold start of model %s: loading took %.0f ms", model, load_seconds * 1000)
+
+    async def _unload_over_budget(self):
+        budget = settings.MODEL_MEMORY_BUDGET_MB * 1024 * 1024
+        if budget <= 0:
+            return
+        used = sum(model.get("size", 0) for model in self.loaded.values())
+        now = time.monotonic()
+        idle = sorted(
+            (
+                name for name in self.loaded
+                if name not in self.hot_models and now - self.last_active[name][1] > settings.MODEL_IDLE_SECONDS
+            ),
+            key=lambda name: self.last_active[name][1],
+        )
+        for name in idle:
+            if used <= budget:
+                break
+            used -= self.loaded[name].get("size", 0)
+            await self.unload(name)
+
+    async def maintain(self):
+        """
+        One round: refresh the catalogue and residency, load or ping the hot
+        models, and unload idle models over the memory budget.
+        """
+        if time.monotonic() - self._tags_fetched_at > settings.MODEL_TAGS_TTL_SECONDS:
+            await self._refresh_tags_quietly()
+        try:
+            await self.refresh_loaded()
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Error listing loaded Ollama models: %s", e)
+            return
+        missing = [model for model in self.hot_models if model not in self.loaded]
+        # One hot model that fails to load (not pulled, misspelled) must not stop the others
+        for model in self.hot_models:
+            try:
+                if model in missing:
+                    await self.preload(model)
+                else:
+                    await self._load(model, self.keep_alive)
+                    self.pings += 1
+            except Exception as e:
+                self.errors += 1
+                logger.warning("Error keeping model %s loaded: %s", model, e)
+        try:
+            if missing:
+                await self.refresh_loaded()
+            await self._unload_over_budget()
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Error unloading idle Ollama models: %s", e)
+
+    async def run_periodically(self):
+        while True:
+            await self.maintain()
+            await asyncio.sleep(settings.MODEL_KEEPALIVE_INTERVAL_SECONDS)
+
+    def status(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "hot_models": self.hot_models,
+            "keep_alive": self.keep_alive,
+            "loaded": [
+                {
+                    "name": name,
+                    "size": model.get("size"),
+                    "size_vram": model.get("size_vram"),
+                    "expires_at": model.get("expires_at"),
+                    "idle_seconds": round(now - self.last_active[name][1], 1) if name in self.last_active else None,
+                }
+                for name, model in self.loaded.items()
+            ],
+            "loaded_age_seconds": round(now - self._loaded_at, 1) if self._loaded_at else None,
+            "catalogue_age_seconds": round(now - self._tags_fetched_at, 1) if self._tags is not None else None,
+            "catalogue_models": len(self._tags.get("models", [])) if self._tags else 0,
+            "cold_starts": self.cold_starts,
+            "warm_starts": self.warm_starts,
+            "preloads": self.preloads,
+            "pings": self.pings,
+            "unloads": self.unloads,
+            "errors": self.errors,
+        }
+
+
+model_manager = ModelManager(
+    base_url=settings.OLLAMA_BASE_URL,
+    hot_models=settings.MODEL_HOT_MODELS,
+    keep_alive=settings.MODEL_KEEP_ALIVE,
+)
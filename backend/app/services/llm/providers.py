@@ -1,8 +1,47 @@
 import httpx
 import json
+import logging
+import time
 from typing import AsyncGenerator, List, Dict, Any, Optional
 from app.core.config import settings
+from app.core.metrics import (
+    llm_eval_seconds, llm_prompt_eval_seconds, llm_requests, llm_tokens, llm_tokens_per_second, llm_ttft_seconds
+)
+from app.core.tracing import span
 from app.services.llm.base import LLMProvider
+from app.services.llm.model_manager import model_manager
+
+logger = logging.getLogger(__name__)
+
+# Returned in place of an answer when Ollama can't be reached
+ERROR_PREFIX = "Error connecting to Ollama: "
+
+def record_usage(model: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Record the timings and token counts Ollama reports with a finished response
+    (durations are in nanoseconds). Returns them for the span log.
+    """
+    prompt_tokens = result.get("prompt_eval_count") or 0
+    completion_tokens = result.get("eval_count") or 0
+    prompt_seconds = (result.get("prompt_eval_duration") or 0) / 1e9
+    eval_seconds = (result.get("eval_duration") or 0) / 1e9
+    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+    if "load_duration" in result:
+        load_seconds = (result.get("load_duration") or 0) / 1e9
+        model_manager.record_load(model, load_seconds)
+        usage["load_ms"] = round(load_seconds * 1000, 1)
+    if prompt_seconds:
+        llm_prompt_eval_seconds.observe(prompt_seconds, model=model)
+        usage["prompt_eval_ms"] = round(prompt_seconds * 1000, 1)
+    if eval_seconds:
+        llm_eval_seconds.observe(eval_seconds, model=model)
+        usage["eval_ms"] = round(eval_seconds * 1000, 1)
+        if completion_tokens:
+            usage["tokens_per_second"] = round(completion_tokens / eval_seconds, 1)
+            llm_tokens_per_second.observe(usage["tokens_per_second"], model=model)
+    llm_tokens.inc(prompt_tokens, model=model, kind="prompt")
+    llm_tokens.inc(completion_tokens, model=model, kind="completion")
+    return usage
 
 class OllamaProvider(LLMProvider):
     def __init__(self):
@@ -16,52 +55,79 @@ class OllamaProvider(LLMProvider):
         # We will implement basic chat stream first.
         
         url = f"{self.base_url}/api/chat"
+        model_name = model or self.model
         payload = {
-            "model": model or self.model,
+            "model": model_name,
             "messages": messages,
             "options": {
                 "temperature": temperature
             },
             "stream": True
         }
+        keep_alive = model_manager.keep_alive_for(model_name)
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
 
-        try:
-            async with httpx.AsyncClient() as client:
-                async with client.stream("POST", url, json=payload, timeout=None) as response:
-                    async for line in response.aiter_lines():
-                        if line:
-                            try:
-                                chunk = json.loads(line)
-                                if "message" in chunk and "content" in chunk["message"]:
-                                    yield chunk["message"]["content"]
-                                if chunk.get("done", False):
-                                    break
-                            except json.JSONDecodeError:
-                                continue
-        except Exception as e:
-            print(f"Error in Ollama stream: {e}")
-            yield f"Error connecting to Ollama: {str(e)}"
+        started = time.perf_counter()
+        outcome = "cancelled" # unless the stream runs to the end
+        with span("llm.stream", model=model_name) as fields:
+            try:
+                async with httpx.AsyncClient() as client:
+                    async with client.stream("POST", url, json=payload, timeout=None) as response:
+                        async for line in response.aiter_lines():
+                            if line:
+                                try:
+                                    chunk = json.loads(line)
+                                    content = chunk.get("message", {}).get("content")
+                                    if content and "ttft_ms" not in fields:
+                                        ttft = time.perf_counter() - started
+                                        llm_ttft_seconds.observe(ttft, model=model_name)
+                                        fields["ttft_ms"] = round(ttft * 1000, 1)
+                                    if content is not None:
+                                        yield content
+                                    if chunk.get("done", False):
+                                        fields.update(record_usage(model_name, chunk))
+                                        break
+                                except json.JSONDecodeError:
+                                    continue
+                outcome = "ok"
+            except Exception as e:
+                outcome = "error"
+                fields["error"] = str(e)
+                logger.error("Error in Ollama stream: %s", e)
+                yield ERROR_PREFIX + str(e)
+            finally:
+                llm_requests.inc(model=model_name, mode="stream", outcome=outcome)
 
     async def generate(self, messages: List[Dict[str, Any]], model: str = None, temperature: float = 0.7, tools: List[Any] = None) -> str:
         url = f"{self.base_url}/api/chat"
+        model_name = model or self.model
         payload = {
-            "model": model or self.model,
+            "model": model_name,
             "messages": messages,
             "options": {
                 "temperature": temperature
             },
             "stream": False
         }
+        keep_alive = model_manager.keep_alive_for(model_name)
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
 
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=payload, timeout=60.0)
-                response.raise_for_status()
-                result = response.json()
-                return result["message"]["content"]
-        except Exception as e:
-            print(f"Error in Ollama generate: {e}")
-            return f"Error connecting to Ollama: {str(e)}"
+        with span("llm.generate", model=model_name) as fields:
+            try:
+                async with httpx.AsyncClient() as client:
+                    response = await client.post(url, json=payload, timeout=60.0)
+                    response.raise_for_status()
+                    result = response.json()
+                    fields.update(record_usage(model_name, result))
+                    llm_requests.inc(model=model_name, mode="generate", outcome="ok")
+                    return result["message"]["content"]
+            except Exception as e:
+                llm_requests.inc(model=model_name, mode="generate", outcome="error")
+                fields["error"] = str(e)
+                logger.error("Error in Ollama generate: %s", e)
+                return ERROR_PREFIX + str(e)
 
 class LLMFactory:
     @staticmethod
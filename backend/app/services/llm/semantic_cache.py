@@ -0,0 +1,159 @@
+import asyncio
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncGenerator, Dict, List, Optional
+import numpy as np
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import semantic_cache_requests, semantic_cache_seconds_saved
+from app.services.llm.providers import ERROR_PREFIX
+
+# A word and the whitespace after it: the chunks a cached answer is replayed in
+_CHUNK = re.compile(r"\S+\s*|\s+")
+
+
+class _Entry:
+    __slots__ = ("vector", "answer", "version", "generation_seconds")
+
+    def __init__(self, vector: np.ndarray, answer: str, version: int, generation_seconds: float):
+        self.vector = vector
+        self.answer = answer
+        self.version = version
+        self.generation_seconds = generation_seconds
+
+
+def _unit(vector: List[float]) -> Optional[np.ndarray]:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    # A zero vector is what a failed embedding returns
+    return array / norm if norm else None
+
+
+def cacheable(answer: str) -> bool:
+    # Answers that saved a memory or reported an error must be generated again;
+    # a stream that fails midway ends its partial text with the error
+    return bool(answer.strip()) and "[MEMORY:" not in answer and ERROR_PREFIX not in answer
+
+
+class SemanticResponseCache:
+    """
+    Answers to earlier first-turn questions, reused when a new question's
+    embedding (the one computed for memory retrieval) is at least `threshold`
+    similar and asks the same model. Each user has an LRU/TTL cache of their own.
+    Entries remember the user's memory version (the vector store's index
+    version) they were answered with, so a changed memory, from any worker,
+    makes them stale.
+    """
+
+    def __init__(self, threshold: float, ttl: float, size_per_user: int, max_users: int):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.size_per_user = size_per_user
+        self.max_users = max_users
+        self._users: "OrderedDict[int, TTLCache]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.stored = 0
+        self.seconds_saved = 0.0
+
+    def _user_cache(self, user_id: int, create: bool) -> Optional[TTLCache]:
+        with self._lock:
+            cache = self._users.get(user_id)
+            if cache is None and create:
+                cache = self._users[user_id] = TTLCache(maxsize=self.size_per_user, ttl=self.ttl)
+            if cache is not None:
+                self._users.move_to_end(user_id)
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+            return cache
+
+    def lookup(self, user_id: int, model: str, query_vector: List[float], version: Optional[int]) -> Optional[str]:
+        """
+        The cached answer closest to the question, if it is similar enough.
+        """
+        query = _unit(query_vector)
+        cache = self._user_cache(user_id, create=False)
+        best, best_key, best_similarity = None, None, self.threshold
+        if query is not None and version is not None and cache is not None:
+            for key, _, entry in cache.entries():
+                if entry.version != version:
+                    cache.pop(key)
+                    self.stale += 1
+                    continue
+                if key[0] != model or len(entry.vector) != len(query):
+                    continue
+                similarity = float(entry.vector @ query)
+                if similarity >= best_similarity:
+                    best, best_key, best_similarity = entry, key, similarity
+
+        if best is None:
+            self.misses += 1
+            semantic_cache_requests.inc(outcome="miss")
+            return None
+        cache.get(best_key) # most recently used
+        self.hits += 1
+        self.seconds_saved += best.generation_seconds
+        semantic_cache_requests.inc(outcome="hit")
+        semantic_cache_seconds_saved.inc(best.generation_seconds)
+        return best.answer
+
+    def store(
+        self,
+        user_id: int,
+        model: str,
+        question: str,
+        query_vector: List[float],
+        version: Optional[int],
+        answer: str,
+        generation_seconds: float,
+    ):
+        vector = _unit(query_vector)
+        if vector is None or version is None or not cacheable(answer):
+            return
+        key = (model, " ".join(question.lower().split()))
+        self._user_cache(user_id, create=True).set(key, _Entry(vector, answer, version, generation_seconds))
+        self.stored += 1
+
+    def invalidate(self, user_id: Optional[int] = None):
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+    async def replay(self, answer: str) -> AsyncGenerator[str, None]:
+        """
+        A cached answer as a stream, a word at a time, so clients render it the
+        same way as a generated one.
+        """
+        for chunk in _CHUNK.findall(answer):
+            yield chunk
+            await asyncio.sleep(0)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        with self._lock:
+            caches = list(self._users.values())
+        return {
+            "enabled": settings.SEMANTIC_CACHE_ENABLED,
+            "threshold": self.threshold,
+            "users": len(caches),
+            "size": sum(len(cache) for cache in caches),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "stale": self.stale,
+            "stored": self.stored,
+            "seconds_saved": round(self.seconds_saved, 3),
+        }
+
+
+semantic_cache = SemanticResponseCache(
+    threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+    ttl=settings.SEMANTIC_CACHE_TTL_SECONDS,
+    size_per_user=settings.SEMANTIC_CACHE_SIZE,
+    max_users=settings.SEMANTIC_CACHE_USERS,
+)
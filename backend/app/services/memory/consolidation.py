@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import memory_duplicates_merged
+from app.db import models
+from app.db.base import SessionLocal
+from app.services.memory.vector_store import vector_store
+
+logger = logging.getLogger(__name__)
+
+
+def cluster(matrix: np.ndarray, threshold: float, block: int = 1024) -> List[List[int]]:
+    """
+    Greedy clustering of unit vectors: in row order, every row not yet taken
+    starts a cluster with all later untaken rows at least `threshold` similar to
+    it. Similarities are computed a block of rows at a time to bound memory.
+    """
+    taken = np.zeros(len(matrix), dtype=bool)
+    clusters = []
+    for start in range(0, len(matrix), block):
+        similarities = matrix[start:start + block] @ matrix.T
+        for offset, row in enumerate(similarities):
+            i = start + offset
+            if taken[i]:
+                continue
+            members = np.flatnonzero((row >= threshold) & ~taken)
+            members = members[members >= i]
+            taken[members] = True
+            if len(members) > 1:
+                clusters.append(members.tolist())
+    return clusters
+
+
+class MemoryConsolidator:
+    """
+    Merges near-duplicate memories that slipped past the insert-time check
+    (older rows, or facts that drifted together after being reworded). Each
+    cluster keeps its oldest memory, with the newest wording, and deletes the rest.
+    """
+
+    def __init__(self):
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    def consolidate_user(self, db: Session, user_id: int, threshold: float) -> Dict[str, int]:
+        totals = {"memories": 0, "clusters": 0, "merged": 0, "bytes_reclaimed": 0}
+        records = vector_store.memory_records(user_id)
+        totals["memories"] = len(records)
+        by_dim: Dict[int, List[Any]] = {}
+        for record in sorted(records, key=lambda record: int(record[0])):
+            by_dim.setdefault(len(record[3]), []).append(record)
+
+        for group in by_dim.values():
+            if len(group) < 2:
+                continue
+            for members in cluster(np.vstack([record[3] for record in group]), threshold):
+                keep, newest = group[members[0]], group[members[-1]]
+                duplicates = [group[i] for i in members[1:]]
+                memory = db.query(models.Memory).filter(
+                    models.Memory.id == int(keep[0]), models.Memory.user_id == user_id
+                ).first()
+                if memory is None:
+                    # Deleted since the snapshot
+                    continue
+                merged_count = keep[2].get("duplicates", 0) + sum(
+                    record[2].get("duplicates", 0) + 1 for record in duplicates
+                )
+                memory.content = newest[1]
+                vector_store.stage_upsert(
+                    db, user_id, keep[0], newest[1], newest[3].tolist(),
+                    {**keep[2], "duplicates": merged_count}, memory_id=memory.id,
+                )
+                keys = [record[0] for record in duplicates]
+                vector_store.stage_delete(db, user_id, keys)
+                db.query(models.Memory).filter(
+                    models.Memory.user_id == user_id, models.Memory.id.in_([int(key) for key in keys])
+                ).delete(synchronize_session=False)
+                db.commit()
+                totals["clusters"] += 1
+                totals["merged"] += len(duplicates)
+                # Text stored twice (memory and vector row) plus the float32 vector
+                totals["bytes_reclaimed"] += sum(2 * len(record[1].encode("utf-8")) + 4 * len(record[3]) for record in duplicates)
+        if totals["merged"]:
+            memory_duplicates_merged.inc(totals["merged"], stage="consolidation")
+        return totals
+
+    def consolidate(self, db: Session, threshold: float, user_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Merge near-duplicate memories of one user, or of every user with memories.
+        """
+        started = time.perf_counter()
+        if user_id is not None:
+            user_ids = [user_id]
+        else:
+            user_ids = [uid for (uid,) in db.query(models.Memory.user_id).distinct()]
+        totals = {"users": 0, "memories": 0, "clusters": 0, "merged": 0, "bytes_reclaimed": 0}
+        for uid in user_ids:
+            try:
+                result = self.consolidate_user(db, uid, threshold)
+            except Exception as e:
+                db.rollback()
+                logger.error("Error consolidating memories of user %s: %s", uid, e)
+                continue
+            totals["users"] += 1
+            for name, value in result.items():
+                totals[name] += value
+        totals["threshold"] = threshold
+        totals["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        totals["finished_at"] = time.time()
+        self.last_run = totals
+        return totals
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threshold": settings.MEMORY_DEDUP_THRESHOLD,
+            "merged_at_insert": vector_store.duplicates_merged,
+            "last_run": self.last_run,
+        }
+
+    def run_once(self) -> Dict[str, Any]:
+        db = SessionLocal()
+        try:
+            return self.consolidate(db, settings.MEMORY_DEDUP_THRESHOLD)
+        finally:
+            db.close()
+
+    async def run_periodically(self):
+        while True:
+            await asyncio.sleep(settings.MEMORY_CONSOLIDATE_INTERVAL_MINUTES * 60)
+            try:
+                totals = await asyncio.to_thread(self.run_once)
+                if totals["merged"]:
+                    logger.info(
+                        "Merged %d duplicate memories in %d clusters, reclaiming %d bytes",
+                        totals["merged"], totals["clusters"], totals["bytes_reclaimed"],
+                    )
+            except Exception as e:
+                logger.error("Error consolidating memories: %s", e)
+
+
+memory_consolidator = MemoryConsolidator()
@@ -0,0 +1,247 @@
+import asyncio
+import ipaddress
+import logging
+import os
+import re
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlsplit
+import httpx
+from app.core.config import settings
+from app.services.memory.vector_store import vector_store
+from app.services.tools.documents import read_document
+from app.services.tools.web_reader import afetch_text
+
+logger = logging.getLogger(__name__)
+
+MAX_TRACKED_JOBS = 1000
+
+_encoding = None
+
+
+def _get_encoding():
+    """
+    tiktoken's cl100k_base when it can be loaded (it downloads its BPE file on first
+    use), otherwise None and chunking falls back to whitespace-delimited words.
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning("tiktoken unavailable, chunking by words: %s", e)
+            _encoding = False
+    return _encoding or None
+
+
+def _token_offsets(text: str) -> List[int]:
+    """
+    Character offset at which each token starts.
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        _, offsets = encoding.decode_with_offsets(encoding.encode(text, disallowed_special=()))
+        return offsets
+    return [match.start() for match in re.finditer(r"\S+", text)]
+
+
+def chunk_text(text: str, chunk_tokens: int, overlap: int) -> List[Tuple[int, str]]:
+    """
+    Split text into windows of `chunk_tokens` tokens, each overlapping the previous
+    one by `overlap` tokens. Returns (character offset, chunk text) pairs.
+    """
+    offsets = _token_offsets(text)
+    if not offsets:
+        return []
+    step = max(1, chunk_tokens - overlap)
+    chunks = []
+    for first in range(0, len(offsets), step):
+        last = first + chunk_tokens
+        start = offsets[first]
+        end = offsets[last] if last < len(offsets) else len(text)
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append((start, chunk))
+        if last >= len(offsets):
+            break
+    return chunks
+
+
+def check_file(path: str) -> str:
+    """
+    The real path of a file source, which must lie inside INGEST_DIR (relative
+    paths are taken from there). Raises ValueError otherwise.
+    """
+    if not settings.INGEST_DIR:
+        raise ValueError("File ingestion is disabled")
+    root = os.path.realpath(settings.INGEST_DIR)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError("File is outside the ingest directory")
+    return resolved
+
+
+async def check_url(url: str):
+    """
+    Raise ValueError unless every address the URL's host resolves to is public,
+    so ingestion can't reach loopback, private or link-local services.
+    """
+    host = urlsplit(url).hostname
+    if not host:
+        raise ValueError("URL has no host")
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, None)
+    except OSError as e:
+        raise ValueError(f"Cannot resolve {host}: {e}")
+    for *_, sockaddr in infos:
+        address = ipaddress.ip_address(sockaddr[0].split("%")[0])
+        if address.version == 6 and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise ValueError(f"URL resolves to a non-public address ({address})")
+
+
+async def _check_request(request: httpx.Request):
+    # Every hop, redirects included, is checked before it is sent
+    await check_url(str(request.url))
+
+
+@dataclass
+class IngestionJob:
+    id: str
+    user_id: int
+    source: str
+    kind: str  # file, url
+    status: str = "queued"  # queued, extracting, embedding, done, failed
+    chunks_total: int = 0
+    chunks_done: int = 0
+    characters: int = 0
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["created_at"] = str(self.created_at)
+        data["finished_at"] = str(self.finished_at) if self.finished_at else None
+        return data
+
+
+class IngestionManager:
+    """
+    Runs document ingestion as background tasks: extract text with the file/website
+    reader code paths, chunk it, embed chunks in batches and index them in the
+    memory store with source/offset metadata.
+    """
+
+    def __init__(self):
+        self.jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        # Not the shared tool client: this one refuses non-public addresses
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                follow_redirects=True,
+                timeout=httpx.Timeout(10.0),
+                headers={"User-Agent": f"{settings.PROJECT_NAME} ingest"},
+                event_hooks={"request": [_check_request]},
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def submit(self, user_id: int, source: str) -> IngestionJob:
+        """
+        Queue a job for a file inside INGEST_DIR or a public http(s) URL. Raises
+        ValueError for any other source.
+        """
+        kind = "url" if source.startswith(("http://", "https://")) else "file"
+        if kind == "url":
+            await check_url(source)
+        else:
+            source = check_file(source)
+        job = IngestionJob(id=uuid.uuid4().hex, user_id=user_id, source=source, kind=kind)
+        self.jobs[job.id] = job
+        while len(self.jobs) > MAX_TRACKED_JOBS:
+            self.jobs.popitem(last=False)
+
+        task = asyncio.create_task(self._run(job))
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.id, None))
+        return job
+
+    def get(self, job_id: str, user_id: int) -> Optional[IngestionJob]:
+        job = self.jobs.get(job_id)
+        if job is None or job.user_id != user_id:
+            return None
+        return job
+
+    def list(self, user_id: int) -> List[IngestionJob]:
+        return [job for job in reversed(self.jobs.values()) if job.user_id == user_id]
+
+    async def _extract(self, job: IngestionJob) -> str:
+        if job.kind == "url":
+            return await afetch_text(self._http(), job.source, max_chars=settings.INGEST_MAX_CHARS)
+        text, _ = await asyncio.to_thread(read_document, job.source, max_chars=settings.INGEST_MAX_CHARS)
+        return text
+
+    async def _run(self, job: IngestionJob):
+        try:
+            job.status = "extracting"
+            text = await self._extract(job)
+            job.characters = len(text)
+
+            chunks = await asyncio.to_thread(
+                chunk_text, text, settings.INGEST_CHUNK_TOKENS, settings.INGEST_CHUNK_OVERLAP
+            )
+            job.chunks_total = len(chunks)
+            job.status = "embedding"
+
+            batch_size = settings.INGEST_EMBED_BATCH
+            for batch_start in range(0, len(chunks), batch_size):
+                batch = chunks[batch_start:batch_start + batch_size]
+                await vector_store.add_memories(job.user_id, [
+                    {
+                        "id": f"doc:{job.id}:{batch_start + i}",
+                        "text": chunk,
+                        "metadata": {
+                            "source": job.source,
+                            "offset": offset,
+                            "chunk": batch_start + i,
+                            "job_id": job.id,
+                        },
+                    }
+                    for i, (offset, chunk) in enumerate(batch)
+                ])
+                job.chunks_done += len(batch)
+
+            # Re-ingesting a source replaces its previous chunks, once all the new ones are in
+            await asyncio.to_thread(vector_store.delete_by_source, job.source, job.user_id, job.id)
+            job.status = "done"
+        except Exception as e:
+            logger.error("Error ingesting %s: %s", job.source, e)
+            job.status = "failed"
+            job.error = str(e)
+            # The previous chunks stay; drop the partial new ones
+            if job.chunks_done:
+                try:
+                    await asyncio.to_thread(
+                        vector_store.delete_keys, job.user_id,
+                        [f"doc:{job.id}:{chunk}" for chunk in range(job.chunks_done)],
+                    )
+                except Exception as e:
+                    logger.error("Error removing partial chunks of %s: %s", job.source, e)
+        finally:
+            job.finished_at = datetime.utcnow()
+
+
+ingestion_manager = IngestionManager()
@@ -1,33 +1,383 @@
+import asyncio
+import itertools
+import json
+import logging
 import os
 import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
 import numpy as np
 import httpx
-from typing import List, Dict, Any, Optional
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import List, Dict, Any, Iterator, Optional, Set, Tuple
 from app.core.config import settings
+from app.core.metrics import embedding_seconds, memory_duplicates_merged
+from app.db import models
+from app.db.base import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def encode_vector(vector) -> bytes:
+    return np.asarray(vector, dtype="<f4").tobytes()
+
+
+def decode_vector(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype="<f4")
+
+
+def is_memory(key: str, metadata: Dict[str, Any]) -> bool:
+    # Memory rows are keyed by their id; ingested document chunks carry a source
+    return key.isdigit() and "source" not in metadata
+
+
+class _Block:
+    """
+    Rows of one embedding size in a preallocated matrix that grows by doubling.
+    Only the first len(keys) rows are in use.
+    """
+
+    def __init__(self, dim: int, capacity: int = 16):
+        self.keys: List[str] = []
+        self.matrix = np.empty((capacity, dim), dtype=np.float32)
+        self.memory = np.empty(capacity, dtype=bool)
+
+    def append(self, key: str) -> int:
+        row = len(self.keys)
+        if row == len(self.matrix):
+            matrix = np.empty((2 * row, self.matrix.shape[1]), dtype=np.float32)
+            matrix[:row] = self.matrix
+            memory = np.empty(2 * row, dtype=bool)
+            memory[:row] = self.memory
+            self.matrix, self.memory = matrix, memory
+        self.keys.append(key)
+        return row
+
+
+class _UserIndex:
+    """
+    One user's records as cached by this process. Unit-normalized vectors live
+    in one matrix per embedding size, updated in place: a changed record
+    overwrites its row, a new one is appended and a removed one is replaced by
+    the last row. `lock` guards the index; it is never held during database I/O.
+    """
+
+    def __init__(self):
+        self.records: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self.rows: Dict[str, Tuple[int, int]] = {}  # key -> (dim, row)
+        self.blocks: Dict[int, _Block] = {}
+        self.seq = 0  # highest change seq applied
+        self.applied: Set[int] = set()  # seqs inside the lookback window already applied
+        self.version = 0  # moves on every applied change, unlike seq
+        self.lock = threading.Lock()
+
+    def put(self, key: str, text: str, metadata: Dict[str, Any], vector: np.ndarray):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        dim = len(vector)
+        location = self.rows.get(key)
+        if location is not None and location[0] != dim:
+            self.remove(key)
+            location = None
+        if location is None:
+            block = self.blocks.get(dim)
+            if block is None:
+                block = self.blocks[dim] = _Block(dim)
+            row = block.append(key)
+            self.rows[key] = (dim, row)
+        else:
+            block, row = self.blocks[dim], location[1]
+        self.records[key] = (text, metadata)
+        block.matrix[row] = vector / norm if norm else vector
+        block.memory[row] = is_memory(key, metadata)
+
+    def remove(self, key: str):
+        location = self.rows.pop(key, None)
+        if location is None:
+            return
+        del self.records[key]
+        dim, row = location
+        block = self.blocks[dim]
+        last = len(block.keys) - 1
+        if row != last:
+            moved = block.keys[last]
+            block.keys[row] = moved
+            block.matrix[row] = block.matrix[last]
+            block.memory[row] = block.memory[last]
+            self.rows[moved] = (dim, row)
+        block.keys.pop()
+
+    def matrix(self, dim: int) -> Tuple[List[str], Optional[np.ndarray], Optional[np.ndarray]]:
+        """
+        Keys, vectors and memory mask (memories rather than document chunks) of
+        the records of one embedding size. Views: use them while holding `lock`.
+        """
+        block = self.blocks.get(dim)
+        if block is None or not block.keys:
+            return [], None, None
+        count = len(block.keys)
+        return block.keys, block.matrix[:count], block.memory[:count]
+
+    def vector(self, key: str) -> np.ndarray:
+        dim, row = self.rows[key]
+        return self.blocks[dim].matrix[row].copy()
+
 
 class VectorStore:
+    """
+    Embeddings live in the memory_vectors table as float32 blobs, written in the
+    same transaction as the rows they belong to. Every worker process keeps a
+    per-user cache and brings it up to date by replaying memory_vector_changes
+    entries it hasn't seen, so all workers serve the same data without reloading
+    everything.
+    """
+
     def __init__(self):
-        self.file_path = "simple_vector_store.pkl"
+        self.legacy_path = settings.VECTOR_STORE_LEGACY_PATH
         self.base_url = settings.OLLAMA_BASE_URL
         self.model = settings.OLLAMA_MODEL # Use same model for now
-        self.data: List[Dict[str, Any]] = []
-        self._load()
-
-    def _load(self):
-        if os.path.exists(self.file_path):
-            try:
-                with open(self.file_path, "rb") as f:
-                    self.data = pickle.load(f)
-            except Exception as e:
-                print(f"Error loading vector store: {e}")
-                self.data = []
-
-    def _save(self):
+        self.loaded = False
+        self._load_lock = threading.Lock()
+        self._cache: "OrderedDict[int, _UserIndex]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Index versions are never reused, even across a reload of the same user
+        self._versions = itertools.count(1)
+        self.full_loads = 0
+        self.changes_applied = 0
+        self.duplicates_merged = 0
+
+    def load(self):
+        """
+        One-time startup work: import the legacy pickle file and trim the change log.
+        Called from the app lifespan; methods that need it run it on first use.
+        """
+        with self._load_lock:
+            if not self.loaded:
+                self._migrate_legacy()
+                self._prune_changes()
+                self.loaded = True
+
+    def _ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def _migrate_legacy(self):
+        if not self.legacy_path or not os.path.exists(self.legacy_path):
+            return
+        db = SessionLocal()
+        try:
+            if db.query(models.MemoryVector.id).first() is None:
+                with open(self.legacy_path, "rb") as f:
+                    records = pickle.load(f)
+                memory_ids = set(db.query(models.Memory.user_id, models.Memory.id).all())
+                # Last record wins for duplicate ids, as it did in the list
+                latest = {(rec.get("user_id"), str(rec["id"])): rec for rec in records if rec.get("user_id") is not None}
+                for (user_id, key), rec in latest.items():
+                    metadata = rec.get("metadata") or {}
+                    memory_id = int(key) if key.isdigit() and (user_id, int(key)) in memory_ids else None
+                    db.add(models.MemoryVector(
+                        user_id=user_id, key=key, memory_id=memory_id, source=metadata.get("source"),
+                        text=rec["text"], metadata_json=json.dumps(metadata, default=str),
+                        dim=len(rec["vector"]), vector=encode_vector(rec["vector"]),
+                    ))
+                    db.add(models.MemoryVectorChange(user_id=user_id, key=key))
+                db.commit()
+                logger.info("Migrated %d vectors from %s", len(latest), self.legacy_path)
+            os.replace(self.legacy_path, self.legacy_path + ".migrated")
+        except IntegrityError:
+            # Another worker migrated the file at the same time
+            db.rollback()
+        except Exception as e:
+            db.rollback()
+            logger.error("Error migrating legacy vector store: %s", e)
+        finally:
+            db.close()
+
+    def _prune_changes(self):
+        db = SessionLocal()
         try:
-            with open(self.file_path, "wb") as f:
-                pickle.dump(self.data, f)
+            max_seq = db.query(func.max(models.MemoryVectorChange.seq)).scalar()
+            if max_seq is not None and max_seq > settings.VECTOR_CHANGELOG_RETAIN:
+                db.query(models.MemoryVectorChange).filter(
+                    models.MemoryVectorChange.seq <= max_seq - settings.VECTOR_CHANGELOG_RETAIN
+                ).delete(synchronize_session=False)
+                db.commit()
         except Exception as e:
-            print(f"Error saving vector store: {e}")
+            db.rollback()
+            logger.error("Error pruning vector change log: %s", e)
+        finally:
+            db.close()
+
+    # --- Cache ---
+
+    def _fetch_rows(
+        self, db: Session, user_id: int, keys: Optional[Set[str]] = None
+    ) -> Iterator[Tuple[str, str, Dict[str, Any], np.ndarray]]:
+        """
+        The current rows for `keys` (all rows when None) as (key, text, metadata, vector).
+        """
+        query = db.query(
+            models.MemoryVector.key, models.MemoryVector.text,
+            models.MemoryVector.metadata_json, models.MemoryVector.vector,
+        ).filter(models.MemoryVector.user_id == user_id)
+        if keys is None:
+            batches = [query]
+        else:
+            key_list = list(keys)
+            batches = [
+                query.filter(models.MemoryVector.key.in_(key_list[start:start + 500]))
+                for start in range(0, len(key_list), 500)
+            ]
+        for batch in batches:
+            for key, text, metadata_json, blob in batch.yield_per(1000):
+                yield key, text, json.loads(metadata_json or "{}"), decode_vector(blob)
+
+    def _full_load(self, db: Session, user_id: int) -> _UserIndex:
+        # A new index nobody else can see yet, so it is built without its lock
+        index = _UserIndex()
+        # Read the change log position first: anything committed after it is replayed later
+        index.seq = db.query(func.max(models.MemoryVectorChange.seq)).scalar() or 0
+        index.applied = {
+            seq for (seq,) in db.query(models.MemoryVectorChange.seq).filter(
+                models.MemoryVectorChange.user_id == user_id,
+                models.MemoryVectorChange.seq > index.seq - settings.VECTOR_CHANGE_LOOKBACK,
+            )
+        }
+        # Sized up front so a large index is not copied while it grows
+        for dim, count in db.query(models.MemoryVector.dim, func.count()).filter(
+            models.MemoryVector.user_id == user_id
+        ).group_by(models.MemoryVector.dim):
+            if dim:
+                index.blocks[dim] = _Block(dim, capacity=max(count, 16))
+        for key, text, metadata, vector in self._fetch_rows(db, user_id):
+            index.put(key, text, metadata, vector)
+        index.version = next(self._versions)
+        self.full_loads += 1
+        return index
+
+    def _catch_up(self, db: Session, index: _UserIndex, user_id: int) -> bool:
+        """
+        Apply the user's change log entries the index hasn't seen. Seqs are assigned
+        at insert but become visible at commit, so a lower seq can appear after a
+        higher one; re-reading a window of LOOKBACK seqs below the newest applied
+        one and skipping seqs already applied catches those late commits. Returns
+        False if entries the index never saw have been pruned.
+        """
+        with index.lock:
+            floor = index.seq - settings.VECTOR_CHANGE_LOOKBACK
+        oldest = db.query(func.min(models.MemoryVectorChange.seq)).scalar()
+        if oldest is not None and oldest > max(floor, 0) + 1:
+            return False
+        changes = db.query(models.MemoryVectorChange.seq, models.MemoryVectorChange.key).filter(
+            models.MemoryVectorChange.user_id == user_id,
+            models.MemoryVectorChange.seq > floor,
+        ).all()
+        with index.lock:
+            new = [(seq, key) for seq, key in changes if seq not in index.applied]
+        if not new:
+            return True
+        rows = list(self._fetch_rows(db, user_id, {key for _, key in new}))
+
+        with index.lock:
+            # A concurrent refresh that read later may have applied these already;
+            # its rows are at least as new, so only keys with unapplied seqs are written
+            new = [(seq, key) for seq, key in new if seq not in index.applied]
+            keys = {key for _, key in new}
+            found = set()
+            for key, text, metadata, vector in rows:
+                if key in keys:
+                    found.add(key)
+                    index.put(key, text, metadata, vector)
+            for key in keys - found:
+                index.remove(key)
+            if new:
+                index.applied.update(seq for seq, _ in new)
+                index.seq = max(index.seq, max(seq for seq, _ in new))
+                index.applied = {seq for seq in index.applied if seq > index.seq - settings.VECTOR_CHANGE_LOOKBACK}
+                index.version = next(self._versions)
+                self.changes_applied += len(new)
+        return True
+
+    def _refresh(self, user_id: int) -> _UserIndex:
+        """
+        The user's cached index, brought up to date from the change log. The global
+        lock only guards the cache dict; queries run without holding any lock.
+        """
+        with self._cache_lock:
+            index = self._cache.get(user_id)
+            if index is not None:
+                self._cache.move_to_end(user_id)
+
+        db = SessionLocal()
+        try:
+            if index is not None and self._catch_up(db, index, user_id):
+                return index
+
+            loaded = self._full_load(db, user_id)
+            with self._cache_lock:
+                current = self._cache.get(user_id)
+                if current is index:
+                    self._cache[user_id] = current = loaded
+                self._cache.move_to_end(user_id)
+                while len(self._cache) > settings.VECTOR_CACHE_USERS:
+                    self._cache.popitem(last=False)
+            if current is not loaded:
+                # Another thread installed an index meanwhile; it may predate our read
+                self._catch_up(db, current, user_id)
+            return current
+        finally:
+            db.close()
+
+    # --- Writes (caller commits) ---
+
+    def stage_upsert(
+        self,
+        db: Session,
+        user_id: int,
+        key: str,
+        text: str,
+        vector: List[float],
+        metadata: Optional[Dict[str, Any]] = None,
+        memory_id: Optional[int] = None,
+        existing: Optional[models.MemoryVector] = None,
+    ):
+        """
+        Add or replace a record in the caller's transaction.
+        """
+        metadata = metadata or {}
+        row = existing
+        if row is None:
+            row = db.query(models.MemoryVector).filter_by(user_id=user_id, key=key).first()
+        if row is None:
+            row = models.MemoryVector(user_id=user_id, key=key)
+            db.add(row)
+        row.memory_id = memory_id
+        row.source = metadata.get("source")
+        row.text = text
+        row.metadata_json = json.dumps(metadata, default=str)
+        row.dim = len(vector)
+        row.vector = encode_vector(vector)
+        row.updated_at = datetime.utcnow()
+        db.add(models.MemoryVectorChange(user_id=user_id, key=key))
+
+    def stage_delete(self, db: Session, user_id: int, keys: List[str]) -> int:
+        """
+        Delete records in the caller's transaction. Returns the number deleted.
+        """
+        deleted = 0
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            deleted += db.query(models.MemoryVector).filter(
+                models.MemoryVector.user_id == user_id, models.MemoryVector.key.in_(batch)
+            ).delete(synchronize_session=False)
+            db.add_all(models.MemoryVectorChange(user_id=user_id, key=key) for key in batch)
+        return deleted
+
+    # --- Embeddings ---
 
     async def _get_embedding(self, text: str) -> List[float]:
         url = f"{self.base_url}/api/embeddings"
@@ -35,91 +385,294 @@ class VectorStore:
             "model": self.model,
             "prompt": text
         }
+        started = time.perf_counter()
         try:
             async with httpx.AsyncClient() as client:
                 response = await client.post(url, json=payload, timeout=30.0)
                 response.raise_for_status()
-                return response.json()["embedding"]
+                embedding = response.json()["embedding"]
+            embedding_seconds.observe(time.perf_counter() - started, mode="single", outcome="ok")
+            return embedding
         except Exception as e:
-            print(f"Error getting embedding from Ollama: {e}")
+            embedding_seconds.observe(time.perf_counter() - started, mode="single", outcome="error")
+            logger.error("Error getting embedding from Ollama: %s", e)
             return [0.0] * 4096
 
+    async def _get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a batch in one request via /api/embed, falling back to one
+        /api/embeddings call per text on Ollama versions without it. Raises on failure.
+        """
+        started = time.perf_counter()
+        try:
+            vectors = await self._request_embeddings(texts)
+        except Exception:
+            embedding_seconds.observe(time.perf_counter() - started, mode="batch", outcome="error")
+            raise
+        embedding_seconds.observe(time.perf_counter() - started, mode="batch", outcome="ok")
+        return vectors
+
+    async def _request_embeddings(self, texts: List[str]) -> List[List[float]]:
+        async with httpx.AsyncClient() as client:
+            response = await client.post(
+                f"{self.base_url}/api/embed",
+                json={"model": self.model, "input": texts},
+                timeout=120.0
+            )
+            if response.status_code != 404:
+                response.raise_for_status()
+                return response.json()["embeddings"]
+
+            vectors = []
+            for text in texts:
+                response = await client.post(
+                    f"{self.base_url}/api/embeddings",
+                    json={"model": self.model, "prompt": text},
+                    timeout=30.0
+                )
+                response.raise_for_status()
+                vectors.append(response.json()["embedding"])
+            return vectors
+
+    # --- Public API ---
+
+    async def remember(self, db: Session, user_id: int, text: str, metadata: Optional[Dict[str, Any]] = None) -> models.Memory:
+        """
+        Create a Memory row and its vector in one transaction. A near-duplicate of
+        an existing memory (MEMORY_DEDUP_THRESHOLD) updates that one in place
+        with the new wording instead.
+        """
+        self._ensure_loaded()
+        vector = await self._get_embedding(text)
+        if settings.MEMORY_DEDUP_THRESHOLD > 0:
+            match = await asyncio.to_thread(self._nearest_memory, vector, user_id)
+            if match is not None and match[1] >= settings.MEMORY_DEDUP_THRESHOLD:
+                memory = self._merge_into(db, user_id, int(match[0]), text, vector, metadata)
+                if memory is not None:
+                    return memory
+        memory = models.Memory(content=text, user_id=user_id)
+        db.add(memory)
+        db.flush()
+        self.stage_upsert(
+            db, user_id, str(memory.id), text, vector,
+            {"created_at": str(memory.created_at), **(metadata or {})}, memory_id=memory.id
+        )
+        db.commit()
+        return memory
+
+    def _merge_into(
+        self,
+        db: Session,
+        user_id: int,
+        memory_id: int,
+        text: str,
+        vector: List[float],
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Optional[models.Memory]:
+        memory = db.query(models.Memory).filter(
+            models.Memory.id == memory_id, models.Memory.user_id == user_id
+        ).first()
+        row = db.query(models.MemoryVector).filter_by(user_id=user_id, key=str(memory_id)).first()
+        if memory is None or row is None:
+            # Deleted since the search
+            return None
+        previous = json.loads(row.metadata_json or "{}")
+        memory.content = text
+        self.stage_upsert(
+            db, user_id, str(memory_id), text, vector,
+            {**previous, **(metadata or {}), "duplicates": previous.get("duplicates", 0) + 1},
+            memory_id=memory_id, existing=row,
+        )
+        db.commit()
+        self.duplicates_merged += 1
+        memory_duplicates_merged.inc(stage="insert")
+        return memory
+
+    async def add_memories(self, user_id: int, items: List[Dict[str, Any]]):
+        """
+        Embed and store many records ({"id", "text", "metadata"}) in one transaction.
+        """
+        self._ensure_loaded()
+        vectors = await self._get_embeddings([item["text"] for item in items])
+        db = SessionLocal()
+        try:
+            # Last item wins for a key repeated within the batch
+            latest = {str(item["id"]): (item, vector) for item, vector in zip(items, vectors)}
+            existing = {
+                row.key: row for row in db.query(models.MemoryVector).filter(
+                    models.MemoryVector.user_id == user_id, models.MemoryVector.key.in_(list(latest))
+                )
+            }
+            for key, (item, vector) in latest.items():
+                row = existing.get(key)
+                if row is None:
+                    row = models.MemoryVector(user_id=user_id, key=key)
+                    db.add(row)
+                self.stage_upsert(db, user_id, key, item["text"], vector, item.get("metadata"), existing=row)
+            db.commit()
+        finally:
+            db.close()
+
+    def delete_by_source(self, source: str, user_id: int, keep_job_id: Optional[str] = None) -> int:
+        """
+        Remove every ingested chunk of a source for a user, except those written by
+        ingestion job `keep_job_id`. Returns the number removed.
+        """
+        self._ensure_loaded()
+        db = SessionLocal()
+        try:
+            keys = [key for (key,) in db.query(models.MemoryVector.key).filter(
+                models.MemoryVector.user_id == user_id, models.MemoryVector.source == source
+            )]
+            if keep_job_id is not None:
+                keys = [key for key in keys if not key.startswith(f"doc:{keep_job_id}:")]
+            removed = self.stage_delete(db, user_id, keys) if keys else 0
+            db.commit()
+            return removed
+        finally:
+            db.close()
+
+    def delete_keys(self, user_id: int, keys: List[str]) -> int:
+        """
+        Remove records by key in one transaction. Returns the number removed.
+        """
+        self._ensure_loaded()
+        db = SessionLocal()
+        try:
+            removed = self.stage_delete(db, user_id, keys) if keys else 0
+            db.commit()
+            return removed
+        finally:
+            db.close()
+
     async def add_memory(self, memory_id: str, text: str, user_id: int, metadata: Dict[str, Any] = {}):
-        # Check if exists and update, or append
+        self._ensure_loaded()
         vector = await self._get_embedding(text)
-        
-        # Remove existing if any
-        self.delete_memory(memory_id, user_id)
-        
-        record = {
-            "id": str(memory_id),
-            "text": text,
-            "user_id": user_id,
-            "metadata": metadata,
-            "vector": vector
-        }
-        self.data.append(record)
-        self._save()
+        db = SessionLocal()
+        try:
+            self.stage_upsert(db, user_id, str(memory_id), text, vector, metadata)
+            db.commit()
+        finally:
+            db.close()
 
-    async def search_memory(self, query: str, user_id: int, n_results: int = 5) -> List[Dict[str, Any]]:
-        query_vector = await self._get_embedding(query)
-        if not self.data:
+    def _search(self, query_vector: List[float], user_id: int, n_results: int) -> List[Dict[str, Any]]:
+        q_vec = np.asarray(query_vector, dtype=np.float32)
+        q_norm = np.linalg.norm(q_vec)
+        index = self._refresh(user_id)
+        if q_norm == 0:
             return []
 
-        # Filter by user_id
-        user_memories = [rec for rec in self.data if rec.get("user_id") == user_id]
-        if not user_memories:
-            return []
+        with index.lock:
+            keys, matrix, _ = index.matrix(len(q_vec))
+            if matrix is None:
+                return []
+            similarities = matrix @ (q_vec / q_norm)
+            top_k = min(n_results, len(keys))
+            top = np.argpartition(-similarities, top_k - 1)[:top_k]
+            top = top[np.argsort(-similarities[top])]
+
+            formatted_results = []
+            for i in top:
+                text, metadata = index.records[keys[i]]
+                formatted_results.append({
+                    "id": keys[i],
+                    "text": text,
+                    "metadata": metadata
+                })
+        return formatted_results
 
-        # Calculate similarities
-        results = []
-        q_vec = np.array(query_vector)
+    def _nearest_memory(self, vector: List[float], user_id: int) -> Optional[Tuple[str, float]]:
+        """
+        Key and cosine similarity of the user's memory closest to `vector`.
+        """
+        q_vec = np.asarray(vector, dtype=np.float32)
         q_norm = np.linalg.norm(q_vec)
-        
         if q_norm == 0:
+            # Failed embedding
+            return None
+        index = self._refresh(user_id)
+        with index.lock:
+            keys, matrix, mask = index.matrix(len(q_vec))
+            if matrix is None or not mask.any():
+                return None
+            similarities = np.where(mask, matrix @ (q_vec / q_norm), -np.inf)
+            best = int(np.argmax(similarities))
+            return keys[best], float(similarities[best])
+
+    def memory_records(self, user_id: int) -> List[Tuple[str, str, Dict[str, Any], np.ndarray]]:
+        """
+        The user's memories (not document chunks) as (key, text, metadata, unit vector).
+        """
+        self._ensure_loaded()
+        index = self._refresh(user_id)
+        with index.lock:
+            return [
+                (key, text, metadata, index.vector(key))
+                for key, (text, metadata) in index.records.items() if is_memory(key, metadata)
+            ]
+
+    async def embed(self, text: str) -> List[float]:
+        """
+        Embedding of `text`, all zeros if Ollama fails.
+        """
+        return await self._get_embedding(text)
+
+    async def search_memory(
+        self,
+        query: str,
+        user_id: int,
+        n_results: int = 5,
+        query_vector: Optional[List[float]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        The `n_results` records closest to `query`. Pass `query_vector` when the
+        caller has already embedded the query.
+        """
+        self._ensure_loaded()
+        if n_results <= 0:
             return []
+        if query_vector is None:
+            query_vector = await self._get_embedding(query)
+        return await asyncio.to_thread(self._search, query_vector, user_id, n_results)
 
-        for rec in user_memories:
-            doc_vec = np.array(rec["vector"])
-            doc_norm = np.linalg.norm(doc_vec)
-            if doc_norm == 0:
-                similarity = 0.0
-            else:
-                # Handle dimension mismatch if model changed
-                if len(q_vec) != len(doc_vec):
-                   continue 
-
-                similarity = np.dot(q_vec, doc_vec) / (q_norm * doc_norm)
-            
-            results.append({
-                "similarity": similarity,
-                "record": rec
-            })
-        
-        # Sort by similarity desc
-        results.sort(key=lambda x: x["similarity"], reverse=True)
-        top_k = results[:n_results]
-
-        # Format
-        formatted_results = []
-        for item in top_k:
-            rec = item["record"]
-            formatted_results.append({
-                "id": rec["id"],
-                "text": rec["text"],
-                "metadata": rec["metadata"]
-            })
-            
-        return formatted_results
+    def memory_version(self, user_id: int) -> Optional[int]:
+        """
+        Version of the user's cached index, which moves whenever a change to
+        their records is applied (a late-committing lower seq included). None
+        if the user isn't cached; call after a search.
+        """
+        with self._cache_lock:
+            index = self._cache.get(user_id)
+            return index.version if index is not None else None
 
-    def delete_memory(self, memory_id: str, user_id: int):
-        # Filter out the item with matching id and user_id
-        original_len = len(self.data)
-        self.data = [
-            rec for rec in self.data 
-            if not (rec["id"] == str(memory_id) and rec.get("user_id") == user_id)
-        ]
-        if len(self.data) != original_len:
-            self._save()
+    def delete_memory(self, memory_id: str, user_id: int, db: Optional[Session] = None):
+        """
+        Delete one record, in the caller's transaction when `db` is given.
+        """
+        self._ensure_loaded()
+        if db is not None:
+            self.stage_delete(db, user_id, [str(memory_id)])
+            return
+        db = SessionLocal()
+        try:
+            self.stage_delete(db, user_id, [str(memory_id)])
+            db.commit()
+        finally:
+            db.close()
+
+    def cached_sizes(self) -> Dict[int, int]:
+        """
+        Vectors per user for the users currently in this process's cache.
+        """
+        with self._cache_lock:
+            return {user_id: len(index.records) for user_id, index in self._cache.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cached_users": len(self._cache),
+            "full_loads": self.full_loads,
+            "changes_applied": self.changes_applied,
+            "duplicates_merged": self.duplicates_merged,
+        }
 
 vector_store = VectorStore()
@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import threading
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db import models
+from app.db.base import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+RollupKey = Tuple[int, datetime, str, str]
+
+
+def hour_bucket(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+class AuditLogSink:
+    """
+    Buffers security events in memory and writes them in batches: one transaction
+    per flush inserts the SecurityLog rows and bumps the hourly rollup counters. The
+    buffer is bounded, so a burst beyond it drops the oldest events (counted in
+    `dropped`) instead of growing without limit.
+    """
+
+    def __init__(self, max_buffer: int, batch_size: int):
+        self.batch_size = batch_size
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=max_buffer)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.recorded = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.flush_errors = 0
+
+    def record(self, user_id: Optional[int], action: str, content: str, reason: str):
+        event = {
+            "user_id": user_id,
+            "action": action,
+            "content": content[:500],  # Truncate if too long
+            "reason": reason,
+            "created_at": datetime.utcnow(),
+        }
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append(event)
+            self.recorded += 1
+            full = len(self._buffer) >= self.batch_size
+        if full and self._loop is not None:
+            # Don't wait for the timer when a burst fills a batch
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def _take(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            events = list(self._buffer)
+            self._buffer.clear()
+        return events
+
+    def _requeue(self, events: List[Dict[str, Any]]):
+        with self._lock:
+            # Older events go back in front of anything recorded meanwhile
+            newer = list(self._buffer)
+            self._buffer.clear()
+            for event in events + newer:
+                if len(self._buffer) == self._buffer.maxlen:
+                    self.dropped += 1
+                self._buffer.append(event)
+
+    def _upsert_rollups(self, db: Session, counts: "Counter[RollupKey]"):
+        rows = [
+            {"user_id": user_id, "bucket_start": bucket, "action": action, "reason": reason, "count": count}
+            for (user_id, bucket, action, reason), count in counts.items()
+        ]
+        dialect = db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            table = models.SecurityViolationRollup.__table__
+            stmt = dialect_insert(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["user_id", "bucket_start", "action", "reason"],
+                set_={"count": table.c.count + stmt.excluded.count},
+            )
+            db.execute(stmt, rows)
+            return
+
+        for row in rows:
+            rollup = db.get(models.SecurityViolationRollup, (row["user_id"], row["bucket_start"], row["action"], row["reason"]))
+            if rollup is None:
+                db.add(models.SecurityViolationRollup(**row))
+            else:
+                rollup.count += row["count"]
+
+    def flush(self) -> int:
+        """
+        Write everything buffered so far. Returns the number of events written; on
+        failure the events go back into the buffer for the next attempt.
+        """
+        with self._flush_lock:
+            events = self._take()
+            if not events:
+                return 0
+            counts: "Counter[RollupKey]" = Counter(
+                (event["user_id"] or 0, hour_bucket(event["created_at"]), event["action"], event["reason"] or "")
+                for event in events
+            )
+            db = SessionLocal()
+            try:
+                db.execute(insert(models.SecurityLog), events)
+                self._upsert_rollups(db, counts)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                self.flush_errors += 1
+                self._requeue(events)
+                logger.error("Error flushing security audit log: %s", e)
+                return 0
+            finally:
+                db.close()
+            self.flushed += len(events)
+            return len(events)
+
+    def backfill(self) -> int:
+        """
+        Build the rollups from existing SecurityLog rows if they have never been built.
+        """
+        with self._flush_lock:
+            db = SessionLocal()
+            try:
+                if db.query(models.SecurityViolationRollup).first() is not None:
+                    return 0
+                counts: "Counter[RollupKey]" = Counter()
+                rows = db.query(
+                    models.SecurityLog.user_id, models.SecurityLog.created_at,
+                    models.SecurityLog.action, models.SecurityLog.reason,
+                ).yield_per(1000)
+                for user_id, created_at, action, reason in rows:
+                    counts[(user_id or 0, hour_bucket(created_at), action or "", reason or "")] += 1
+                if counts:
+                    self._upsert_rollups(db, counts)
+                    db.commit()
+                return sum(counts.values())
+            finally:
+                db.close()
+
+    async def run_periodically(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.AUDIT_LOG_FLUSH_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await asyncio.to_thread(self.flush)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "buffered": len(self._buffer),
+            "max_buffer": self._buffer.maxlen,
+            "recorded": self.recorded,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "flush_errors": self.flush_errors,
+        }
+
+
+def violation_counts(
+    db: Session,
+    since: datetime,
+    bucket: str = "hour",
+    user_id: Optional[int] = None,
+    action: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Violation counts per user and hour (or day) bucket, read from the rollups.
+    """
+    rollup = models.SecurityViolationRollup
+    bucket_column = rollup.bucket_start if bucket == "hour" else func.date(rollup.bucket_start)
+    query = db.query(rollup.user_id, bucket_column.label("bucket"), func.sum(rollup.count).label("count"))
+    query = query.filter(rollup.bucket_start >= hour_bucket(since))
+    if user_id is not None:
+        query = query.filter(rollup.user_id == user_id)
+    if action is not None:
+        query = query.filter(rollup.action == action)
+    rows = query.group_by(rollup.user_id, "bucket").order_by("bucket", rollup.user_id).all()
+    return [{"user_id": row.user_id, "bucket": str(row.bucket), "count": row.count} for row in rows]
+
+
+def top_violators(db: Session, since: datetime, limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Users with the most violations since `since`, with their most frequent reason.
+    """
+    rollup = models.SecurityViolationRollup
+    totals = (
+        db.query(rollup.user_id, func.sum(rollup.count).label("count"))
+        .filter(rollup.bucket_start >= hour_bucket(since))
+        .group_by(rollup.user_id)
+        .order_by(func.sum(rollup.count).desc())
+        .limit(limit)
+        .all()
+    )
+    results = []
+    for user_id, count in totals:
+        reason, _ = (
+            db.query(rollup.reason, func.sum(rollup.count))
+            .filter(rollup.user_id == user_id, rollup.bucket_start >= hour_bucket(since))
+            .group_by(rollup.reason)
+            .order_by(func.sum(rollup.count).desc())
+            .first()
+        )
+        results.append({"user_id": user_id, "count": count, "top_reason": reason})
+    return results
+
+
+audit_log = AuditLogSink(
+    max_buffer=settings.AUDIT_LOG_BUFFER_SIZE,
+    batch_size=settings.AUDIT_LOG_BATCH_SIZE,
+)
@@ -1,17 +1,98 @@
-from typing import List
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+from app.services.safety.matcher import Rule, RuleMatch, RuleSet, StreamScanner, load_rules
+
+logger = logging.getLogger(__name__)
 
 FORBIDDEN_KEYWORDS = ["rm -rf", "delete database", "drop table", "system32"]
 
 class SafetyGuardian:
+    """
+    Checks text against the built-in keywords plus the rules in SAFETY_RULES_PATH.
+    The rule file is re-read when its mtime changes, so rules can be edited
+    without a restart.
+    """
+
+    def __init__(self, rules_path: Optional[str] = None):
+        self.rules_path = rules_path
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._last_check = 0.0
+        self.loaded_at: Optional[float] = None
+        self.load_error: Optional[str] = None
+        self.ruleset = RuleSet(self._builtin_rules())
+        # Streamed output moderation overhead
+        self.stream_chunks = 0
+        self.stream_seconds = 0.0
+        self.stream_cutoffs = 0
+
+    @staticmethod
+    def _builtin_rules() -> List[Rule]:
+        return [Rule(id=keyword, pattern=keyword) for keyword in FORBIDDEN_KEYWORDS]
+
+    def reload(self) -> Dict[str, Any]:
+        """
+        Recompile the rule set. On error the previous rules stay active.
+        """
+        with self._lock:
+            rules = self._builtin_rules()
+            mtime = None
+            try:
+                if self.rules_path:
+                    mtime = os.path.getmtime(self.rules_path)
+                    rules += load_rules(self.rules_path)
+                self.ruleset = RuleSet(rules)
+                self._mtime = mtime
+                self.loaded_at = time.time()
+                self.load_error = None
+            except (OSError, ValueError) as e:
+                logger.error("Error loading safety rules from %s: %s", self.rules_path, e)
+                self.load_error = str(e)
+                # Don't retry the same broken file on every check
+                self._mtime = mtime
+            self._last_check = time.monotonic()
+        return self.stats()
+
+    def _maybe_reload(self):
+        if not self.rules_path or time.monotonic() - self._last_check < settings.SAFETY_RULES_RELOAD_SECONDS:
+            return
+        self._last_check = time.monotonic()
+        try:
+            mtime = os.path.getmtime(self.rules_path)
+        except OSError:
+            mtime = None
+        if mtime != self._mtime or self.loaded_at is None:
+            self.reload()
+
+    def find_violation(self, text: str) -> Optional[RuleMatch]:
+        """
+        The first rule the text violates, or None if it is safe.
+        """
+        self._maybe_reload()
+        return self.ruleset.find(text)
+
     def check_input(self, text: str) -> bool:
         """
         Check if input contains safe content. Returns True if safe, False if unsafe.
         """
-        text_lower = text.lower()
-        for keyword in FORBIDDEN_KEYWORDS:
-            if keyword in text_lower:
-                return False
-        return True
+        return self.find_violation(text) is None
+
+    def stream_scanner(self) -> StreamScanner:
+        """
+        Scanner for one streamed response, bound to the rules active when it starts.
+        """
+        self._maybe_reload()
+        return StreamScanner(self.ruleset, settings.SAFETY_STREAM_REGEX_WINDOW)
+
+    def record_stream(self, chunks: int, seconds: float, cut_off: bool):
+        self.stream_chunks += chunks
+        self.stream_seconds += seconds
+        if cut_off:
+            self.stream_cutoffs += 1
 
     def check_tool_execution(self, tool_name: str, args: dict) -> bool:
         """
@@ -24,4 +105,16 @@ class SafetyGuardian:
                 return False
         return True
 
-safety_guardian = SafetyGuardian()
+    def stats(self) -> Dict[str, Any]:
+        stats = self.ruleset.stats()
+        stats.update({
+            "rules_path": self.rules_path,
+            "loaded_at": self.loaded_at,
+            "load_error": self.load_error,
+            "stream_chunks": self.stream_chunks,
+            "stream_cutoffs": self.stream_cutoffs,
+            "stream_us_per_chunk": self.stream_seconds / self.stream_chunks * 1e6 if self.stream_chunks else 0.0,
+        })
+        return stats
+
+safety_guardian = SafetyGuardian(settings.SAFETY_RULES_PATH)
@@ -0,0 +1,221 @@
+import json
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MEMO_TRANSITIONS_PER_STATE = 4
+
+
+@dataclass(frozen=True)
+class Rule:
+    id: str
+    pattern: str
+    kind: str = "keyword"  # keyword (case-insensitive substring) or regex
+    description: str = ""
+
+
+@dataclass(frozen=True)
+class RuleMatch:
+    rule: Rule
+    start: int
+    end: int
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over lowercased keywords. Scanning costs amortized O(1)
+    per character however many keywords are loaded, and the state can be carried
+    from one chunk of text to the next.
+    """
+
+    def __init__(self, keywords: Iterable[Tuple[str, int]]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        # Index (into the caller's rule list) of a keyword ending at this state or any
+        # of its suffix states, -1 for none
+        self.output: List[int] = [-1]
+        self.lengths: Dict[int, int] = {}
+
+        for keyword, index in keywords:
+            keyword = keyword.lower()
+            if not keyword:
+                continue
+            state = 0
+            for ch in keyword:
+                next_state = self.goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][ch] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(-1)
+                state = next_state
+            if self.output[state] == -1:
+                self.output[state] = index
+                self.lengths[index] = len(keyword)
+
+        # Breadth-first failure links; outputs are inherited from the failure state
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for ch, child in self.goto[state].items():
+                queue.append(child)
+                if state:
+                    fallback = self.fail[state]
+                    while fallback and ch not in self.goto[fallback]:
+                        fallback = self.fail[fallback]
+                    self.fail[child] = self.goto[fallback].get(ch, 0)
+                if self.output[child] == -1:
+                    self.output[child] = self.output[self.fail[child]]
+
+        self._memo_budget = MEMO_TRANSITIONS_PER_STATE * len(self.goto)
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def scan(self, text: str, state: int = 0) -> Tuple[Optional[Tuple[int, int]], int]:
+        """
+        Feed `text` (already lowercased) starting from `state`. Returns
+        ((keyword index, end offset) or None, new state) and stops at the first match.
+        """
+        goto, fail, output = self.goto, self.fail, self.output
+        for position, ch in enumerate(text):
+            next_state = goto[state].get(ch)
+            if next_state is None:
+                fallback = state
+                while fallback and ch not in goto[fallback]:
+                    fallback = fail[fallback]
+                next_state = goto[fallback].get(ch, 0)
+                # Remember the resolved transition (a lazily built DFA) so hot paths
+                # cost one lookup per character; capped so odd input can't grow it unbounded
+                if self._memo_budget > 0:
+                    goto[state][ch] = next_state
+                    self._memo_budget -= 1
+            state = next_state
+            if output[state] != -1:
+                return (output[state], position + 1), state
+        return None, state
+
+
+class RuleSet:
+    """
+    Compiled rules: keywords go into one automaton, regex rules into a single
+    alternation so each tier makes one pass over the text.
+    """
+
+    def __init__(self, rules: List[Rule]):
+        self.rules = rules
+        keyword_rules = [(rule.pattern, i) for i, rule in enumerate(rules) if rule.kind == "keyword"]
+        self.automaton = KeywordAutomaton(keyword_rules)
+
+        self.regex_rules: Dict[str, Rule] = {}
+        alternatives = []
+        for i, rule in enumerate(rules):
+            if rule.kind == "regex":
+                group = f"r{i}"
+                self.regex_rules[group] = rule
+                alternatives.append(f"(?P<{group}>{rule.pattern})")
+        self.regex = re.compile("|".join(alternatives), re.IGNORECASE) if alternatives else None
+
+    def find(self, text: str) -> Optional[RuleMatch]:
+        """
+        First violated rule, or None. Keywords are checked before regexes.
+        """
+        found, _ = self.automaton.scan(text.lower())
+        if found is not None:
+            index, end = found
+            return RuleMatch(self.rules[index], end - self.automaton.lengths[index], end)
+        if self.regex is not None:
+            match = self.regex.search(text)
+            if match is not None:
+                return RuleMatch(self.regex_rules[match.lastgroup], match.start(), match.end())
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "rules": len(self.rules),
+            "keywords": len(self.automaton),
+            "regexes": len(self.regex_rules),
+            "automaton_states": len(self.automaton.goto),
+        }
+
+
+class StreamScanner:
+    """
+    Incremental check of streamed text. The automaton state carries over between
+    chunks, so a keyword split across tokens is still caught, and each chunk costs
+    O(len(chunk)). Regex rules are re-run over the chunk plus a fixed-size tail of
+    earlier text, so regex matches longer than that window can be missed.
+    """
+
+    def __init__(self, ruleset: RuleSet, regex_window: int = 256):
+        self.ruleset = ruleset
+        self.regex_window = regex_window
+        self.state = 0
+        self.offset = 0  # characters consumed before the current chunk
+        self.tail = ""
+
+    def feed(self, chunk: str) -> Optional[RuleMatch]:
+        automaton = self.ruleset.automaton
+        found, self.state = automaton.scan(chunk.lower(), self.state)
+        if found is not None:
+            index, end = found
+            end += self.offset
+            return RuleMatch(self.ruleset.rules[index], end - automaton.lengths[index], end)
+
+        regex = self.ruleset.regex
+        if regex is not None:
+            window = self.tail + chunk
+            window_start = self.offset - len(self.tail)
+            # Only matches reaching into the new chunk; earlier ones were already checked
+            match = regex.search(window)
+            while match is not None and match.end() <= len(self.tail):
+                match = regex.search(window, match.start() + 1)
+            if match is not None:
+                return RuleMatch(
+                    self.ruleset.regex_rules[match.lastgroup],
+                    window_start + match.start(),
+                    window_start + match.end(),
+                )
+            self.tail = window[-self.regex_window:] if self.regex_window else ""
+
+        self.offset += len(chunk)
+        return None
+
+
+def load_rules(path: str) -> List[Rule]:
+    """
+    Read rules from a JSON list of {id, pattern, kind, description} objects, or from
+    a text file with one keyword per line ("re:" prefix for regexes, "#" comments).
+    Regexes are compiled here so a bad pattern fails the load, not a request.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+
+    rules = []
+    if path.endswith(".json"):
+        for i, entry in enumerate(json.loads(content)):
+            rules.append(Rule(
+                id=str(entry.get("id") or f"rule-{i + 1}"),
+                pattern=entry["pattern"],
+                kind=entry.get("kind", "keyword"),
+                description=entry.get("description", ""),
+            ))
+    else:
+        for line in content.splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("re:"):
+                rules.append(Rule(id=line, pattern=line[3:], kind="regex"))
+            else:
+                rules.append(Rule(id=line, pattern=line))
+
+    for rule in rules:
+        if rule.kind not in ("keyword", "regex"):
+            raise ValueError(f"Rule '{rule.id}' has unknown kind '{rule.kind}'")
+        if rule.kind == "regex":
+            try:
+                re.compile(rule.pattern)
+            except re.error as e:
+                raise ValueError(f"Rule '{rule.id}' has an invalid regex: {e}")
+    return rules
@@ -0,0 +1,403 @@
+import logging
+from typing import Iterable, List, Dict, Any, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Each indexed row gets a stable document id of `ref_id * 3 + offset`, so triggers can
+# update or delete a single document by primary key instead of scanning the index.
+SOURCES = {
+    "message": {"table": "messages", "offset": 0},
+    "note": {"table": "notes", "offset": 1},
+    "memory": {"table": "memories", "offset": 2},
+}
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+
+# --- SQLite (FTS5) ---
+
+SQLITE_SELECTS = {
+    "message": (
+        "SELECT m.id * 3, NULL, m.content, 'message', m.id, c.user_id, m.conversation_id "
+        "FROM messages m JOIN conversations c ON c.id = m.conversation_id"
+    ),
+    "note": "SELECT n.id * 3 + 1, n.title, n.content, 'note', n.id, n.user_id, NULL FROM notes n",
+    "memory": "SELECT mem.id * 3 + 2, NULL, mem.content, 'memory', mem.id, mem.user_id, NULL FROM memories mem",
+}
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        title, body,
+        kind UNINDEXED, ref_id UNINDEXED, user_id UNINDEXED, conversation_id UNINDEXED,
+        tokenize = 'porter unicode61'
+    )
+    """,
+    # Messages. Archiving deletes them but keeps their documents, so archived
+    # conversations stay searchable and a restore replaces the kept document.
+    "DROP TRIGGER IF EXISTS search_messages_ai",
+    "DROP TRIGGER IF EXISTS search_messages_ad",
+    """
+    CREATE TRIGGER search_messages_ai AFTER INSERT ON messages BEGIN
+        DELETE FROM search_index WHERE rowid = NEW.id * 3;
+        INSERT INTO search_index(rowid, title, body, kind, ref_id, user_id, conversation_id)
+        SELECT NEW.id * 3, NULL, NEW.content, 'message', NEW.id, c.user_id, NEW.conversation_id
+        FROM conversations c WHERE c.id = NEW.conversation_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_messages_au AFTER UPDATE OF content ON messages BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 3;
+        INSERT INTO search_index(rowid, title, body, kind, ref_id, user_id, conversation_id)
+        SELECT NEW.id * 3, NULL, NEW.content, 'message', NEW.id, c.user_id, NEW.conversation_id
+        FROM conversations c WHERE c.id = NEW.conversation_id;
+    END
+    """,
+    """
+    CREATE TRIGGER search_messages_ad AFTER DELETE ON messages
+    WHEN NOT EXISTS (SELECT 1 FROM conversation_archives WHERE conversation_id = OLD.conversation_id)
+    BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 3;
+    END
+    """,
+    # Notes
+    """
+    CREATE TRIGGER IF NOT EXISTS search_notes_ai AFTER INSERT ON notes BEGIN
+        INSERT INTO search_index(rowid, title, body, kind, ref_id, user_id, conversation_id)
+        VALUES (NEW.id * 3 + 1, NEW.title, NEW.content, 'note', NEW.id, NEW.user_id, NULL);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_notes_au AFTER UPDATE OF title, content ON notes BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 3 + 1;
+        INSERT INTO search_index(rowid, title, body, kind, ref_id, user_id, conversation_id)
+        VALUES (NEW.id * 3 + 1, NEW.title, NEW.content, 'note', NEW.id, NEW.user_id, NULL);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_notes_ad AFTER DELETE ON notes BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 3 + 1;
+    END
+    """,
+    # Memories
+    """
+    CREATE TRIGGER IF NOT EXISTS search_memories_ai AFTER INSERT ON memories BEGIN
+        INSERT INTO search_index(rowid, title, body, kind, ref_id, user_id, conversation_id)
+        VALUES (NEW.id * 3 + 2, NULL, NEW.content, 'memory', NEW.id, NEW.user_id, NULL);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_memories_au AFTER UPDATE OF content ON memories BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 3 + 2;
+        INSERT INTO search_index(rowid, title, body, kind, ref_id, user_id, conversation_id)
+        VALUES (NEW.id * 3 + 2, NULL, NEW.content, 'memory', NEW.id, NEW.user_id, NULL);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_memories_ad AFTER DELETE ON memories BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 3 + 2;
+    END
+    """,
+]
+
+# --- PostgreSQL (tsvector) ---
+
+POSTGRES_SELECTS = {
+    "message": (
+        "SELECT m.id * 3, 'message', m.id, c.user_id, m.conversation_id, NULL, m.content "
+        "FROM messages m JOIN conversations c ON c.id = m.conversation_id"
+    ),
+    "note": "SELECT n.id * 3 + 1, 'note', n.id, n.user_id, NULL, n.title, n.content FROM notes n",
+    "memory": "SELECT mem.id * 3 + 2, 'memory', mem.id, mem.user_id, NULL, NULL, mem.content FROM memories mem",
+}
+
+POSTGRES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS search_documents (
+        id BIGINT PRIMARY KEY,
+        kind VARCHAR(16) NOT NULL,
+        ref_id INTEGER NOT NULL,
+        user_id INTEGER,
+        conversation_id INTEGER,
+        title TEXT,
+        body TEXT,
+        document tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(body, '')), 'B')
+        ) STORED
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_search_documents_document ON search_documents USING GIN (document)",
+    "CREATE INDEX IF NOT EXISTS ix_search_documents_user_id ON search_documents (user_id)",
+    """
+    CREATE OR REPLACE FUNCTION search_messages_sync() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            -- Archived messages keep their documents
+            IF NOT EXISTS (SELECT 1 FROM conversation_archives WHERE conversation_id = OLD.conversation_id) THEN
+                DELETE FROM search_documents WHERE id = OLD.id * 3;
+            END IF;
+            RETURN OLD;
+        END IF;
+        INSERT INTO search_documents (id, kind, ref_id, user_id, conversation_id, title, body)
+        SELECT NEW.id * 3, 'message', NEW.id, c.user_id, NEW.conversation_id, NULL, NEW.content
+        FROM conversations c WHERE c.id = NEW.conversation_id
+        ON CONFLICT (id) DO UPDATE SET body = EXCLUDED.body;
+        RETURN NEW;
+    END $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION search_notes_sync() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            DELETE FROM search_documents WHERE id = OLD.id * 3 + 1;
+            RETURN OLD;
+        END IF;
+        INSERT INTO search_documents (id, kind, ref_id, user_id, conversation_id, title, body)
+        VALUES (NEW.id * 3 + 1, 'note', NEW.id, NEW.user_id, NULL, NEW.title, NEW.content)
+        ON CONFLICT (id) DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body;
+        RETURN NEW;
+    END $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION search_memories_sync() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            DELETE FROM search_documents WHERE id = OLD.id * 3 + 2;
+            RETURN OLD;
+        END IF;
+        INSERT INTO search_documents (id, kind, ref_id, user_id, conversation_id, title, body)
+        VALUES (NEW.id * 3 + 2, 'memory', NEW.id, NEW.user_id, NULL, NULL, NEW.content)
+        ON CONFLICT (id) DO UPDATE SET body = EXCLUDED.body;
+        RETURN NEW;
+    END $$ LANGUAGE plpgsql
+    """,
+] + [
+    statement
+    for name, source in SOURCES.items()
+    for statement in (
+        f"DROP TRIGGER IF EXISTS search_{source['table']}_sync ON {source['table']}",
+        f"CREATE TRIGGER search_{source['table']}_sync AFTER INSERT OR UPDATE OR DELETE ON {source['table']} "
+        f"FOR EACH ROW EXECUTE FUNCTION search_{source['table']}_sync()",
+    )
+]
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    Turn free text into a safe FTS5 MATCH expression: every word must match,
+    and the last word also matches as a prefix (search-as-you-type).
+    """
+    terms = [term.replace('"', '""') for term in query.split() if term.strip('"')]
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+class SearchIndex:
+    def supports(self, dialect: str) -> bool:
+        return dialect in ("sqlite", "postgresql")
+
+    def install(self, engine: Engine):
+        """
+        Create the index table and sync triggers if missing, and backfill it
+        when it is empty but the source tables are not (existing databases).
+        """
+        dialect = engine.dialect.name
+        if not self.supports(dialect):
+            logger.warning("Full-text search is not available for dialect '%s'", dialect)
+            return
+
+        ddl = SQLITE_DDL if dialect == "sqlite" else POSTGRES_DDL
+        with engine.begin() as conn:
+            for statement in ddl:
+                conn.execute(text(statement))
+
+        with Session(engine) as db:
+            if self._needs_backfill(db):
+                self.rebuild(db)
+
+    def _index_table(self, dialect: str) -> str:
+        return "search_index" if dialect == "sqlite" else "search_documents"
+
+    def _needs_backfill(self, db: Session) -> bool:
+        table = self._index_table(db.bind.dialect.name)
+        if db.execute(text(f"SELECT 1 FROM {table} LIMIT 1")).first():
+            return False
+        tables = [source["table"] for source in SOURCES.values()] + ["conversation_archives"]
+        return any(db.execute(text(f"SELECT 1 FROM {table} LIMIT 1")).first() for table in tables)
+
+    def rebuild(self, db: Session) -> Dict[str, int]:
+        """
+        Drop and repopulate every document from the source tables and from the
+        messages of archived conversations.
+        """
+        # Imported here: the archiver imports this module
+        from app.services.archive.archiver import conversation_archiver
+
+        dialect = db.bind.dialect.name
+        if not self.supports(dialect):
+            raise RuntimeError(f"Full-text search is not available for dialect '{dialect}'")
+
+        counts = {}
+        if dialect == "sqlite":
+            db.execute(text("DELETE FROM search_index"))
+            for kind, select in SQLITE_SELECTS.items():
+                result = db.execute(text(
+                    "INSERT INTO search_index(rowid, title, body, kind, ref_id, user_id, conversation_id) " + select
+                ))
+                counts[kind] = result.rowcount
+        else:
+            db.execute(text("TRUNCATE search_documents"))
+            for kind, select in POSTGRES_SELECTS.items():
+                result = db.execute(text(
+                    "INSERT INTO search_documents (id, kind, ref_id, user_id, conversation_id, title, body) " + select
+                ))
+                counts[kind] = result.rowcount
+        counts["archived message"] = self.add_documents(db, "message", conversation_archiver.archived_messages(db))
+        if dialect == "sqlite":
+            db.execute(text("INSERT INTO search_index(search_index) VALUES ('optimize')"))
+        db.commit()
+        return counts
+
+    def add_documents(
+        self, db: Session, kind: str, documents: Iterable[Tuple[int, int, Optional[int], Optional[str], str]]
+    ) -> int:
+        """
+        Index documents whose rows are not in their source table, given as
+        (ref_id, user_id, conversation_id, title, body). The caller commits.
+        Returns the number added.
+        """
+        dialect = db.bind.dialect.name
+        if not self.supports(dialect):
+            return 0
+        if dialect == "sqlite":
+            statement = text(
+                "INSERT INTO search_index(rowid, title, body, kind, ref_id, user_id, conversation_id) "
+                "VALUES (:id, :title, :body, :kind, :ref_id, :user_id, :conversation_id)"
+            )
+        else:
+            statement = text(
+                "INSERT INTO search_documents (id, kind, ref_id, user_id, conversation_id, title, body) "
+                "VALUES (:id, :kind, :ref_id, :user_id, :conversation_id, :title, :body) "
+                "ON CONFLICT (id) DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body"
+            )
+        offset = SOURCES[kind]["offset"]
+        added, batch = 0, []
+        for ref_id, user_id, conversation_id, title, body in documents:
+            batch.append({
+                "id": ref_id * 3 + offset, "kind": kind, "ref_id": ref_id, "user_id": user_id,
+                "conversation_id": conversation_id, "title": title, "body": body,
+            })
+            if len(batch) == 500:
+                db.execute(statement, batch)
+                added, batch = added + len(batch), []
+        if batch:
+            db.execute(statement, batch)
+            added += len(batch)
+        return added
+
+    def delete_documents(self, db: Session, kind: str, ref_ids: List[int]):
+        """
+        Remove documents whose rows are gone without their triggers firing, such
+        as the messages of an archived conversation being deleted. The caller commits.
+        """
+        dialect = db.bind.dialect.name
+        if not self.supports(dialect) or not ref_ids:
+            return
+        table = self._index_table(dialect)
+        key = "rowid" if dialect == "sqlite" else "id"
+        offset = SOURCES[kind]["offset"]
+        for start in range(0, len(ref_ids), 500):
+            batch = ref_ids[start:start + 500]
+            params = {f"d_{i}": ref_id * 3 + offset for i, ref_id in enumerate(batch)}
+            placeholders = ", ".join(f":{name}" for name in params)
+            db.execute(text(f"DELETE FROM {table} WHERE {key} IN ({placeholders})"), params)
+
+    def search(
+        self,
+        db: Session,
+        user_id: int,
+        query: str,
+        kinds: Optional[List[str]] = None,
+        skip: int = 0,
+        limit: int = 20,
+    ) -> Dict[str, Any]:
+        """
+        Ranked search scoped to one user. Fetches one extra row to report
+        `has_more` without a separate COUNT over the match set.
+        """
+        dialect = db.bind.dialect.name
+        if not self.supports(dialect):
+            raise RuntimeError(f"Full-text search is not available for dialect '{dialect}'")
+
+        kinds = [k for k in (kinds or SOURCES.keys()) if k in SOURCES]
+        empty = {"items": [], "skip": skip, "limit": limit, "has_more": False}
+        if not kinds:
+            return empty
+
+        params: Dict[str, Any] = {"user_id": user_id, "limit": limit + 1, "skip": skip}
+        kind_params = ", ".join(f":kind_{i}" for i in range(len(kinds)))
+        params.update({f"kind_{i}": kind for i, kind in enumerate(kinds)})
+
+        if dialect == "sqlite":
+            match = build_match_query(query)
+            if match is None:
+                return empty
+            params["match"] = match
+            sql = (
+                "SELECT kind, ref_id, conversation_id, title, "
+                f"snippet(search_index, -1, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '...', 16) AS snippet, "
+                "-bm25(search_index, 2.0, 1.0) AS score "
+                "FROM search_index WHERE search_index MATCH :match "
+                f"AND user_id = :user_id AND kind IN ({kind_params}) "
+                "ORDER BY bm25(search_index, 2.0, 1.0) LIMIT :limit OFFSET :skip"
+            )
+        else:
+            if not query.strip():
+                return empty
+            params["query"] = query
+            sql = (
+                "SELECT kind, ref_id, conversation_id, title, "
+                "ts_headline('english', coalesce(title, '') || ' ' || coalesce(body, ''), q, "
+                f"'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=24, MinWords=8') AS snippet, "
+                "ts_rank(document, q) AS score "
+                "FROM search_documents, websearch_to_tsquery('english', :query) q "
+                f"WHERE user_id = :user_id AND kind IN ({kind_params}) AND document @@ q "
+                "ORDER BY score DESC LIMIT :limit OFFSET :skip"
+            )
+
+        rows = db.execute(text(sql), params).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        # Message hits carry their conversation title, fetched in one query
+        conversation_ids = {row.conversation_id for row in rows if row.conversation_id is not None}
+        titles: Dict[int, str] = {}
+        if conversation_ids:
+            id_params = {f"c_{i}": cid for i, cid in enumerate(conversation_ids)}
+            placeholders = ", ".join(f":{name}" for name in id_params)
+            titles = dict(db.execute(
+                text(f"SELECT id, title FROM conversations WHERE id IN ({placeholders})"), id_params
+            ).all())
+
+        items = [
+            {
+                "kind": row.kind,
+                "id": int(row.ref_id),
+                "conversation_id": row.conversation_id,
+                "title": row.title if row.kind != "message" else titles.get(row.conversation_id),
+                "snippet": row.snippet,
+                "score": float(row.score),
+            }
+            for row in rows
+        ]
+        return {"items": items, "skip": skip, "limit": limit, "has_more": has_more}
+
+
+search_index = SearchIndex()
@@ -1,12 +1,67 @@
+import asyncio
+import dataclasses
+import functools
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Type
+from dataclasses import dataclass
+from typing import Dict, Any, Type, Optional
 from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+def is_error_result(result: Any) -> bool:
+    """
+    Tools report expected failures by returning a message starting with "Error"
+    rather than raising; such results count as failures.
+    """
+    return isinstance(result, str) and result.startswith("Error")
+
+@dataclass
+class ToolContext:
+    """
+    Per-call execution context supplied by the caller, never by the model.
+    """
+    user: Optional[Any] = None  # models.User
+    db: Optional[Session] = None  # request-scoped session; tools must not close it or use it off the event loop
+    deadline: Optional[float] = None  # time.monotonic() value
+
+    @property
+    def user_id(self) -> Optional[int]:
+        return self.user.id if self.user is not None else None
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
 
 class Tool(ABC):
     name: str
     description: str
     args_schema: Type[BaseModel]
+    # Limits enforced by ToolRegistry.aexecute_tool
+    max_concurrency: int = 8
+    timeout: Optional[float] = None  # seconds; None uses TOOL_TIMEOUT_SECONDS
+    # Result memoization applied by the registry: "pure" results depend only on the
+    # arguments, "ttl" results are reused per user for `cache_ttl` seconds, "never"
+    # tools have side effects or their own caching.
+    cache_policy: str = "never"
+    cache_ttl: Optional[float] = None  # seconds; None uses TOOL_RESULT_CACHE_TTL_SECONDS
+    # Run in a sandbox worker process (no context is passed across the process boundary)
+    isolated: bool = False
 
     @abstractmethod
-    def run(self, **kwargs) -> Any:
+    def run(self, context: Optional[ToolContext] = None, **kwargs) -> Any:
         pass
+
+    async def arun(self, context: Optional[ToolContext] = None, **kwargs) -> Any:
+        """
+        Async entry point. Defaults to running the blocking `run` in a worker thread;
+        tools with native async I/O override it. The thread outlives a timeout, and
+        the request closes its session then, so it gets no session and opens its own.
+        """
+        if context is not None and context.db is not None:
+            context = dataclasses.replace(context, db=None)
+        return await asyncio.to_thread(functools.partial(self.run, context=context, **kwargs))
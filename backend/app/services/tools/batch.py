@@ -0,0 +1,83 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List
+from pydantic import BaseModel, Field
+from app.services.tools.base import ToolContext, is_error_result
+from app.services.tools.registry import tool_registry
+
+
+class BatchToolCall(BaseModel):
+    id: str = Field(description="Caller-chosen id, unique within the batch.")
+    name: str
+    arguments: Dict[str, Any] = Field(default_factory=dict)
+    depends_on: List[str] = Field(default_factory=list, description="Ids of calls that must succeed first.")
+
+
+def check_dependencies(calls: List[BatchToolCall]):
+    """
+    Raise ValueError for duplicate ids, unknown dependencies or dependency cycles.
+    """
+    ids = [call.id for call in calls]
+    if len(ids) != len(set(ids)):
+        raise ValueError("Call ids must be unique within a batch")
+    known = set(ids)
+    for call in calls:
+        missing = [dep for dep in call.depends_on if dep not in known]
+        if missing:
+            raise ValueError(f"Call '{call.id}' depends on unknown call(s): {', '.join(missing)}")
+
+    # Kahn's algorithm: anything left unvisited sits on a cycle
+    remaining = {call.id: set(call.depends_on) for call in calls}
+    ready = [call_id for call_id, deps in remaining.items() if not deps]
+    while ready:
+        done = ready.pop()
+        del remaining[done]
+        for call_id, deps in remaining.items():
+            if done in deps:
+                deps.discard(done)
+                if not deps:
+                    ready.append(call_id)
+    if remaining:
+        raise ValueError(f"Dependency cycle between calls: {', '.join(sorted(remaining))}")
+
+
+async def run_batch(calls: List[BatchToolCall], context: ToolContext) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run the calls concurrently, each starting once its dependencies have succeeded,
+    and yield one result per call in completion order. Failures are reported per call;
+    calls depending on a failed call are skipped rather than run.
+    """
+    batch_started = time.monotonic()
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def run_call(call: BatchToolCall) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"id": call.id, "name": call.name}
+        if call.depends_on:
+            outcomes = await asyncio.gather(*(tasks[dep] for dep in call.depends_on))
+            failed = [outcome["id"] for outcome in outcomes if outcome["status"] != "success"]
+            if failed:
+                result.update(status="skipped", error=f"Dependency failed: {', '.join(failed)}")
+                return result
+
+        started = time.monotonic()
+        result["started_ms"] = round((started - batch_started) * 1000, 2)
+        try:
+            output = await tool_registry.aexecute_tool(call.name, call.arguments, context)
+            if is_error_result(output):
+                result.update(status="error", error=output)
+            else:
+                result.update(status="success", result=output)
+        except Exception as e:
+            result.update(status="error", error=str(e))
+        result["duration_ms"] = round((time.monotonic() - started) * 1000, 2)
+        return result
+
+    for call in calls:
+        tasks[call.id] = asyncio.create_task(run_call(call))
+    try:
+        for completed in asyncio.as_completed(list(tasks.values())):
+            yield await completed
+    finally:
+        # Client went away mid-batch: don't leave calls running
+        for task in tasks.values():
+            task.cancel()
@@ -1,34 +1,61 @@
-from typing import Any, Type
+from typing import Any, Type, List, Optional
+from contextlib import contextmanager
 from pydantic import BaseModel, Field
-from duckduckgo_search import DDGS
-from app.services.tools.base import Tool
-import requests
-from bs4 import BeautifulSoup
-try:
-    import fitz  # PyMuPDF
-except ImportError:
-    fitz = None
-import docx
+from app.services.tools.base import Tool, ToolContext
+from app.services.tools.executors import get_http_client
+from app.services.tools.web_reader import fetch_text, afetch_text
+from app.services.tools.search_cache import search_cache
+from app.services.tools.documents import read_document
 import os
 
+# Heavy third-party libraries (duckduckgo_search, requests, fitz, docx) are
+# imported inside run() so importing the registry stays cheap at startup.
+
 class WebSearchInput(BaseModel):
     query: str = Field(description="The query to search for on the web.")
+    max_results: int = Field(5, ge=1, le=25, description="Maximum number of results to return.")
+
+def format_search_results(results: List[dict]) -> str:
+    if not results:
+        return "No results found."
+    return "\n\n".join(
+        [f"Title: {r['title']}\nLink: {r['href']}\nSnippet: {r['body']}" for r in results]
+    )
 
 class WebSearchTool(Tool):
     name = "web_search"
     description = "Search the web for information using DuckDuckGo."
     args_schema = WebSearchInput
+    max_concurrency = 4  # DuckDuckGo rate-limits aggressively
+    timeout = 15.0
+
+    def _search(self, query: str, max_results: int) -> List[dict]:
+        from duckduckgo_search import DDGS
+
+        with DDGS() as ddgs:
+            return list(ddgs.text(query, max_results=max_results))
+
+    async def _asearch(self, query: str, max_results: int) -> List[dict]:
+        from duckduckgo_search import AsyncDDGS
+
+        async with AsyncDDGS() as ddgs:
+            return [r async for r in ddgs.text(query, max_results=max_results)]
+
+    def run(self, query: str, max_results: int = 5, context: Optional[ToolContext] = None) -> str:
+        try:
+            results = search_cache.get_or_fetch(
+                search_cache.key(query, max_results), lambda: self._search(query, max_results)
+            )
+            return format_search_results(results)
+        except Exception as e:
+            return f"Error searching web: {str(e)}"
 
-    def run(self, query: str) -> str:
+    async def arun(self, query: str, max_results: int = 5, context: Optional[ToolContext] = None) -> str:
         try:
-            with DDGS() as ddgs:
-                results = list(ddgs.text(query, max_results=5))
-                if not results:
-                    return "No results found."
-                formatted_results = "\n\n".join(
-                    [f"Title: {r['title']}\nLink: {r['href']}\nSnippet: {r['body']}" for r in results]
-                )
-                return formatted_results
+            results = await search_cache.aget_or_fetch(
+                search_cache.key(query, max_results), lambda: self._asearch(query, max_results)
+            )
+            return format_search_results(results)
         except Exception as e:
             return f"Error searching web: {str(e)}"
 
@@ -39,8 +66,11 @@ class CalculatorTool(Tool):
     name = "calculator"
     description = "Evaluate a mathematical expression."
     args_schema = CalculatorInput
+    timeout = 5.0
+    cache_policy = "pure"
+    isolated = True  # eval of model-supplied input, e.g. 9**9**9
 
-    def run(self, expression: str) -> str:
+    def run(self, expression: str, context: Optional[ToolContext] = None) -> str:
         try:
             return str(eval(expression, {"__builtins__": None}, {}))
         except Exception as e:
@@ -53,175 +83,247 @@ class WebsiteReaderTool(Tool):
     name = "website_reader"
     description = "Read the content of a website."
     args_schema = WebsiteReaderInput
+    max_concurrency = 16
+    timeout = 20.0
+
+    def run(self, url: str, context: Optional[ToolContext] = None) -> str:
+        try:
+            return fetch_text(url)
+        except Exception as e:
+            return f"Error reading website: {str(e)}"
 
-    def run(self, url: str) -> str:
+    async def arun(self, url: str, context: Optional[ToolContext] = None) -> str:
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            text = soup.get_text()
-            
-            # Break into lines and remove leading/trailing space on each
-            lines = (line.strip() for line in text.splitlines())
-            # Break multi-headlines into a line each
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            # Drop blank lines
-            text = '\n'.join(chunk for chunk in chunks if chunk)
-            
-            return text[:5000] + "..." if len(text) > 5000 else text
+            return await afetch_text(get_http_client(), url)
         except Exception as e:
             return f"Error reading website: {str(e)}"
 
 class FileReaderInput(BaseModel):
     file_path: str = Field(description="The absolute path to the file to read (txt, pdf, docx).")
+    start_page: Optional[int] = Field(None, ge=1, description="First page to read, 1-based (PDF only).")
+    end_page: Optional[int] = Field(None, ge=1, description="Last page to read, inclusive (PDF only).")
+    offset: int = Field(0, ge=0, description="Number of characters of the selected text to skip.")
+    max_chars: Optional[int] = Field(None, ge=1, description="Maximum number of characters to return.")
 
 class FileReaderTool(Tool):
     name = "file_reader"
-    description = "Read the content of a local file."
+    description = "Read the content of a local file. Large documents can be read by page range or in offset/max_chars windows."
     args_schema = FileReaderInput
+    max_concurrency = 4
+    timeout = 60.0
 
-    def run(self, file_path: str) -> str:
+    def run(
+        self,
+        file_path: str,
+        start_page: Optional[int] = None,
+        end_page: Optional[int] = None,
+        offset: int = 0,
+        max_chars: Optional[int] = None,
+        context: Optional[ToolContext] = None,
+    ) -> str:
         if not os.path.exists(file_path):
             return "Error: File not found."
-            
+
         try:
-            ext = os.path.splitext(file_path)[1].lower()
-            
-            if ext == '.txt':
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    return f.read()
-            elif ext == '.pdf':
-                if fitz is None:
-                    return "Error: PyMuPDF (fitz) is not installed. PDF reading is unavailable."
-                doc = fitz.open(file_path)
-                text = ""
-                for page in doc:
-                    text += page.get_text()
-                return text
-            elif ext == '.docx':
-                doc = docx.Document(file_path)
-                text = "\n".join([para.text for para in doc.paragraphs])
-                return text
-            else:
-                return f"Error: Unsupported file extension {ext}"
+            text, has_more = read_document(file_path, start_page, end_page, offset, max_chars)
+        except ImportError:
+            return "Error: PyMuPDF (fitz) is not installed. PDF reading is unavailable."
+        except ValueError as e:
+            return f"Error: {str(e)}"
         except Exception as e:
             return f"Error reading file: {str(e)}"
 
+        if has_more:
+            text += f"\n\n[Truncated. Call again with offset={offset + len(text)} to continue.]"
+        return text
+
 from app.db.base import SessionLocal
 from app.db import models
-from typing import Optional
+
+@contextmanager
+def tool_session(context: Optional[ToolContext]):
+    """
+    Use the caller's request-scoped session when there is one, otherwise open a
+    short-lived one. Tools run in a worker thread (Tool.arun) always get their own.
+    """
+    if context is not None and context.db is not None:
+        yield context.db
+        return
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+class NoteItem(BaseModel):
+    title: Optional[str] = Field(None, description="Title of the note")
+    content: Optional[str] = Field(None, description="Content of the note")
 
 class NotesInput(BaseModel):
-    action: str = Field(..., description="Action to perform: 'create', 'list', 'read', 'delete'")
+    action: str = Field(..., description="Action to perform: 'create', 'list', 'read', 'delete', 'bulk_create', 'bulk_delete'")
     title: Optional[str] = Field(None, description="Title of the note (for create)")
     content: Optional[str] = Field(None, description="Content of the note (for create)")
     note_id: Optional[int] = Field(None, description="ID of the note (for read/delete)")
+    notes: Optional[List[NoteItem]] = Field(None, description="Notes to create (for bulk_create)")
+    note_ids: Optional[List[int]] = Field(None, description="IDs of notes to delete (for bulk_delete)")
 
 class NotesTool(Tool):
     name = "notes"
-    description = "Manage notes. Actions: create, list, read, delete."
+    description = "Manage notes. Actions: create, list, read, delete, bulk_create, bulk_delete."
     args_schema = NotesInput
 
-    def run(self, action: str, title: Optional[str] = None, content: Optional[str] = None, note_id: Optional[int] = None) -> str:
-        db = SessionLocal()
-        try:
-            # TODO: How to get current user ID in a tool? 
-            # Tools currently don't have context of the user. 
-            # We might need to pass user_id to run(), but Base Tool signature is fixed by args_schema.
-            # For this "Self-hosted" single user (or simple auth) app, maybe we fetch the first user or pass it in context?
-            # Ideally, the `run` method should accept context.
-            # Hack for now: Use the first user found or hardcode ID 1 if single user. 
-            # Real fix: Tool execution should receive context.
-            user = db.query(models.User).first()
-            if not user:
-                return "Error: No user found."
-            user_id = user.id
-
-            if action == 'create':
-                note = models.Note(title=title or "Untitled", content=content or "", user_id=user_id)
-                db.add(note)
-                db.commit()
-                return f"Note created with ID: {note.id}"
-            
-            elif action == 'list':
-                notes = db.query(models.Note).filter(models.Note.user_id == user_id).all()
-                if not notes:
-                    return "No notes found."
-                return "\n".join([f"{n.id}: {n.title}" for n in notes])
-            
-            elif action == 'read':
-                if not note_id:
-                    return "Error: note_id required for read."
-                note = db.query(models.Note).filter(models.Note.id == note_id, models.Note.user_id == user_id).first()
-                if not note:
-                    return "Note not found."
-                return f"Title: {note.title}\nContent: {note.content}"
-            
-            elif action == 'delete':
-                if not note_id:
-                    return "Error: note_id required for delete."
-                note = db.query(models.Note).filter(models.Note.id == note_id, models.Note.user_id == user_id).first()
-                if not note:
-                    return "Note not found."
-                db.delete(note)
-                db.commit()
-                return "Note deleted."
-            
-            else:
-                return f"Unknown action: {action}"
-        except Exception as e:
-            return f"Error managing notes: {str(e)}"
-        finally:
-            db.close()
+    def run(
+        self,
+        action: str,
+        title: Optional[str] = None,
+        content: Optional[str] = None,
+        note_id: Optional[int] = None,
+        notes: Optional[List[dict]] = None,
+        note_ids: Optional[List[int]] = None,
+        context: Optional[ToolContext] = None,
+    ) -> str:
+        if context is None or context.user_id is None:
+            return "Error: No user context."
+        user_id = context.user_id
+
+        with tool_session(context) as db:
+            try:
+                if action == 'create':
+                    note = models.Note(title=title or "Untitled", content=content or "", user_id=user_id)
+                    db.add(note)
+                    db.flush()
+                    note_id = note.id
+                    db.commit()
+                    return f"Note created with ID: {note_id}"
+
+                elif action == 'bulk_create':
+                    if not notes:
+                        return "Error: notes required for bulk_create."
+                    created = [
+                        models.Note(title=item.get("title") or "Untitled", content=item.get("content") or "", user_id=user_id)
+                        for item in notes
+                    ]
+                    db.add_all(created)
+                    db.flush()
+                    ids = [note.id for note in created]
+                    db.commit()
+                    return f"Created {len(ids)} notes with IDs: {', '.join(map(str, ids))}"
+
+                elif action == 'list':
+                    rows = db.query(models.Note.id, models.Note.title).filter(models.Note.user_id == user_id).all()
+                    if not rows:
+                        return "No notes found."
+                    return "\n".join([f"{n.id}: {n.title}" for n in rows])
+
+                elif action == 'read':
+                    if not note_id:
+                        return "Error: note_id required for read."
+                    note = db.query(models.Note).filter(models.Note.id == note_id, models.Note.user_id == user_id).first()
+                    if not note:
+                        return "Note not found."
+                    return f"Title: {note.title}\nContent: {note.content}"
+
+                elif action == 'delete':
+                    if not note_id:
+                        return "Error: note_id required for delete."
+                    deleted = db.query(models.Note).filter(
+                        models.Note.id == note_id, models.Note.user_id == user_id
+                    ).delete(synchronize_session=False)
+                    if not deleted:
+                        return "Note not found."
+                    db.commit()
+                    return "Note deleted."
+
+                elif action == 'bulk_delete':
+                    if not note_ids:
+                        return "Error: note_ids required for bulk_delete."
+                    deleted = db.query(models.Note).filter(
+                        models.Note.id.in_(note_ids), models.Note.user_id == user_id
+                    ).delete(synchronize_session=False)
+                    db.commit()
+                    return f"Deleted {deleted} of {len(note_ids)} notes."
+
+                else:
+                    return f"Unknown action: {action}"
+            except Exception as e:
+                db.rollback()
+                return f"Error managing notes: {str(e)}"
 
 class ReminderInput(BaseModel):
-    action: str = Field(..., description="Action: 'set', 'list', 'delete'")
+    action: str = Field(..., description="Action: 'set', 'list', 'delete', 'bulk_set', 'bulk_delete'")
     text: Optional[str] = Field(None, description="Reminder text (for set)")
     reminder_id: Optional[int] = Field(None, description="ID of reminder (for delete)")
+    texts: Optional[List[str]] = Field(None, description="Reminder texts (for bulk_set)")
+    reminder_ids: Optional[List[int]] = Field(None, description="IDs of reminders (for bulk_delete)")
 
 class ReminderTool(Tool):
     name = "reminder"
     description = "Manage reminders."
     args_schema = ReminderInput
 
-    def run(self, action: str, text: Optional[str] = None, reminder_id: Optional[int] = None) -> str:
-        db = SessionLocal()
-        try:
-            user = db.query(models.User).first()
-            if not user:
-                return "Error: No user found."
-            user_id = user.id
-
-            if action == 'set':
-                reminder = models.Reminder(text=text, user_id=user_id)
-                db.add(reminder)
-                db.commit()
-                return f"Reminder set with ID: {reminder.id}"
-            
-            elif action == 'list':
-                reminders = db.query(models.Reminder).filter(models.Reminder.user_id == user_id).all()
-                if not reminders:
-                    return "No reminders."
-                return "\n".join([f"{r.id}: {r.text} (Completed: {r.is_completed})" for r in reminders])
-            
-            elif action == 'delete':
-                if not reminder_id:
-                    return "Error: reminder_id required."
-                reminder = db.query(models.Reminder).filter(models.Reminder.id == reminder_id, models.Reminder.user_id == user_id).first()
-                if not reminder:
-                    return "Reminder not found."
-                db.delete(reminder)
-                db.commit()
-                return "Reminder deleted."
-            
-            else:
-                return f"Unknown action: {action}"
-        except Exception as e:
-            return f"Error managing reminders: {str(e)}"
-        finally:
-            db.close()
+    def run(
+        self,
+        action: str,
+        text: Optional[str] = None,
+        reminder_id: Optional[int] = None,
+        texts: Optional[List[str]] = None,
+        reminder_ids: Optional[List[int]] = None,
+        context: Optional[ToolContext] = None,
+    ) -> str:
+        if context is None or context.user_id is None:
+            return "Error: No user context."
+        user_id = context.user_id
+
+        with tool_session(context) as db:
+            try:
+                if action == 'set':
+                    reminder = models.Reminder(text=text, user_id=user_id)
+                    db.add(reminder)
+                    db.flush()
+                    reminder_id = reminder.id
+                    db.commit()
+                    return f"Reminder set with ID: {reminder_id}"
+
+                elif action == 'bulk_set':
+                    if not texts:
+                        return "Error: texts required for bulk_set."
+                    created = [models.Reminder(text=item, user_id=user_id) for item in texts]
+                    db.add_all(created)
+                    db.flush()
+                    ids = [reminder.id for reminder in created]
+                    db.commit()
+                    return f"Set {len(ids)} reminders with IDs: {', '.join(map(str, ids))}"
+
+                elif action == 'list':
+                    rows = db.query(
+                        models.Reminder.id, models.Reminder.text, models.Reminder.is_completed
+                    ).filter(models.Reminder.user_id == user_id).all()
+                    if not rows:
+                        return "No reminders."
+                    return "\n".join([f"{r.id}: {r.text} (Completed: {r.is_completed})" for r in rows])
+
+                elif action == 'delete':
+                    if not reminder_id:
+                        return "Error: reminder_id required."
+                    deleted = db.query(models.Reminder).filter(
+                        models.Reminder.id == reminder_id, models.Reminder.user_id == user_id
+                    ).delete(synchronize_session=False)
+                    if not deleted:
+                        return "Reminder not found."
+                    db.commit()
+                    return "Reminder deleted."
+
+                elif action == 'bulk_delete':
+                    if not reminder_ids:
+                        return "Error: reminder_ids required."
+                    deleted = db.query(models.Reminder).filter(
+                        models.Reminder.id.in_(reminder_ids), models.Reminder.user_id == user_id
+                    ).delete(synchronize_session=False)
+                    db.commit()
+                    return f"Deleted {deleted} of {len(reminder_ids)} reminders."
+
+                else:
+                    return f"Unknown action: {action}"
+            except Exception as e:
+                db.rollback()
+                return f"Error managing reminders: {str(e)}"
@@ -0,0 +1,155 @@
+import math
+import os
+from typing import Iterator, List, Optional, Tuple
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.services.tools.executors import get_process_pool
+
+TEXT_BLOCK_SIZE = 64 * 1024
+PDF_BATCH_PAGES = 16
+
+# (abs path, size, mtime_ns, page) -> extracted text. An edited file gets a new key,
+# so stale entries simply age out of the LRU.
+page_cache = TTLCache(maxsize=settings.DOCUMENT_CACHE_PAGES, ttl=settings.DOCUMENT_CACHE_TTL_SECONDS)
+
+
+def file_key(path: str) -> Tuple[str, int, int]:
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+def extract_pdf_pages(path: str, start: int, end: int) -> List[str]:
+    """
+    Text of pages [start, end) (0-based). Module-level so it can run in the process pool.
+    """
+    import fitz  # PyMuPDF
+
+    with fitz.open(path) as doc:
+        return [doc.load_page(i).get_text() for i in range(start, end)]
+
+
+def extract_docx_paragraphs(path: str) -> List[str]:
+    """
+    Paragraph texts of a docx file. Module-level so it can run in the process pool.
+    """
+    import docx
+
+    return [para.text for para in docx.Document(path).paragraphs]
+
+
+def pdf_page_count(path: str) -> int:
+    key = file_key(path) + ("page_count",)
+    count = page_cache.get(key)
+    if count is None:
+        import fitz  # PyMuPDF
+
+        with fitz.open(path) as doc:
+            count = doc.page_count
+        page_cache.set(key, count)
+    return count
+
+
+def _split(start: int, end: int, parts: int) -> List[Tuple[int, int]]:
+    size = max(1, math.ceil((end - start) / parts))
+    return [(i, min(i + size, end)) for i in range(start, end, size)]
+
+
+def load_pdf_pages(path: str, start: int, end: int) -> List[str]:
+    """
+    Pages [start, end) from the cache, extracting only the missing ones. Extraction
+    runs in the process pool so parsing never holds this process's GIL; large gaps
+    are split across the workers so they parse in parallel.
+    """
+    key = file_key(path)
+    pages = [page_cache.get(key + (i,)) for i in range(start, end)]
+
+    # Contiguous runs of missing pages
+    runs, run_start = [], None
+    for offset, text in enumerate(pages + [""]):
+        if text is None and run_start is None:
+            run_start = start + offset
+        elif text is not None and run_start is not None:
+            runs.append((run_start, start + offset))
+            run_start = None
+
+    missing = sum(b - a for a, b in runs)
+    if missing >= settings.DOCUMENT_PARALLEL_MIN_PAGES:
+        runs = [chunk for a, b in runs for chunk in _split(a, b, settings.TOOL_PROCESS_WORKERS)]
+    pool = get_process_pool()
+    futures = [(a, pool.submit(extract_pdf_pages, path, a, b)) for a, b in runs]
+    extracted = [(a, future.result()) for a, future in futures]
+
+    for a, texts in extracted:
+        for i, text in enumerate(texts):
+            page_cache.set(key + (a + i,), text)
+            pages[a + i - start] = text
+    return pages
+
+
+def iter_document(path: str, start_page: Optional[int] = None, end_page: Optional[int] = None) -> Iterator[str]:
+    """
+    Yield a document's text incrementally: fixed-size blocks for txt, pages for pdf
+    (1-based, inclusive range) and paragraphs for docx. Consumers that stop early
+    never read or parse the rest of the file.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext != '.pdf' and (start_page is not None or end_page is not None):
+        raise ValueError("start_page/end_page only apply to PDF files")
+
+    if ext == '.txt':
+        with open(path, 'r', encoding='utf-8') as f:
+            while True:
+                block = f.read(TEXT_BLOCK_SIZE)
+                if not block:
+                    return
+                yield block
+
+    elif ext == '.pdf':
+        count = pdf_page_count(path)
+        first = (start_page or 1) - 1
+        last = min(end_page or count, count)
+        if first < 0 or first >= count or last <= first:
+            raise ValueError(f"Page range out of bounds; document has {count} pages")
+        for batch_start in range(first, last, PDF_BATCH_PAGES * settings.TOOL_PROCESS_WORKERS):
+            batch_end = min(batch_start + PDF_BATCH_PAGES * settings.TOOL_PROCESS_WORKERS, last)
+            for text in load_pdf_pages(path, batch_start, batch_end):
+                yield text
+
+    elif ext == '.docx':
+        key = file_key(path) + ("docx",)
+        paragraphs = page_cache.get(key)
+        if paragraphs is None:
+            paragraphs = get_process_pool().submit(extract_docx_paragraphs, path).result()
+            page_cache.set(key, paragraphs)
+        for i, paragraph in enumerate(paragraphs):
+            yield paragraph if i == 0 else "\n" + paragraph
+
+    else:
+        raise ValueError(f"Unsupported file extension {ext}")
+
+
+def read_document(
+    path: str,
+    start_page: Optional[int] = None,
+    end_page: Optional[int] = None,
+    offset: int = 0,
+    max_chars: Optional[int] = None,
+) -> Tuple[str, bool]:
+    """
+    Text of the selected range, skipping `offset` characters and returning at most
+    `max_chars`. The flag is True when more text follows.
+    """
+    pieces, skipped, collected = [], 0, 0
+    for piece in iter_document(path, start_page, end_page):
+        if skipped < offset:
+            drop = min(len(piece), offset - skipped)
+            skipped += drop
+            piece = piece[drop:]
+            if not piece:
+                continue
+        if max_chars is not None and collected + len(piece) > max_chars:
+            pieces.append(piece[:max_chars - collected])
+            return "".join(pieces), True
+        pieces.append(piece)
+        collected += len(piece)
+    return "".join(pieces), False
@@ -0,0 +1,52 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import threading
+import httpx
+from app.core.config import settings
+from app.services.tools.sandbox import limit_memory, tool_sandbox
+
+# Shared, lazily created executors for tools. Closed from the app lifespan.
+
+_http_client: Optional[httpx.AsyncClient] = None
+_process_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Pooled async HTTP client so tool calls reuse connections instead of opening one per call.
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=httpx.Timeout(10.0),
+            limits=httpx.Limits(max_connections=settings.TOOL_HTTP_MAX_CONNECTIONS, max_keepalive_connections=20),
+            headers={"User-Agent": f"{settings.PROJECT_NAME} tools"},
+        )
+    return _http_client
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Process pool for CPU-bound work (document parsing) that would otherwise hold the GIL.
+    Workers share the sandbox's address-space cap so a pathological file can't exhaust memory.
+    """
+    global _process_pool
+    with _pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=settings.TOOL_PROCESS_WORKERS,
+                initializer=limit_memory,
+                initargs=(settings.TOOL_SANDBOX_MEMORY_MB * 1024 * 1024,),
+            )
+        return _process_pool
+
+async def shutdown_executors():
+    global _http_client, _process_pool
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+    with _pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+    tool_sandbox.shutdown()
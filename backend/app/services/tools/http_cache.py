@@ -0,0 +1,134 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass, asdict
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedPage:
+    url: str
+    max_chars: int
+    text: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    expires_at: float = 0.0
+    stored_at: float = 0.0
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def _freshness(headers) -> Optional[float]:
+    """
+    Seconds the response may be reused without revalidation, or None if it must not be stored.
+    """
+    cache_control = (headers.get("cache-control") or "").lower()
+    directives = {}
+    for part in cache_control.split(","):
+        key, _, value = part.strip().partition("=")
+        if key:
+            directives[key] = value.strip('"')
+
+    if "no-store" in directives or "private" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    for key in ("s-maxage", "max-age"):
+        if key in directives:
+            try:
+                return max(0.0, float(directives[key]))
+            except ValueError:
+                return 0.0
+    expires = headers.get("expires")
+    if expires:
+        try:
+            return max(0.0, parsedate_to_datetime(expires).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return 0.0
+    return 0.0
+
+
+class HttpCache:
+    """
+    On-disk cache of extracted page text keyed by URL, honouring Cache-Control/Expires
+    for freshness and ETag/Last-Modified for conditional revalidation.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, url: str, max_chars: int) -> str:
+        digest = hashlib.sha256(f"{max_chars}:{url}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], f"{digest}.json")
+
+    def lookup(self, url: str, max_chars: int) -> Optional[CachedPage]:
+        if not settings.HTTP_CACHE_ENABLED:
+            return None
+        try:
+            with open(self._path(url, max_chars), "r", encoding="utf-8") as f:
+                return CachedPage(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def store(self, url: str, max_chars: int, text: str, headers) -> Optional[CachedPage]:
+        if not settings.HTTP_CACHE_ENABLED:
+            return None
+        freshness = _freshness(headers)
+        etag = headers.get("etag")
+        last_modified = headers.get("last-modified")
+        # Nothing to gain from storing a page we can neither reuse nor revalidate
+        if freshness is None or (freshness == 0 and not etag and not last_modified):
+            return None
+        now = time.time()
+        page = CachedPage(
+            url=url,
+            max_chars=max_chars,
+            text=text,
+            etag=etag,
+            last_modified=last_modified,
+            expires_at=now + freshness,
+            stored_at=now,
+        )
+        self._write(page)
+        return page
+
+    def revalidated(self, page: CachedPage, headers):
+        """
+        Refresh validators and expiry after a 304 Not Modified.
+        """
+        freshness = _freshness(headers)
+        page.etag = headers.get("etag") or page.etag
+        page.last_modified = headers.get("last-modified") or page.last_modified
+        page.expires_at = time.time() + (freshness or 0.0)
+        self._write(page)
+
+    def _write(self, page: CachedPage):
+        path = self._path(page.url, page.max_chars)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(asdict(page), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error("Error writing HTTP cache: %s", e)
+
+
+http_cache = HttpCache(settings.HTTP_CACHE_DIR)
@@ -1,10 +1,29 @@
-from typing import Dict, Type, List, Any
-from app.services.tools.base import Tool
+import asyncio
+import hashlib
+import json
+import math
+import time
+from contextlib import contextmanager
+from typing import Dict, Type, List, Any, Optional, Tuple
+from pydantic import BaseModel
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.services.tools.base import Tool, ToolContext, is_error_result
+from app.services.tools.sandbox import tool_sandbox
 from app.services.tools.definitions import WebSearchTool, CalculatorTool, WebsiteReaderTool, FileReaderTool, NotesTool, ReminderTool
 
+CACHE_POLICIES = {"pure", "ttl", "never"}
+
+_MISS = object()
+
 class ToolRegistry:
     def __init__(self):
         self._tools: Dict[str, Tool] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._catalogue: Optional[List[Dict[str, Any]]] = None
+        self._catalogue_version: Optional[str] = None
+        self._results = TTLCache(maxsize=settings.TOOL_RESULT_CACHE_SIZE, ttl=settings.TOOL_RESULT_CACHE_TTL_SECONDS)
+        self._metrics: Dict[str, Dict[str, float]] = {}
         self.register_tools()
 
     def register_tools(self):
@@ -20,19 +39,178 @@ class ToolRegistry:
             self.register_tool(tool)
 
     def register_tool(self, tool: Tool):
+        if tool.cache_policy not in CACHE_POLICIES:
+            raise ValueError(f"Tool '{tool.name}' has unknown cache policy '{tool.cache_policy}'")
         self._tools[tool.name] = tool
+        if tool.isolated and type(tool).__module__ not in tool_sandbox.preload:
+            tool_sandbox.preload.append(type(tool).__module__)
+        self._metrics.setdefault(tool.name, {"calls": 0, "errors": 0, "cache_hits": 0, "total_seconds": 0.0})
+        # Schemas are rebuilt lazily on the next list_tools()
+        self._catalogue = None
+        self._catalogue_version = None
 
     def get_tool(self, name: str) -> Tool:
         return self._tools.get(name)
 
-    def list_tools(self) -> List[Dict[str, Any]]:
-        return [
+    def _build_catalogue(self):
+        self._catalogue = [
             {
-                "name": tool.name, 
+                "name": tool.name,
                 "description": tool.description,
-                "args_schema": tool.args_schema.schema()
+                "args_schema": tool.args_schema.model_json_schema()
             }
             for tool in self._tools.values()
         ]
+        serialized = json.dumps(self._catalogue, sort_keys=True, separators=(",", ":"))
+        self._catalogue_version = hashlib.sha256(serialized.encode("utf-8")).hexdigest()[:16]
+
+    def list_tools(self) -> List[Dict[str, Any]]:
+        """
+        Tool specs with their JSON schemas, generated once per registration change.
+        """
+        if self._catalogue is None:
+            self._build_catalogue()
+        return self._catalogue
+
+    @property
+    def catalogue_version(self) -> str:
+        """
+        Content hash of the catalogue; changes whenever a tool or schema changes.
+        """
+        if self._catalogue_version is None:
+            self._build_catalogue()
+        return self._catalogue_version
+
+    def _cache_key(self, tool: Tool, validated_args: BaseModel, context: Optional[ToolContext]) -> Optional[Tuple]:
+        if tool.cache_policy == "never":
+            return None
+        args = json.dumps(validated_args.model_dump(mode="json"), sort_keys=True, default=str)
+        if tool.cache_policy == "pure":
+            return (tool.name, args)
+        return (tool.name, context.user_id if context is not None else None, args)
+
+    def _cached(self, key: Optional[Tuple]) -> Any:
+        if key is None:
+            return _MISS
+        return self._results.get(key, _MISS)
+
+    def _remember(self, tool: Tool, key: Optional[Tuple], result: Any):
+        if is_error_result(result):
+            # A failure returned rather than raised: counted, and never cached
+            self._metrics[tool.name]["errors"] += 1
+            return
+        if key is None:
+            return
+        ttl = math.inf if tool.cache_policy == "pure" else tool.cache_ttl
+        self._results.set(key, result, ttl=ttl)
+
+    @contextmanager
+    def _measure(self, tool: Tool):
+        metrics = self._metrics[tool.name]
+        metrics["calls"] += 1
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            metrics["errors"] += 1
+            raise
+        finally:
+            metrics["total_seconds"] += time.perf_counter() - started
+
+    def execute_tool(self, name: str, arguments: Dict[str, Any], context: Optional[ToolContext] = None) -> Any:
+        """
+        Validate arguments against the tool's schema and run it with the caller's context.
+        """
+        tool = self.get_tool(name)
+        if not tool:
+            raise ValueError(f"Tool '{name}' not found")
+        if context is not None and context.expired():
+            raise TimeoutError(f"Deadline exceeded before running tool '{name}'")
+        validated_args = tool.args_schema(**arguments)
+
+        key = self._cache_key(tool, validated_args, context)
+        result = self._cached(key)
+        if result is not _MISS:
+            self._metrics[name]["cache_hits"] += 1
+            return result
+
+        with self._measure(tool):
+            if self._isolated(tool):
+                timeout = tool.timeout or settings.TOOL_TIMEOUT_SECONDS
+                if context is not None and context.remaining() is not None:
+                    timeout = min(timeout, context.remaining())
+                result = tool_sandbox.run_tool(tool, validated_args.model_dump(), timeout)
+            else:
+                result = tool.run(context=context, **validated_args.model_dump())
+        self._remember(tool, key, result)
+        return result
+
+    @staticmethod
+    def _isolated(tool: Tool) -> bool:
+        return tool.isolated and settings.TOOL_SANDBOX_ENABLED
+
+    def _semaphore(self, tool: Tool) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(tool.name)
+        if semaphore is None:
+            semaphore = self._semaphores[tool.name] = asyncio.Semaphore(tool.max_concurrency)
+        return semaphore
+
+    async def aexecute_tool(self, name: str, arguments: Dict[str, Any], context: Optional[ToolContext] = None) -> Any:
+        """
+        Async execution under the tool's concurrency limit. The timeout is the tool's own
+        budget or the caller's remaining deadline, whichever is shorter, and includes time
+        spent queued behind the limit.
+        """
+        tool = self.get_tool(name)
+        if not tool:
+            raise ValueError(f"Tool '{name}' not found")
+        validated_args = tool.args_schema(**arguments)
+
+        key = self._cache_key(tool, validated_args, context)
+        result = self._cached(key)
+        if result is not _MISS:
+            self._metrics[name]["cache_hits"] += 1
+            return result
+
+        timeout = tool.timeout or settings.TOOL_TIMEOUT_SECONDS
+        remaining = context.remaining() if context is not None else None
+        if remaining is not None:
+            if remaining <= 0:
+                raise TimeoutError(f"Deadline exceeded before running tool '{name}'")
+            timeout = min(timeout, remaining)
+
+        async def run_limited():
+            async with self._semaphore(tool):
+                if self._isolated(tool):
+                    # The sandbox enforces the same deadline by killing the worker
+                    return await asyncio.to_thread(
+                        tool_sandbox.run_tool, tool, validated_args.model_dump(), timeout
+                    )
+                return await tool.arun(context=context, **validated_args.model_dump())
+
+        with self._measure(tool):
+            try:
+                result = await asyncio.wait_for(run_limited(), timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"Tool '{name}' timed out after {timeout:.1f}s")
+        self._remember(tool, key, result)
+        return result
+
+    def clear_cache(self):
+        self._results.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        tools = {}
+        for name, metrics in self._metrics.items():
+            executed = metrics["calls"]
+            tools[name] = {
+                "cache_policy": self._tools[name].cache_policy,
+                "calls": executed + metrics["cache_hits"],
+                "executions": executed,
+                "errors": metrics["errors"],
+                "cache_hits": metrics["cache_hits"],
+                "avg_seconds": metrics["total_seconds"] / executed if executed else 0.0,
+            }
+        return {"tools": tools, "result_cache": self._results.stats()}
 
 tool_registry = ToolRegistry()
@@ -0,0 +1,220 @@
+import importlib
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits, wall-clock deadlines still apply
+    resource = None
+
+
+def limit_memory(memory_bytes: int):
+    """
+    Cap the calling process's address space. Allocations past it raise MemoryError.
+    """
+    if resource is None or not memory_bytes:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        memory_bytes = min(memory_bytes, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, hard))
+
+
+def _limit_cpu(cpu_seconds: float):
+    """
+    RLIMIT_CPU counts the process's lifetime CPU time, so each task gets a soft limit
+    of what has been used so far plus its own budget. Exceeding it delivers SIGXCPU,
+    which terminates the worker.
+    """
+    if resource is None or not cpu_seconds:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(usage.ru_utime + usage.ru_stime + cpu_seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _worker_main(conn, cpu_seconds: float, memory_bytes: int, preload: List[str]):
+    """
+    Worker loop: receive (module, class name, kwargs), run the tool, send back
+    ("ok", result) or ("error", message).
+    """
+    for module_name in preload:
+        importlib.import_module(module_name)
+    limit_memory(memory_bytes)
+    tools: Dict[Tuple[str, str], Any] = {}
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if task is None:
+            return
+        module_name, class_name, kwargs = task
+        try:
+            _limit_cpu(cpu_seconds)
+            tool = tools.get((module_name, class_name))
+            if tool is None:
+                tool_class = getattr(importlib.import_module(module_name), class_name)
+                tool = tools[(module_name, class_name)] = tool_class()
+            reply = ("ok", tool.run(context=None, **kwargs))
+        except MemoryError:
+            reply = ("error", "Tool exceeded its memory limit")
+        except Exception as e:
+            reply = ("error", f"{type(e).__name__}: {e}")
+        try:
+            conn.send(reply)
+        except Exception as e:  # unpicklable result
+            conn.send(("error", f"Tool result could not be returned: {e}"))
+
+
+class _Worker:
+    def __init__(self, context, cpu_seconds: float, memory_bytes: int, preload: List[str]):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, cpu_seconds, memory_bytes, preload), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.join(1)
+        finally:
+            self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+            self.process.join(1)
+        except (OSError, BrokenPipeError):
+            pass
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class ToolSandbox:
+    """
+    Pre-started pool of worker processes for tools marked `isolated`. Each task runs
+    under a CPU-time limit and an address-space cap, and a worker that overruns its
+    wall-clock deadline is killed and replaced. Workers are recycled after
+    `max_tasks` calls so slow leaks don't accumulate. Requests and results travel
+    over a Pipe, so a runaway call only ever occupies its own worker.
+    """
+
+    def __init__(self, size: int, cpu_seconds: float, memory_mb: int, max_tasks: int):
+        self.size = size
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_mb * 1024 * 1024
+        self.max_tasks = max_tasks
+        # Modules imported when a worker starts, so the first call doesn't pay for them
+        self.preload: List[str] = []
+        # spawn: forking a process that already runs threads (uvicorn, executors) is unsafe
+        self._context = multiprocessing.get_context("spawn")
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._workers: List[_Worker] = []
+        self._lock = threading.Lock()
+        self.started = False
+        self.tasks = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self.recycled = 0
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self._context, self.cpu_seconds, self.memory_bytes, list(self.preload))
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _retire(self, worker: _Worker, kill: bool = False):
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        if kill:
+            worker.kill()
+        else:
+            worker.stop()
+        if self.started:
+            self._idle.put(self._spawn())
+
+    def start(self):
+        with self._lock:
+            if self.started:
+                return
+            self.started = True
+        for _ in range(self.size):
+            self._idle.put(self._spawn())
+
+    def shutdown(self):
+        with self._lock:
+            self.started = False
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.stop()
+        self._idle = queue.Queue()
+
+    def run_tool(self, tool, kwargs: Dict[str, Any], timeout: float) -> Any:
+        """
+        Run `tool.run(**kwargs)` in a worker, blocking for at most `timeout` seconds
+        including the wait for a free worker.
+        """
+        self.start()
+        deadline = time.monotonic() + timeout
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"Tool '{tool.name}' timed out waiting for a sandbox worker")
+
+        self.tasks += 1
+        worker.tasks += 1
+        try:
+            worker.conn.send((type(tool).__module__, type(tool).__qualname__, kwargs))
+            ready = worker.conn.poll(max(0.0, deadline - time.monotonic()))
+            if ready:
+                status, value = worker.conn.recv()
+        except (EOFError, OSError):
+            # The worker died mid-task, typically SIGXCPU from the CPU limit
+            self.crashes += 1
+            self._retire(worker, kill=True)
+            raise RuntimeError(f"Tool '{tool.name}' was terminated for exceeding its resource limits")
+        if not ready:
+            self.timeouts += 1
+            self._retire(worker, kill=True)
+            raise TimeoutError(f"Tool '{tool.name}' timed out after {timeout:.1f}s")
+
+        if worker.tasks >= self.max_tasks:
+            self.recycled += 1
+            self._retire(worker)
+        else:
+            self._idle.put(worker)
+
+        if status == "error":
+            raise RuntimeError(value)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._workers),
+            "idle": self._idle.qsize(),
+            "tasks": self.tasks,
+            "timeouts": self.timeouts,
+            "crashes": self.crashes,
+            "recycled": self.recycled,
+        }
+
+
+tool_sandbox = ToolSandbox(
+    size=settings.TOOL_SANDBOX_WORKERS,
+    cpu_seconds=settings.TOOL_SANDBOX_CPU_SECONDS,
+    memory_mb=settings.TOOL_SANDBOX_MEMORY_MB,
+    max_tasks=settings.TOOL_SANDBOX_MAX_TASKS,
+)
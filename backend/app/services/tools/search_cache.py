@@ -0,0 +1,162 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class _Call:
+    """
+    One in-flight upstream call that other threads can wait on.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Optional[List[dict]] = None
+        self.error: Optional[Exception] = None
+
+
+class SearchResultCache:
+    """
+    TTL/LRU cache of web search results keyed by normalized query and result count.
+    Concurrent misses for the same key share one upstream call, and entries can be
+    persisted to disk so a restart doesn't cold-start the cache.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, path: Optional[str] = None):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.path = path
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, _Call] = {}
+        self._ainflight: Dict[str, asyncio.Task] = {}
+        self._save_task: Optional[asyncio.Future] = None
+        self._dirty = False
+        self._last_save = 0.0
+        self._load()
+
+    @staticmethod
+    def key(query: str, max_results: int) -> str:
+        return f"{max_results}:{normalize_query(query)}"
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], List[dict]]) -> List[dict]:
+        results = self.cache.get(key)
+        if results is not None:
+            return results
+
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                self.upstream_calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fetch()
+            if self._store(key, call.result):
+                self.save()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.event.set()
+
+    async def aget_or_fetch(self, key: str, fetch: Callable[[], Awaitable[List[dict]]]) -> List[dict]:
+        results = self.cache.get(key)
+        if results is not None:
+            return results
+
+        # The fetch runs as its own task, so a caller that is cancelled (or times
+        # out) only stops waiting; the others still get the result
+        task = self._ainflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(self._afetch(key, fetch))
+            # Mark retrieved so a failure nobody waited on isn't logged as unhandled
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._ainflight[key] = task
+            self.upstream_calls += 1
+        return await asyncio.shield(task)
+
+    async def _afetch(self, key: str, fetch: Callable[[], Awaitable[List[dict]]]) -> List[dict]:
+        try:
+            results = await fetch()
+            if self._store(key, results) and (self._save_task is None or self._save_task.done()):
+                # Written in a thread without holding up the callers; json.dump of the
+                # whole cache would otherwise block the event loop
+                self._save_task = asyncio.ensure_future(asyncio.to_thread(self.save))
+            return results
+        finally:
+            del self._ainflight[key]
+
+    def _store(self, key: str, results: List[dict]) -> bool:
+        """
+        Cache the results. Returns True when the cache is due to be saved to disk.
+        """
+        self.cache.set(key, results)
+        self._dirty = True
+        return bool(self.path) and time.time() - self._last_save > settings.WEB_SEARCH_CACHE_SAVE_INTERVAL_SECONDS
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            now = time.time()
+            for key, expires_at, results in entries:
+                if expires_at > now:
+                    self.cache.set(key, results, expires_at=expires_at)
+        except (OSError, ValueError) as e:
+            logger.error("Error loading web search cache: %s", e)
+
+    def save(self):
+        if not self.path or not self._dirty:
+            return
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.cache.entries(), f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+            self._last_save = time.time()
+        except OSError as e:
+            logger.error("Error saving web search cache: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.cache.stats()
+        stats.update({"upstream_calls": self.upstream_calls, "coalesced": self.coalesced})
+        return stats
+
+
+search_cache = SearchResultCache(
+    maxsize=settings.WEB_SEARCH_CACHE_SIZE,
+    ttl=settings.WEB_SEARCH_CACHE_TTL_SECONDS,
+    path=settings.WEB_SEARCH_CACHE_PATH,
+)
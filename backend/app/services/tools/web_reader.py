@@ -0,0 +1,216 @@
+import asyncio
+import codecs
+from html.parser import HTMLParser
+from typing import Optional
+from app.core.config import settings
+from app.services.tools.http_cache import http_cache
+
+CHUNK_SIZE = 64 * 1024
+SKIP_TAGS = {"script", "style", "noscript", "template"}
+BLOCK_TAGS = {
+    "p", "div", "br", "li", "ul", "ol", "tr", "td", "th", "table", "section", "article",
+    "header", "footer", "nav", "aside", "main", "h1", "h2", "h3", "h4", "h5", "h6",
+    "pre", "blockquote", "title", "hr", "dd", "dt",
+}
+
+
+class TextSink:
+    """
+    Collects visible text from parser events and reports when enough has been seen.
+    """
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.parts = []
+        self.length = 0
+        self.skip_depth = 0
+
+    @property
+    def full(self) -> bool:
+        # Leave headroom for whitespace that normalisation will strip
+        return self.length > self.max_chars
+
+    def start(self, tag, attrib=None):
+        tag = tag.lower()
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def end(self, tag):
+        tag = tag.lower()
+        if tag in SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def data(self, text):
+        if self.skip_depth or self.full:
+            return
+        self.parts.append(text)
+        self.length += len(text.strip())
+
+    def close(self):
+        return None
+
+    def text(self) -> str:
+        text = "".join(self.parts)
+        # Break into lines and remove leading/trailing space on each
+        lines = (line.strip() for line in text.splitlines())
+        # Break multi-headlines into a line each
+        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+        # Drop blank lines
+        return '\n'.join(chunk for chunk in chunks if chunk)
+
+
+class _StdlibParser(HTMLParser):
+    def __init__(self, sink: TextSink, charset: str):
+        super().__init__(convert_charrefs=True)
+        self.sink = sink
+        self.decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+
+    def handle_starttag(self, tag, attrs):
+        self.sink.start(tag)
+
+    def handle_endtag(self, tag):
+        self.sink.end(tag)
+
+    def handle_data(self, data):
+        self.sink.data(data)
+
+    def feed_bytes(self, chunk: bytes):
+        self.feed(self.decoder.decode(chunk))
+
+    def finish(self):
+        self.feed(self.decoder.decode(b"", final=True))
+        self.close()
+
+
+def _lxml_etree():
+    try:
+        from lxml import etree
+        return etree
+    except ImportError:
+        return None
+
+
+class _LxmlParser:
+    def __init__(self, etree, sink: TextSink, charset: Optional[str]):
+        self.etree = etree
+        self.sink = sink
+        self.parser = etree.HTMLParser(target=sink, encoding=charset)
+
+    def feed_bytes(self, chunk: bytes):
+        self.parser.feed(chunk)
+
+    def finish(self):
+        try:
+            self.parser.close()
+        except self.etree.XMLSyntaxError:
+            pass
+
+
+class TextExtractor:
+    """
+    Incremental HTML-to-text extraction: feed response chunks as they arrive and stop
+    reading as soon as `full` is set. Uses lxml's C parser when available.
+    """
+
+    def __init__(self, max_chars: int, charset: Optional[str] = None):
+        self.sink = TextSink(max_chars)
+        try:
+            codecs.lookup(charset or "utf-8")
+        except LookupError:
+            charset = None
+        etree = _lxml_etree()
+        if etree is not None:
+            self.parser = _LxmlParser(etree, self.sink, charset)
+        else:
+            self.parser = _StdlibParser(self.sink, charset or "utf-8")
+
+    @property
+    def full(self) -> bool:
+        return self.sink.full
+
+    def feed(self, chunk: bytes):
+        self.parser.feed_bytes(chunk)
+
+    def finish(self, truncated: bool = False) -> str:
+        self.parser.finish()
+        text = self.sink.text()
+        max_chars = self.sink.max_chars
+        if len(text) > max_chars or truncated:
+            return text[:max_chars] + "..."
+        return text
+
+
+def _charset(content_type: Optional[str]) -> Optional[str]:
+    for param in (content_type or "").split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "charset" and value:
+            return value.strip('"\'')
+    return None
+
+
+def fetch_text(url: str, max_chars: int = None) -> str:
+    """
+    Blocking fetch: streams at most WEBSITE_READER_MAX_BYTES and stops once
+    `max_chars` of text have been extracted. Served from the HTTP cache when fresh.
+    """
+    import requests
+
+    max_chars = max_chars or settings.WEBSITE_READER_MAX_CHARS
+    cached = http_cache.lookup(url, max_chars)
+    if cached is not None and cached.fresh:
+        return cached.text
+
+    headers = cached.conditional_headers() if cached is not None else {}
+    with requests.get(url, timeout=10, stream=True, headers=headers) as response:
+        if response.status_code == 304 and cached is not None:
+            http_cache.revalidated(cached, response.headers)
+            return cached.text
+        response.raise_for_status()
+
+        extractor = TextExtractor(max_chars, _charset(response.headers.get("content-type")))
+        received, truncated = 0, False
+        for chunk in response.iter_content(CHUNK_SIZE):
+            received += len(chunk)
+            extractor.feed(chunk)
+            if extractor.full or received >= settings.WEBSITE_READER_MAX_BYTES:
+                truncated = True
+                break
+        text = extractor.finish(truncated)
+
+    http_cache.store(url, max_chars, text, response.headers)
+    return text
+
+
+async def afetch_text(client, url: str, max_chars: int = None) -> str:
+    """
+    Async variant of fetch_text on a shared httpx client. Chunks are parsed in a
+    worker thread so large pages never stall the event loop.
+    """
+    max_chars = max_chars or settings.WEBSITE_READER_MAX_CHARS
+    cached = await asyncio.to_thread(http_cache.lookup, url, max_chars)
+    if cached is not None and cached.fresh:
+        return cached.text
+
+    headers = cached.conditional_headers() if cached is not None else {}
+    async with client.stream("GET", url, headers=headers) as response:
+        if response.status_code == 304 and cached is not None:
+            await asyncio.to_thread(http_cache.revalidated, cached, response.headers)
+            return cached.text
+        response.raise_for_status()
+
+        extractor = TextExtractor(max_chars, _charset(response.headers.get("content-type")))
+        received, truncated = 0, False
+        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+            received += len(chunk)
+            await asyncio.to_thread(extractor.feed, chunk)
+            if extractor.full or received >= settings.WEBSITE_READER_MAX_BYTES:
+                truncated = True
+                break
+        text = await asyncio.to_thread(extractor.finish, truncated)
+
+    await asyncio.to_thread(http_cache.store, url, max_chars, text, response.headers)
+    return text
@@ -0,0 +1,208 @@
+"""
+Local stand-in for the Ollama HTTP API, for load tests.
+
+Serves /api/chat (streaming and not), /api/generate (load and unload only),
+/api/embeddings, /api/embed, /api/tags and /api/ps with configurable time to
+first token, token rate and embedding latency. Embeddings are deterministic per
+text so memory search behaves the same from run to run. With --load-ms a model
+that is not resident pays a cold load and stays loaded for its keep_alive
+(5 minutes by default), as with Ollama.
+
+Run from the backend directory:
+    python -m benchmarks.fake_ollama --port 11500 --ttft-ms 200 --tokens-per-second 40
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+WORDS = (
+    "the quick brown fox jumps over a lazy dog while our assistant explains "
+    "how memory search caching and streaming work in small friendly steps"
+).split()
+
+MODEL_SIZE = 4_700_000_000
+
+
+def keep_alive_seconds(value) -> float:
+    """
+    Ollama's keep_alive: seconds as a number, or a duration such as "30m"; negative keeps the model forever.
+    """
+    if value is None:
+        return 300.0
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        match = re.fullmatch(r"(-?\d+(?:\.\d+)?)(ms|s|m|h)?", str(value).strip())
+        if not match:
+            return 300.0
+        seconds = float(match.group(1)) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600, None: 1}[match.group(2)]
+    return float("inf") if seconds < 0 else seconds
+
+
+def create_app(
+    ttft_ms: float,
+    tokens_per_second: float,
+    tokens: int,
+    embed_ms: float,
+    dim: int,
+    model: str,
+    load_ms: float = 0.0,
+) -> FastAPI:
+    app = FastAPI()
+    token_interval = 1.0 / tokens_per_second if tokens_per_second > 0 else 0.0
+    # Resident models and when they expire (time.monotonic())
+    loaded = {}
+
+    def full_name(name: str) -> str:
+        return name if ":" in name else f"{name}:latest"
+
+    async def ensure_loaded(name: str, keep_alive) -> float:
+        """
+        Load `name` if it is not resident and return how long that took.
+        """
+        name = full_name(name)
+        now = time.monotonic()
+        load_seconds = 0.0
+        if loaded.get(name, 0.0) <= now:
+            load_seconds = load_ms / 1000
+            await asyncio.sleep(load_seconds)
+        loaded[name] = time.monotonic() + keep_alive_seconds(keep_alive)
+        return load_seconds
+
+    def embedding(text: str):
+        rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+        return [rng.gauss(0.0, 1.0) for _ in range(dim)]
+
+    def done_chunk(model_name: str, started: float, first_token_at: float, load_seconds: float) -> dict:
+        now = time.perf_counter()
+        return {
+            "model": model_name,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "message": {"role": "assistant", "content": ""},
+            "done": True,
+            "total_duration": int((now - started) * 1e9),
+            "load_duration": int(load_seconds * 1e9),
+            "prompt_eval_count": 32,
+            "prompt_eval_duration": int((first_token_at - started - load_seconds) * 1e9),
+            "eval_count": tokens,
+            "eval_duration": int((now - first_token_at) * 1e9),
+        }
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        body = await request.json()
+        model_name = body.get("model") or model
+        started = time.perf_counter()
+        words = [WORDS[i % len(WORDS)] + " " for i in range(tokens)]
+
+        if not body.get("stream", True):
+            load_seconds = await ensure_loaded(model_name, body.get("keep_alive"))
+            await asyncio.sleep(ttft_ms / 1000 + token_interval * max(0, tokens - 1))
+            response = done_chunk(model_name, started, started + load_seconds + ttft_ms / 1000, load_seconds)
+            response["message"]["content"] = "".join(words)
+            return response
+
+        async def stream():
+            load_seconds = await ensure_loaded(model_name, body.get("keep_alive"))
+            await asyncio.sleep(ttft_ms / 1000)
+            first_token_at = time.perf_counter()
+            for i, word in enumerate(words):
+                if i:
+                    await asyncio.sleep(token_interval)
+                yield json.dumps({
+                    "model": model_name,
+                    "message": {"role": "assistant", "content": word},
+                    "done": False,
+                }) + "\n"
+            yield json.dumps(done_chunk(model_name, started, first_token_at, load_seconds)) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        # Only the empty-prompt form, which loads or (keep_alive 0) unloads a model
+        body = await request.json()
+        model_name = full_name(body.get("model") or model)
+        started = time.perf_counter()
+        if keep_alive_seconds(body.get("keep_alive")) == 0:
+            loaded.pop(model_name, None)
+            return {"model": model_name, "response": "", "done": True, "done_reason": "unload"}
+        load_seconds = await ensure_loaded(model_name, body.get("keep_alive"))
+        return {
+            "model": model_name,
+            "response": "",
+            "done": True,
+            "total_duration": int((time.perf_counter() - started) * 1e9),
+            "load_duration": int(load_seconds * 1e9),
+        }
+
+    @app.post("/api/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        await asyncio.sleep(embed_ms / 1000)
+        return {"embedding": embedding(body.get("prompt", ""))}
+
+    @app.post("/api/embed")
+    async def embed(request: Request):
+        body = await request.json()
+        texts = body.get("input", [])
+        if isinstance(texts, str):
+            texts = [texts]
+        await asyncio.sleep(embed_ms / 1000)
+        return {"model": body.get("model") or model, "embeddings": [embedding(text) for text in texts]}
+
+    @app.get("/api/tags")
+    async def tags():
+        name = full_name(model)
+        return {"models": [{"name": name, "model": name, "size": MODEL_SIZE, "details": {}}]}
+
+    @app.get("/api/ps")
+    async def ps():
+        now = time.monotonic()
+        for name in [name for name, expires in loaded.items() if expires <= now]:
+            del loaded[name]
+        return {"models": [
+            {
+                "name": name,
+                "model": name,
+                "size": MODEL_SIZE,
+                "size_vram": MODEL_SIZE,
+                "expires_at": None if expires == float("inf") else time.strftime(
+                    "%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + expires - now)
+                ),
+            }
+            for name, expires in loaded.items()
+        ]}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--ttft-ms", type=float, default=200.0, help="Delay before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0)
+    parser.add_argument("--tokens", type=int, default=50, help="Tokens per response")
+    parser.add_argument("--embed-ms", type=float, default=20.0, help="Latency of an embedding request")
+    parser.add_argument("--dim", type=int, default=768, help="Embedding size")
+    parser.add_argument("--model", default="llama3")
+    parser.add_argument("--load-ms", type=float, default=0.0, help="Cold load time of a model that is not resident")
+    args = parser.parse_args()
+
+    app = create_app(
+        args.ttft_ms, args.tokens_per_second, args.tokens, args.embed_ms, args.dim, args.model, args.load_ms
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
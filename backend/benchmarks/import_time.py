@@ -0,0 +1,78 @@
+"""
+Import-time benchmark for the API process.
+
+Imports `app.main` in fresh interpreters, reports the best wall time and the
+slowest modules from `python -X importtime`, and exits non-zero if the budget
+is exceeded or a heavy tool dependency is imported eagerly.
+
+Run from the backend directory:
+    python -m benchmarks.import_time --budget-ms 2500
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# Tool dependencies that must only be imported on first use
+LAZY_MODULES = ["duckduckgo_search", "bs4", "lxml", "fitz", "docx", "requests"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "eager": [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+
+def run_probe(env):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, _, name = line.split(":", 1)[1].split("|")
+        modules.append((int(self_us), name.strip()))
+    probe["slowest"] = sorted(modules, reverse=True)[:10]
+    return probe
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("IMPORT_TIME_BUDGET_MS", 2500)))
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    # Importing must not touch the real database
+    env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'import_time.db')}")
+
+    probes = [run_probe(env) for _ in range(args.runs)]
+    best = min(probes, key=lambda p: p["seconds"])
+    best_ms = best["seconds"] * 1000
+
+    print(f"import app.main: best {best_ms:.0f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    print("slowest modules (self time):")
+    for self_us, name in best["slowest"]:
+        print(f"  {self_us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if best["eager"]:
+        print(f"FAIL: imported eagerly: {', '.join(best['eager'])}")
+        failed = True
+    if best_ms > args.budget_ms:
+        print(f"FAIL: import time {best_ms:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
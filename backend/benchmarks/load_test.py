@@ -0,0 +1,336 @@
+"""
+End-to-end load test for the API.
+
+Drives /chat/completions (streaming and not), /memory/search and
+/conversations/ with a configurable number of users and concurrent requests,
+and reports throughput, latency percentiles and, for streams, time to first
+token (TTFT) and inter-token latency. Results are written as JSON; pass a
+previous file with --compare to flag regressions across commits.
+
+With --start the harness launches the fake Ollama server and the API itself
+(on a throwaway SQLite database); otherwise it targets --base-url.
+
+Run from the backend directory:
+    python -m benchmarks.load_test --start --users 20 --concurrency 20 --requests 200 \\
+        --output bench.json
+    python -m benchmarks.load_test --start --output new.json --compare bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import httpx
+
+SCENARIOS = ["chat_stream", "chat", "memory_search", "conversations"]
+
+# Metrics compared by --compare: (name, True if higher is better)
+COMPARED = [
+    ("throughput_rps", True),
+    ("latency_ms.p95", False),
+    ("ttft_ms.p95", False),
+    ("inter_token_ms.p95", False),
+]
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarize(values):
+    if not values:
+        return None
+    return {
+        "mean": sum(values) / len(values),
+        "p50": percentile(values, 0.50),
+        "p95": percentile(values, 0.95),
+        "p99": percentile(values, 0.99),
+        "max": max(values),
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(url, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=2.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready within {timeout:.0f}s")
+
+
+@contextmanager
+def local_stack(args):
+    """
+    Fake Ollama plus the API on a temporary database, torn down afterwards.
+    """
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    ollama_port, api_port = free_port(), free_port()
+    processes = []
+    try:
+        processes.append(subprocess.Popen([
+            sys.executable, "-m", "benchmarks.fake_ollama", "--port", str(ollama_port),
+            "--ttft-ms", str(args.ttft_ms), "--tokens-per-second", str(args.tokens_per_second),
+            "--tokens", str(args.tokens), "--embed-ms", str(args.embed_ms), "--dim", str(args.dim),
+        ]))
+        wait_until_ready(f"http://127.0.0.1:{ollama_port}/api/tags")
+
+        env = dict(os.environ)
+        env.update({
+            "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+            "OLLAMA_BASE_URL": f"http://127.0.0.1:{ollama_port}",
+            "VECTOR_STORE_LEGACY_PATH": os.path.join(workdir, "none.pkl"),
+            "HTTP_CACHE_DIR": os.path.join(workdir, "http-cache"),
+        })
+        processes.append(subprocess.Popen([
+            sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+            "--port", str(api_port), "--workers", str(args.workers), "--log-level", "warning",
+        ], env=env))
+        wait_until_ready(f"http://127.0.0.1:{api_port}/ready")
+        yield f"http://127.0.0.1:{api_port}"
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+async def setup_users(client, api, count, memories_per_user):
+    """
+    Register and log in `count` users, seeding a few memories for each.
+    """
+    stamp = int(time.time() * 1000)
+    headers = []
+    for i in range(count):
+        email = f"loadtest-{stamp}-{i}@example.com"
+        await client.post(f"{api}/auth/register", json={"email": email, "password": "loadtest"})
+        response = await client.post(
+            f"{api}/auth/login/access-token", data={"username": email, "password": "loadtest"}
+        )
+        response.raise_for_status()
+        user_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        for j in range(memories_per_user):
+            await client.post(f"{api}/memory/", json={"text": f"Fact {j} about user {i}"}, headers=user_headers)
+        headers.append(user_headers)
+    return headers
+
+
+async def one_request(client, api, scenario, headers, index):
+    """
+    Run one request. Returns (latency seconds, ttft seconds or None, inter-token gaps, chunks).
+    """
+    started = time.perf_counter()
+    if scenario in ("chat", "chat_stream"):
+        payload = {
+            "messages": [{"role": "user", "content": f"Tell me something interesting #{index}"}],
+            "stream": scenario == "chat_stream",
+        }
+        if scenario == "chat":
+            response = await client.post(f"{api}/chat/completions", json=payload, headers=headers)
+            response.raise_for_status()
+            return time.perf_counter() - started, None, [], 0
+
+        first, last, gaps, chunks = None, None, [], 0
+        async with client.stream("POST", f"{api}/chat/completions", json=payload, headers=headers) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_raw():
+                if not chunk:
+                    continue
+                now = time.perf_counter()
+                if first is None:
+                    first = now
+                else:
+                    gaps.append(now - last)
+                last = now
+                chunks += 1
+        ttft = (first - started) if first is not None else None
+        return time.perf_counter() - started, ttft, gaps, chunks
+
+    if scenario == "memory_search":
+        response = await client.post(
+            f"{api}/memory/search", json={"query": f"fact {index % 5}", "limit": 5}, headers=headers
+        )
+    else:
+        response = await client.get(f"{api}/conversations/", headers=headers)
+    response.raise_for_status()
+    return time.perf_counter() - started, None, [], 0
+
+
+async def run_scenario(client, api, scenario, users, concurrency, total):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, ttfts, gaps, errors, chunks = [], [], [], [], 0
+
+    async def worker(index):
+        nonlocal chunks
+        async with semaphore:
+            try:
+                latency, ttft, call_gaps, call_chunks = await one_request(
+                    client, api, scenario, users[index % len(users)], index
+                )
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                return
+            latencies.append(latency)
+            if ttft is not None:
+                ttfts.append(ttft)
+            gaps.extend(call_gaps)
+            chunks += call_chunks
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+
+    to_ms = lambda values: [value * 1000 for value in values]
+    return {
+        "requests": total,
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "elapsed_s": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_ms": summarize(to_ms(latencies)),
+        "ttft_ms": summarize(to_ms(ttfts)),
+        "inter_token_ms": summarize(to_ms(gaps)),
+        "chunks_per_second": chunks / elapsed if chunks and elapsed else None,
+    }
+
+
+async def run(api, args):
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        users = await setup_users(client, api, args.users, args.memories_per_user)
+        results = {}
+        for scenario in args.scenarios:
+            print(f"running {scenario}: {args.requests} requests, concurrency {args.concurrency}", flush=True)
+            results[scenario] = await run_scenario(client, api, scenario, users, args.concurrency, args.requests)
+        return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def lookup(result, dotted):
+    for part in dotted.split("."):
+        if result is None:
+            return None
+        result = result.get(part)
+    return result
+
+
+def compare(current, baseline, threshold):
+    """
+    Print a comparison and return the regressions beyond `threshold` (a fraction).
+    """
+    regressions = []
+    for scenario, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(scenario)
+        if base is None:
+            continue
+        for metric, higher_is_better in COMPARED:
+            new, old = lookup(result, metric), lookup(base, metric)
+            if new is None or not old:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = "REGRESSION" if worse > threshold else ""
+            print(f"  {scenario:14} {metric:22} {old:10.2f} -> {new:10.2f} ({change:+.1%}) {flag}")
+            if flag:
+                regressions.append(f"{scenario} {metric}")
+    return regressions
+
+
+def print_report(results):
+    for scenario, result in results.items():
+        latency = result["latency_ms"] or {}
+        line = (
+            f"{scenario:14} {result['throughput_rps']:8.1f} req/s  errors {result['errors']:3d}  "
+            f"p50 {latency.get('p50', 0):8.1f}  p95 {latency.get('p95', 0):8.1f}  p99 {latency.get('p99', 0):8.1f} ms"
+        )
+        if result["ttft_ms"]:
+            line += f"  ttft p95 {result['ttft_ms']['p95']:7.1f} ms"
+        if result["inter_token_ms"]:
+            line += f"  itl p95 {result['inter_token_ms']['p95']:6.1f} ms"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000/api/v1")
+    parser.add_argument("--start", action="store_true", help="Launch fake Ollama and the API locally")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers with --start")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--memories-per-user", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=100, help="Requests per scenario")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--ttft-ms", type=float, default=200.0, help="Fake Ollama setting with --start")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0, help="Fake Ollama setting with --start")
+    parser.add_argument("--tokens", type=int, default=50, help="Fake Ollama setting with --start")
+    parser.add_argument("--embed-ms", type=float, default=20.0, help="Fake Ollama setting with --start")
+    parser.add_argument("--dim", type=int, default=768, help="Fake Ollama setting with --start")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON from a previous run")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed regression, as a fraction")
+    args = parser.parse_args()
+
+    if args.start:
+        with local_stack(args) as server:
+            results = asyncio.run(run(f"{server}/api/v1", args))
+    else:
+        results = asyncio.run(run(args.base_url.rstrip("/"), args))
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "scenarios": results,
+    }
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"compared with {args.compare} (commit {baseline.get('commit')}):")
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"FAIL: {len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
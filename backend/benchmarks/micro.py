@@ -0,0 +1,299 @@
+"""
+Micro-benchmarks for the store and database hot paths.
+
+Runs in-process against a throwaway SQLite database, with embeddings replaced
+by deterministic random vectors so Ollama is not needed. For each operation it
+reports the mean and best wall time and the peak memory allocated during one
+call (tracemalloc). Covered:
+
+  vector.*        add_memory, search_memory, delete_memory, a cold cache load
+                  and an incremental refresh, for one user holding N vectors
+  tools.*         ToolRegistry.list_tools, cold and cached
+  safety.*        SafetyGuardian.check_input on long inputs
+  conversations.* the list and detail endpoints over seeded conversations
+
+Results are written as JSON; --compare fails (exit 1) when an operation got
+slower, or allocates more, than the baseline by more than --threshold.
+
+Run from the backend directory:
+    python -m benchmarks.micro --output micro.json
+    python -m benchmarks.micro --compare micro.json --threshold 0.25
+    python -m benchmarks.micro --sizes 1000 10000 100000 1000000 --dim 256
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Metrics compared by --compare, and the floor below which changes are noise.
+# Best-of timings are compared because the mean moves with machine load.
+COMPARED = {"best_ms": 0.05, "peak_kb": 64.0}
+
+
+def measure(func, repeat):
+    """
+    Time `repeat` calls, then one more under tracemalloc for the peak allocation.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "mean_ms": sum(timings) / len(timings) * 1000,
+        "best_ms": min(timings) * 1000,
+        "peak_kb": peak / 1024,
+    }
+
+
+def seed_vectors(db, models, encode_vector, user_id, count, dim, rng):
+    for start in range(0, count, 10000):
+        batch = rng.standard_normal((min(10000, count - start), dim), dtype=np.float32)
+        rows = [
+            {
+                "user_id": user_id, "key": f"seed-{start + i}", "text": f"Synthetic memory {start + i}",
+                "metadata_json": "{}", "dim": dim, "vector": encode_vector(vector),
+                "updated_at": datetime.utcnow(),
+            }
+            for i, vector in enumerate(batch)
+        ]
+        db.execute(models.MemoryVector.__table__.insert(), rows)
+    db.execute(models.MemoryVectorChange.__table__.insert(), [{"user_id": user_id, "key": "seed-0"}])
+    db.commit()
+
+
+def bench_vectors(results, args, rng):
+    from app.db import models
+    from app.db.base import SessionLocal
+    from app.services.memory.vector_store import VectorStore, encode_vector
+
+    async def fake_embedding(text):
+        return rng.standard_normal(args.dim).tolist()
+
+    for size in args.sizes:
+        user_id = 1000 + size
+        db = SessionLocal()
+        start = time.perf_counter()
+        seed_vectors(db, models, encode_vector, user_id, size, args.dim, rng)
+        db.close()
+        print(f"seeded {size} vectors in {time.perf_counter() - start:.1f}s", flush=True)
+
+        store = VectorStore()
+        store._get_embedding = fake_embedding
+        store.load()
+        query = rng.standard_normal(args.dim).tolist()
+        counter = iter(range(10 ** 9))
+
+        def cold_load():
+            store._cache.clear()
+            store._search(query, user_id, 5)
+
+        def refresh():
+            # One new vector, then the search that picks it up from the change log
+            asyncio.run(store.add_memory(f"bench-{next(counter)}", "refresh", user_id))
+            store._search(query, user_id, 5)
+
+        def add():
+            asyncio.run(store.add_memory(f"bench-{next(counter)}", "A new memory", user_id))
+
+        def search():
+            asyncio.run(store.search_memory("what do I like?", user_id, 5))
+
+        def delete():
+            key = f"bench-{next(counter)}"
+            asyncio.run(store.add_memory(key, "to delete", user_id))
+            store.delete_memory(key, user_id)
+
+        results[f"vector.cold_load@{size}"] = measure(cold_load, max(1, args.repeat // 4))
+        results[f"vector.refresh@{size}"] = measure(refresh, args.repeat)
+        results[f"vector.add_memory@{size}"] = measure(add, args.repeat)
+        results[f"vector.search_memory@{size}"] = measure(search, args.repeat)
+        results[f"vector.delete_memory@{size}"] = measure(delete, args.repeat)
+        store._cache.clear()
+
+
+def bench_tools(results, args):
+    from app.services.tools.registry import ToolRegistry
+
+    registry = ToolRegistry()
+
+    def cold():
+        registry._catalogue = None
+        registry.list_tools()
+
+    results["tools.list_tools.cold"] = measure(cold, args.repeat)
+    results["tools.list_tools"] = measure(registry.list_tools, args.repeat * 10)
+
+
+def bench_safety(results, args, rng):
+    from app.services.safety.guardian import SafetyGuardian
+
+    guardian = SafetyGuardian()
+    words = ["please", "summarise", "the", "quarterly", "report", "and", "list", "open", "items"]
+    for chars in args.text_chars:
+        text = " ".join(rng.choice(words, size=chars // 6 + 1))[:chars]
+        results[f"safety.check_input@{chars}"] = measure(lambda: guardian.check_input(text), args.repeat)
+
+
+def bench_conversations(results, args):
+    from app.api.conversations import read_conversation, read_conversations
+    from app.db import models
+    from app.db.base import SessionLocal
+    from app.schemas import conversation as conversation_schemas
+    from starlette.responses import Response
+
+    def render(result, many):
+        # Endpoints may return ORM objects for FastAPI to validate, or a finished Response
+        if isinstance(result, Response):
+            return result.body
+        if many:
+            return [conversation_schemas.Conversation.model_validate(item).model_dump_json() for item in result]
+        return conversation_schemas.Conversation.model_validate(result).model_dump_json()
+
+    db = SessionLocal()
+    user = models.User(email="micro@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    now = datetime.utcnow()
+    for _ in range(args.conversations):
+        conversation = models.Conversation(user_id=user.id, title="Benchmark conversation")
+        db.add(conversation)
+        db.flush()
+        db.execute(models.Message.__table__.insert(), [
+            {"conversation_id": conversation.id, "role": "user" if i % 2 == 0 else "assistant",
+             "content": f"Message {i} " * 20, "created_at": now}
+            for i in range(args.messages)
+        ])
+    db.commit()
+    conversation_id = conversation.id
+    user_id = user.id
+    db.close()
+
+    # Serialization included, as FastAPI does it for the endpoints
+    def listing():
+        session = SessionLocal()
+        try:
+            current_user = session.get(models.User, user_id)
+            render(read_conversations(db=session, current_user=current_user), many=True)
+        finally:
+            session.close()
+
+    def detail():
+        session = SessionLocal()
+        try:
+            current_user = session.get(models.User, user_id)
+            render(read_conversation(conversation_id, db=session, current_user=current_user), many=False)
+        finally:
+            session.close()
+
+    label = f"{args.conversations}x{args.messages}"
+    results[f"conversations.list@{label}"] = measure(listing, args.repeat)
+    results[f"conversations.detail@{label}"] = measure(detail, args.repeat)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """
+    Print a comparison and return the regressions beyond `threshold` (a fraction).
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        for metric, floor in COMPARED.items():
+            new, old = result[metric], base.get(metric)
+            if old is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            flag = "REGRESSION" if new - old > floor and change > threshold else ""
+            print(f"  {name:40} {metric:8} {old:10.2f} -> {new:10.2f} ({change:+.1%}) {flag}")
+            if flag:
+                regressions.append(f"{name} {metric}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Vectors per user")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--text-chars", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--conversations", type=int, default=100)
+    parser.add_argument("--messages", type=int, default=50, help="Messages per conversation")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", choices=["vector", "tools", "safety", "conversations"])
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON from a previous run")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed regression, as a fraction")
+    args = parser.parse_args()
+
+    # Settings are read at import, so the database is chosen before importing the app
+    workdir = tempfile.mkdtemp(prefix="micro-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'micro.db')}"
+    os.environ["VECTOR_STORE_LEGACY_PATH"] = os.path.join(workdir, "none.pkl")
+    from app.db.base import Base, engine
+    import app.db.models  # noqa: F401  registers the tables
+    Base.metadata.create_all(bind=engine)
+
+    rng = np.random.default_rng(args.seed)
+    groups = args.only or ["vector", "tools", "safety", "conversations"]
+    results = {}
+    if "vector" in groups:
+        bench_vectors(results, args, rng)
+    if "tools" in groups:
+        bench_tools(results, args)
+    if "safety" in groups:
+        bench_safety(results, args, rng)
+    if "conversations" in groups:
+        bench_conversations(results, args)
+
+    print(f"{'operation':40} {'mean ms':>10} {'best ms':>10} {'peak KB':>10}")
+    for name, result in results.items():
+        print(f"{name:40} {result['mean_ms']:10.3f} {result['best_ms']:10.3f} {result['peak_kb']:10.1f}")
+
+    if args.output:
+        report = {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"compared with {args.compare} (commit {baseline.get('commit')}):")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"FAIL: {len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
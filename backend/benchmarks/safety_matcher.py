@@ -0,0 +1,98 @@
+"""
+Safety matcher benchmark.
+
+Compares the compiled Aho-Corasick rule set against the old per-keyword
+substring scan as the number of keyword rules grows, reporting the cost per
+character of input. The automaton's cost should stay roughly flat while the
+naive scan grows linearly with the rule count. Also reports the overhead of
+moderating a streamed response token by token with StreamScanner.
+
+Run from the backend directory:
+    python -m benchmarks.safety_matcher --sizes 10 100 1000 10000 --text-chars 20000
+"""
+import argparse
+import random
+import string
+import time
+
+from app.services.safety.matcher import Rule, RuleSet, StreamScanner
+
+# The naive scan is O(rules x length); above this it only slows the run down
+NAIVE_MAX_RULES = 10000
+
+
+def random_word(rng, low=5, high=12):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(low, high)))
+
+
+def make_text(rng, chars):
+    words = []
+    length = 0
+    while length < chars:
+        word = random_word(rng, 2, 9)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:chars]
+
+
+def best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def naive_scan(keywords, text):
+    text_lower = text.lower()
+    for keyword in keywords:
+        if keyword in text_lower:
+            return keyword
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 50000])
+    parser.add_argument("--text-chars", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--token-chars", type=int, default=4, help="Average streamed token length")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    text = make_text(rng, args.text_chars)
+    tokens = [text[i:i + args.token_chars] for i in range(0, len(text), args.token_chars)]
+
+    def stream_scan(ruleset):
+        scanner = StreamScanner(ruleset)
+        for token in tokens:
+            scanner.feed(token)
+
+    print(f"{'rules':>8} {'compile ms':>11} {'automaton ns/char':>18} {'naive ns/char':>14} "
+          f"{'stream us/token':>16} {'states':>9}")
+    for size in args.sizes:
+        # Long random keywords essentially never occur in the text, so every scan
+        # reads the whole input: the worst case for both approaches
+        keywords = [random_word(rng) + random_word(rng) for _ in range(size)]
+        rules = [Rule(id=f"kw-{i}", pattern=keyword) for i, keyword in enumerate(keywords)]
+
+        start = time.perf_counter()
+        ruleset = RuleSet(rules)
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        automaton = best_of(args.repeat, lambda: ruleset.find(text))
+        automaton_ns = automaton / len(text) * 1e9
+        if size <= NAIVE_MAX_RULES:
+            naive = best_of(args.repeat, lambda: naive_scan(keywords, text))
+            naive_ns = f"{naive / len(text) * 1e9:14.1f}"
+        else:
+            naive_ns = f"{'skipped':>14}"
+        stream_us = best_of(args.repeat, lambda: stream_scan(ruleset)) / len(tokens) * 1e6
+        print(f"{size:8d} {compile_ms:11.1f} {automaton_ns:18.1f} {naive_ns} "
+              f"{stream_us:16.2f} {ruleset.stats()['automaton_states']:9d}")
+
+
+if __name__ == "__main__":
+    main()
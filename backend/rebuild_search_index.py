@@ -0,0 +1,17 @@
+from app.db.base import SessionLocal, Base, engine
+from app.db import models
+from app.services.search.index import search_index
+
+# Ensure tables, index and triggers exist
+Base.metadata.create_all(bind=engine)
+search_index.install(engine)
+
+db = SessionLocal()
+
+def rebuild():
+    counts = search_index.rebuild(db)
+    for kind, count in counts.items():
+        print(f"Indexed {count} {kind} rows.")
+
+if __name__ == "__main__":
+    rebuild()